@@ -192,4 +192,13 @@ class RequirementAttachmentAdmin(admin.ModelAdmin):
 @admin.register(Barangay)
 class BarangayAdmin(admin.ModelAdmin):
     list_display = ('name', 'code', 'municipality', 'created_at')
-    search_fields = ('name', 'code')
\ No newline at end of file
+    search_fields = ('name', 'code')
+
+from .models import CategoryKeyword
+
+@admin.register(CategoryKeyword)
+class CategoryKeywordAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'category', 'scope', 'weight', 'is_active')
+    list_filter = ('scope', 'category', 'is_active')
+    list_editable = ('weight', 'is_active')
+    search_fields = ('keyword',)
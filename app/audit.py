@@ -0,0 +1,296 @@
+"""
+Audit trail writer.
+
+record() is how code adds an AuditLog entry. Where it goes depends on the
+context:
+
+- inside `with audit.batch():` entries are collected and inserted with one
+  bulk_create when the block exits, so a bulk operation that touches
+  hundreds of rows (including through per-row signal receivers such as
+  employee_post_delete) costs one INSERT per batch_size entries;
+- otherwise, with settings.AUDIT_BUFFERED, the entry is handed to the
+  process-wide AuditBuffer once the surrounding transaction commits (so a
+  rolled-back change leaves no entry), and a background thread writes the
+  buffer with bulk_create every AUDIT_FLUSH_INTERVAL seconds, or sooner
+  when AUDIT_BUFFER_SIZE entries are waiting. The buffer is flushed at
+  interpreter exit; entries that still cannot be written are spooled to
+  AUDIT_SPOOL_PATH and replayed by the next flush;
+- without AUDIT_BUFFERED (the default; the web server entry points turn it
+  on, so tests and management commands never buffer) the entry is saved
+  at once.
+
+The writer thread has its own database connection. On SQLite its inserts
+queue for the write lock like any request, and when an entry is the first
+of its month the thread would also run the partition's CREATE TABLE
+(audit_partitions.ensure()) while requests are writing. `manage.py
+partition_audit_log`, run daily from CRONJOBS, creates next month's
+partition ahead of time so that normally never happens.
+
+Entries are timestamped when recorded, not when written, and are stored
+in the monthly partition of their timestamp (see audit_partitions.py).
+
+bulk_update() applies a queryset.update() and records one entry per row
+with only the fields that actually changed, read with a single query
+before the update.
+"""
+import atexit
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import audit_partitions
+from .models import AuditLog
+
+
+BATCH_SIZE = 500
+
+_local = threading.local()
+
+
+def make_entry(action, instance=None, user=None, old_values=None, new_values=None, description='',
+               model=None, object_id=None, content_object=None, ip_address=None, user_agent=''):
+    """
+    Unsaved AuditLog. The target is either `instance` (or `content_object`)
+    or, when only values() rows are at hand, `model` and `object_id`.
+    """
+    instance = instance if instance is not None else content_object
+    entry = AuditLog(
+        action=action,
+        user=user,
+        timestamp=timezone.now(),
+        ip_address=ip_address,
+        user_agent=user_agent,
+        old_values=old_values,
+        new_values=new_values,
+        description=description,
+    )
+    if instance is not None and instance.pk is not None:
+        entry.content_object = instance
+    elif model is not None and object_id is not None:
+        entry.content_type = ContentType.objects.get_for_model(model)
+        entry.object_id = object_id
+    return entry
+
+
+def _pending():
+    return getattr(_local, 'pending', None)
+
+
+def record(action, instance=None, **kwargs):
+    """Add an audit entry to the current batch(), the buffer, or the database (see above)"""
+    entry = make_entry(action, instance, **kwargs)
+    pending = _pending()
+    if pending is not None:
+        pending.append(entry)
+    elif getattr(settings, 'AUDIT_BUFFERED', False):
+        transaction.on_commit(lambda: buffer.add(entry))
+    else:
+        audit_partitions.save([entry])
+    return entry
+
+
+def flush(entries, batch_size=BATCH_SIZE):
+    if entries:
+        audit_partitions.save(entries, batch_size)
+
+
+@contextmanager
+def batch(batch_size=BATCH_SIZE):
+    """
+    Collect the entries recorded inside the block and insert them together.
+
+    Nested batches join the outermost one. Entries are dropped if the block
+    raises, matching the rolled-back changes they describe.
+    """
+    if _pending() is not None:
+        yield _pending()
+        return
+
+    _local.pending = []
+    try:
+        yield _local.pending
+        entries = _local.pending
+    finally:
+        _local.pending = None
+    flush(entries, batch_size)
+
+
+def diff(before, after):
+    """(old_values, new_values) restricted to the keys whose value changed"""
+    changed = [key for key in after if before.get(key) != after[key]]
+    return {key: before.get(key) for key in changed}, {key: after[key] for key in changed}
+
+
+def _json(value):
+    # JSONField needs plain values; dates and decimals are stored as text
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def bulk_update(queryset, changes, user=None, describe=None, label_fields=()):
+    """
+    queryset.update(**changes) with one UPDATE audit entry per changed row.
+
+    `describe(row)` builds each description from the row's values before the
+    update (the changed fields plus `label_fields`). Rows where nothing
+    changes get no entry. Returns the number of rows updated.
+    """
+    model = queryset.model
+    fields = list(changes)
+    with transaction.atomic():
+        before = list(queryset.values('pk', *fields, *label_fields))
+        count = queryset.update(**changes)
+
+        with batch():
+            for row in before:
+                old_values, new_values = diff(
+                    {field: _json(row[field]) for field in fields},
+                    {field: _json(value) for field, value in changes.items()},
+                )
+                if not new_values:
+                    continue
+                record(
+                    'UPDATE',
+                    model=model,
+                    object_id=row['pk'],
+                    user=user,
+                    old_values=old_values,
+                    new_values=new_values,
+                    description=describe(row) if describe else f'{model.__name__} {row["pk"]} was updated',
+                )
+    return count
+
+
+# ------------------------------------------------------------------
+# Buffered writer
+# ------------------------------------------------------------------
+
+SPOOL_FIELDS = [
+    'action', 'user_id', 'timestamp', 'ip_address', 'user_agent',
+    'content_type_id', 'object_id', 'old_values', 'new_values', 'description',
+]
+
+
+class AuditBuffer:
+    """Process-wide queue of unsaved AuditLog entries written by a daemon thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.entries = []
+        self.thread = None
+        self.pid = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'AUDIT_BUFFER_SIZE', 200)
+
+    @property
+    def spool_path(self):
+        return getattr(settings, 'AUDIT_SPOOL_PATH', None)
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            full = len(self.entries) >= self.max_size
+        self._ensure_thread()
+        if full:
+            self.wakeup.set()
+
+    def _ensure_thread(self):
+        # A forked worker inherits the buffer but not the thread
+        if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered (and any spooled entries); returns the number written"""
+        with self.lock:
+            entries, self.entries = self.entries, []
+        entries = self._read_spool() + entries
+        if not entries:
+            return 0
+
+        try:
+            return audit_partitions.save(entries)
+        except IntegrityError:
+            # One bad entry (e.g. its user was deleted meanwhile) must not block the rest
+            return self._write_one_by_one(entries)
+        except DatabaseError as e:
+            print(f"⚠️ Audit flush failed, retrying later: {e}")
+            with self.lock:
+                self.entries[:0] = entries
+            return 0
+
+    def _write_one_by_one(self, entries):
+        written = 0
+        for entry in entries:
+            try:
+                audit_partitions.save([entry])
+                written += 1
+            except DatabaseError as e:
+                print(f"⚠️ Dropped audit entry '{entry.description}': {e}")
+        return written
+
+    def shutdown(self):
+        """Final flush; entries that still cannot be written go to the spool file"""
+        self.flush()
+        with self.lock:
+            entries, self.entries = self.entries, []
+        if entries:
+            self._write_spool(entries)
+
+    def _write_spool(self, entries):
+        if not self.spool_path:
+            print(f"⚠️ {len(entries)} audit entries lost: no AUDIT_SPOOL_PATH")
+            return
+        with open(self.spool_path, 'a', encoding='utf-8') as spool:
+            for entry in entries:
+                row = {field: getattr(entry, field) for field in SPOOL_FIELDS}
+                spool.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+    def _read_spool(self):
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return []
+        # Claim the file first so two processes never replay the same entries
+        claimed = f'{self.spool_path}.{os.getpid()}'
+        try:
+            os.replace(self.spool_path, claimed)
+        except OSError:
+            return []
+        entries = []
+        with open(claimed, encoding='utf-8') as spool:
+            for line in spool:
+                if line.strip():
+                    row = json.loads(line)
+                    row['timestamp'] = parse_datetime(row['timestamp'])
+                    entries.append(AuditLog(**row))
+        os.remove(claimed)
+        return entries
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.shutdown)
@@ -0,0 +1,311 @@
+"""
+Monthly partitions of the audit trail.
+
+AuditLog entries are stored in one table per calendar month (UTC),
+app_auditlog_YYYYMM, with the columns and indexes of the AuditLog model.
+Each partition is an unmanaged copy of AuditLog built on first use by
+partition_model(), and its table is created when the first entry for that
+month is written (or ahead of time by ensure_ahead()), so no migration is
+needed per month.
+
+- save() routes entries to the partition of their timestamp, with one
+  bulk_create per partition;
+- query() returns one queryset per partition overlapping a time range,
+  newest first, and entries() reads them in turn, so a read only touches
+  the months it asks for (and stops once it has enough rows); page() does
+  the same with a keyset cursor;
+- drop() removes whole months, replacing row-by-row retention deletes.
+
+Partition foreign keys have no database constraint and DO_NOTHING on
+delete: a deleted user's id stays on the entries that record what they
+did, and deleting a user does not fan out over every month.
+
+app_auditlog itself still holds the entries written before partitioning
+(`manage.py partition_audit_log` moves them) and is read as one more
+partition for as long as it has rows.
+"""
+import heapq
+import re
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import chain, islice
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.db import DatabaseError, connection, models, transaction
+
+from .models import AuditLog
+from .pagination import decode_cursor, encode_cursor, keyset_filter, keyset_order
+
+
+BATCH_SIZE = 500
+
+# Newest first; (timestamp, id) is unique because partitions never share a month
+ORDER = ['-timestamp', '-id']
+
+PREFIX = f'{AuditLog._meta.db_table}_'
+TABLE_PATTERN = re.compile(rf'^{re.escape(PREFIX)}(\d{{4}})(\d{{2}})$')
+
+_lock = threading.Lock()
+_models = {}
+_tables = set()
+
+
+def table_name(year, month):
+    return f'{PREFIX}{year}{month:02d}'
+
+
+def month_of(timestamp):
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    return timestamp.year, timestamp.month
+
+
+def month_start(year, month):
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _field(field):
+    name, path, args, kwargs = field.deconstruct()
+    if field.is_relation:
+        kwargs.update(on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    return field.__class__(*args, **kwargs)
+
+
+def partition_model(year, month):
+    """Unmanaged model class for the partition of year/month"""
+    key = (year, month)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            attrs = {
+                field.name: _field(field)
+                for field in AuditLog._meta.local_fields
+                if not field.primary_key
+            }
+            attrs.update(
+                __module__=AuditLog.__module__,
+                content_object=GenericForeignKey('content_type', 'object_id'),
+                Meta=type('Meta', (), {
+                    'app_label': AuditLog._meta.app_label,
+                    'db_table': table_name(year, month),
+                    'managed': False,
+                    'ordering': AuditLog._meta.ordering,
+                    'indexes': [models.Index(fields=index.fields) for index in AuditLog._meta.indexes],
+                }),
+            )
+            model = type(f'AuditLog{year}{month:02d}', (models.Model,), attrs)
+            # Let the shared __str__ and choices display work on partition rows
+            model.__str__ = AuditLog.__str__
+            model.ACTION_CHOICES = AuditLog.ACTION_CHOICES
+            _models[key] = model
+    return model
+
+
+def existing():
+    """(year, month) of every partition table, oldest first"""
+    months = []
+    tables = []
+    for table in connection.introspection.table_names():
+        match = TABLE_PATTERN.match(table)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+            tables.append(table)
+    # A table made earlier in this transaction is gone if it rolls back
+    transaction.on_commit(lambda: _tables.update(tables))
+    return sorted(months)
+
+
+def _run_ddl(build):
+    """
+    Run the schema changes build(editor) makes, in a savepoint of the
+    caller's transaction.
+
+    The SQLite schema editor refuses to run inside atomic(), so its
+    statements are collected and executed here instead.
+    """
+    editor = connection.schema_editor(collect_sql=True)
+    editor.deferred_sql = []
+    build(editor)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in editor.collected_sql:
+            cursor.execute(sql)
+
+
+def ensure(year, month):
+    """Create the partition table of year/month if it does not exist yet"""
+    model = partition_model(year, month)
+    table = model._meta.db_table
+    if table in _tables:
+        return model
+    if table not in connection.introspection.table_names():
+        # Index DDL is skipped for unmanaged models, so it is added explicitly
+        def create(editor):
+            editor.create_model(model)
+            editor.collected_sql.extend(f'{index.create_sql(model, editor)};' for index in model._meta.indexes)
+
+        try:
+            _run_ddl(create)
+        except DatabaseError:
+            # Another process created it first
+            if table not in connection.introspection.table_names():
+                raise
+    # A rolled-back transaction takes the new table with it
+    transaction.on_commit(lambda: _tables.add(table))
+    return model
+
+
+def ensure_ahead(months=1, today=None):
+    """Create the partitions of this month and the next `months` months ahead of their first entry"""
+    year, month = month_of(today or datetime.now(dt_timezone.utc))
+    for _ in range(months + 1):
+        ensure(year, month)
+        year, month = next_month(year, month)
+
+
+def add_missing_indexes():
+    """Create AuditLog indexes added after a partition was made; returns how many"""
+    created = 0
+    for year, month in existing():
+        model = partition_model(year, month)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        present = {tuple(info['columns']) for info in constraints.values() if info['index']}
+        for index in model._meta.indexes:
+            columns = tuple(model._meta.get_field(field).column for field in index.fields)
+            if columns not in present:
+                _run_ddl(lambda editor: editor.collected_sql.append(f'{index.create_sql(model, editor)};'))
+                created += 1
+    return created
+
+
+def _copy(entry, model):
+    return model(**{
+        field.attname: getattr(entry, field.attname)
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+    })
+
+
+def save(entries, batch_size=BATCH_SIZE):
+    """Insert unsaved AuditLog entries into the partitions of their timestamps"""
+    by_month = {}
+    for entry in entries:
+        by_month.setdefault(month_of(entry.timestamp), []).append(entry)
+    for (year, month), group in by_month.items():
+        model = ensure(year, month)
+        model.objects.bulk_create([_copy(entry, model) for entry in group], batch_size=batch_size)
+    return len(entries)
+
+
+def months_between(start=None, end=None):
+    """Existing partitions overlapping [start, end), newest first"""
+    months = []
+    for year, month in existing():
+        if start is not None and month_start(*next_month(year, month)) <= start:
+            continue
+        if end is not None and month_start(year, month) >= end:
+            continue
+        months.append((year, month))
+    return months[::-1]
+
+
+def query(start=None, end=None):
+    """One timestamp-filtered queryset per partition overlapping [start, end), newest first"""
+    querysets = [partition_model(year, month).objects.all() for year, month in months_between(start, end)]
+    if AuditLog.objects.exists():
+        querysets.append(AuditLog.objects.all())
+
+    bounds = {}
+    if start is not None:
+        bounds['timestamp__gte'] = start
+    if end is not None:
+        bounds['timestamp__lt'] = end
+    return [queryset.filter(**bounds) for queryset in querysets]
+
+
+def _ordered(queryset, filters, limit, after=None, fields=None):
+    queryset = queryset.filter(**filters).select_related('user', 'content_type').order_by(*keyset_order(ORDER))
+    if after is not None:
+        queryset = queryset.filter(keyset_filter(ORDER, after))
+    if fields:
+        queryset = queryset.only(*fields)
+    return queryset[:limit] if limit is not None else queryset.iterator()
+
+
+def _merged(querysets, filters, limit, after=None, fields=None):
+    # Partitions never overlap in time, so reading them newest first is enough;
+    # only unpartitioned app_auditlog rows need merging
+    partitions = chain.from_iterable(
+        _ordered(queryset, filters, limit, after, fields) for queryset in querysets if queryset.model is not AuditLog
+    )
+    legacy = [_ordered(queryset, filters, limit, after, fields) for queryset in querysets if queryset.model is AuditLog]
+    return heapq.merge(partitions, *legacy, key=lambda entry: (entry.timestamp, entry.id), reverse=True)
+
+
+def entries(start=None, end=None, limit=None, **filters):
+    """
+    Entries of [start, end) matching `filters`, newest first, across partitions.
+
+    Partitions are read one after the other and only until `limit` entries
+    are found; unpartitioned app_auditlog rows are merged in by timestamp.
+    """
+    return list(islice(_merged(query(start, end), filters, limit), limit))
+
+
+def page(start=None, end=None, cursor=None, limit=50, fields=None, **filters):
+    """
+    One keyset page of entries() (see pagination.py): (rows, next_cursor).
+
+    The cursor holds the (timestamp, id) of the previous page's last row, so
+    partitions newer than it are not read at all. `fields` limits the
+    columns loaded (only()). Raises InvalidCursor.
+    """
+    after = decode_cursor(cursor, AuditLog, ORDER) if cursor else None
+    if after is not None:
+        bound = after[0] + timedelta(microseconds=1)
+        end = bound if end is None else min(end, bound)
+
+    rows = list(islice(_merged(query(start, end), filters, limit + 1, after, fields), limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], ORDER)
+
+
+def count(start=None, end=None, **filters):
+    return sum(queryset.filter(**filters).count() for queryset in query(start, end))
+
+
+def drop_month(year, month):
+    """Drop the partition of year/month; returns {table: number of rows it held}"""
+    model = partition_model(year, month)
+    table = model._meta.db_table
+    rows = model.objects.count()
+    _run_ddl(lambda editor: editor.delete_model(model))
+    _tables.discard(table)
+    return {table: rows}
+
+
+def drop(before):
+    """Drop every partition whose month ends on or before `before`; returns {table: rows}"""
+    dropped = {}
+    for year, month in months_between(end=before):
+        if month_start(*next_month(year, month)) <= before:
+            dropped.update(drop_month(year, month))
+    return dropped
+
+
+def move_legacy(batch_size=BATCH_SIZE):
+    """Move the rows of app_auditlog into their partitions; returns the number moved"""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(AuditLog.objects.order_by('id')[:batch_size])
+            if not rows:
+                return moved
+            save(rows, batch_size)
+            AuditLog.objects.filter(id__in=[row.id for row in rows]).delete()
+        moved += len(rows)
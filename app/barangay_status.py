@@ -0,0 +1,156 @@
+"""
+Requirement status per barangay, as shown on the barangay map.
+
+Every barangay's submission counts come from one grouped query. The result
+is cached until a submission or barangay changes (see the receivers in
+models.py), or until the day rolls over, since "overdue" depends on today's
+date.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+
+CACHE_KEY = 'barangay_status_map'
+CACHE_TIMEOUT = 300
+
+STATUS_COUNTS = ['pending', 'in_progress', 'accomplished', 'approved', 'rejected']
+
+
+def status_payload(name, counts):
+    """Map status, colour and tooltip for one barangay from its submission counts"""
+    total = counts['total']
+    overdue = counts['overdue']
+    pending = counts['pending']
+    in_progress = counts['in_progress']
+    accomplished = counts['accomplished']
+    approved = counts['approved']
+    rejected = counts['rejected']
+
+    if not total:
+        return {
+            'status': 'no_data',
+            'color': 'gray',
+            'tooltip': f'{name}: No requirements assigned',
+            'counts': dict.fromkeys(['total', 'overdue'] + STATUS_COUNTS, 0),
+        }
+
+    if overdue > 0:
+        return {
+            'status': 'overdue',
+            'color': 'red',
+            'tooltip': f'{name}: {overdue} overdue requirement(s) ⚠️',
+            'counts': {
+                'total': total,
+                'overdue': overdue,
+                'pending': pending,
+                'in_progress': in_progress,
+                'accomplished': accomplished,
+                'approved': approved,
+                'rejected': rejected
+            }
+        }
+
+    elif approved == total:
+        return {
+            'status': 'completed',
+            'color': 'green',
+            'tooltip': f'{name}: All {total} requirements approved! ✓',
+            'counts': {
+                'total': total,
+                'overdue': 0,
+                'pending': 0,
+                'in_progress': 0,
+                'accomplished': 0,
+                'approved': approved,
+                'rejected': rejected
+            }
+        }
+
+    elif in_progress > 0 or accomplished > 0:
+        return {
+            'status': 'in_progress',
+            'color': 'yellow',
+            'tooltip': f'{name}: {in_progress} in progress, {accomplished} awaiting review',
+            'counts': {
+                'total': total,
+                'overdue': 0,
+                'pending': pending,
+                'in_progress': in_progress,
+                'accomplished': accomplished,
+                'approved': approved,
+                'rejected': rejected
+            }
+        }
+
+    elif pending > 0:
+        return {
+            'status': 'pending',
+            'color': 'blue',
+            'tooltip': f'{name}: {pending} pending requirements',
+            'counts': {
+                'total': total,
+                'overdue': 0,
+                'pending': pending,
+                'in_progress': 0,
+                'accomplished': 0,
+                'approved': approved,
+                'rejected': rejected
+            }
+        }
+
+    return {
+        'status': 'partial',
+        'color': 'blue',
+        'tooltip': f'{name}: {approved}/{total} approved',
+        'counts': {
+            'total': total,
+            'overdue': 0,
+            'pending': pending,
+            'in_progress': in_progress,
+            'accomplished': accomplished,
+            'approved': approved,
+            'rejected': rejected
+        }
+    }
+
+
+def compute_statuses(today=None):
+    """{barangay id: payload} for every barangay, from one grouped query"""
+    from .models import Barangay
+
+    today = today or date.today()
+    annotations = {
+        'total': Count('submissions'),
+        'overdue': Count('submissions', filter=Q(
+            submissions__status__in=['pending', 'in_progress', 'accomplished'],
+            submissions__due_date__lt=today,
+        )),
+    }
+    for status in STATUS_COUNTS:
+        annotations[status] = Count('submissions', filter=Q(submissions__status=status))
+
+    rows = Barangay.objects.annotate(**annotations).values('id', 'name', *annotations)
+    statuses = {}
+    for row in rows:
+        payload = status_payload(row['name'], row)
+        payload.update(id=row['id'], name=row['name'])
+        statuses[row['id']] = payload
+    return statuses
+
+
+def get_statuses():
+    """Cached compute_statuses(); recomputed after invalidate() or at the start of a new day"""
+    today = date.today()
+    cached = cache.get(CACHE_KEY)
+    if cached and cached['date'] == today:
+        return cached['statuses']
+
+    statuses = compute_statuses(today)
+    cache.set(CACHE_KEY, {'date': today, 'statuses': statuses}, CACHE_TIMEOUT)
+    return statuses
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
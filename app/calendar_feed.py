@@ -0,0 +1,224 @@
+"""
+Month calendar of submission due dates and announcements.
+
+The admin calendar shows, per month, every requirement submission due in
+that month and every announcement dated in it. A month's items are built
+with one query each for submissions and announcements and cached per
+(year, month) together with an ETag, so navigating back and forth between
+months is served from cache and a client holding the current ETag gets a
+304.
+
+The cache key of a month includes a fingerprint of its rows (count and
+latest updated_at of its submissions and announcements), so any change to
+them, made by this process, another worker or a cron job, is a new key
+without anything having to drop the old one. Renaming a requirement or
+barangay does not touch those rows; for that the receivers in models.py
+drop every month at once by bumping a version kept in the shared cache.
+
+to_ics() renders months as an iCalendar feed with one all-day event per
+item and stable UIDs, so calendar clients update events in place.
+"""
+import calendar
+import hashlib
+import json
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+
+CACHE_PREFIX = 'calendar_month'
+VERSION_KEY = 'calendar_month_version'
+CACHE_TIMEOUT = 3600
+
+ICS_PRODID = '-//DILG Lucena//Requirements Calendar//EN'
+ICS_DOMAIN = 'dilg-lucena'
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def build_month(year, month):
+    """{'items', 'etag', 'last_modified'} for one month, straight from the database"""
+    from .models import Announcement, RequirementSubmission
+
+    first, last = month_bounds(year, month)
+    status_display = dict(RequirementSubmission.STATUS_CHOICES)
+    priority_display = dict(Announcement.PRIORITY_CHOICES)
+
+    submissions = (
+        RequirementSubmission.objects
+        .filter(due_date__gte=first, due_date__lte=last)
+        .order_by('due_date', 'id')
+        .values_list('id', 'requirement__title', 'barangay__name', 'due_date', 'status', 'updated_at')
+    )
+    announcements = (
+        Announcement.objects
+        .filter(date__gte=first, date__lte=last)
+        .order_by('date', 'id')
+        .values_list('id', 'title', 'date', 'priority', 'updated_at')
+    )
+
+    items = []
+    stamps = []
+    for pk, title, barangay_name, due_date, status, updated_at in submissions:
+        items.append({
+            'id': pk,
+            'title': title,
+            'barangay_name': barangay_name,
+            'due_date': due_date.strftime('%Y-%m-%d'),
+            'status': status,
+            'status_display': status_display.get(status, status),
+            'type': 'requirement',
+        })
+        stamps.append(updated_at)
+
+    for pk, title, day, priority, updated_at in announcements:
+        items.append({
+            'id': f'announcement_{pk}',  # Prefix to avoid ID conflicts
+            'title': f"📢 {title}",
+            'barangay_name': 'All Barangays',
+            'due_date': day.strftime('%Y-%m-%d'),
+            'status': 'announcement',
+            'status_display': priority_display.get(priority, priority),
+            'type': 'announcement',
+            'priority': priority,
+        })
+        stamps.append(updated_at)
+
+    digest = hashlib.sha1(json.dumps(items, sort_keys=True).encode()).hexdigest()[:16]
+    last_modified = max((stamp for stamp in stamps if stamp), default=None)
+    return {
+        'items': items,
+        'etag': f'"cal-{year}-{month:02d}-{digest}"',
+        'last_modified': int(last_modified.timestamp()) if last_modified else None,
+    }
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def fingerprint(year, month):
+    """Count and latest updated_at of the month's submissions and announcements"""
+    from .models import Announcement, RequirementSubmission
+
+    first, last = month_bounds(year, month)
+    parts = []
+    for rows in (
+        RequirementSubmission.objects.filter(due_date__gte=first, due_date__lte=last),
+        Announcement.objects.filter(date__gte=first, date__lte=last),
+    ):
+        state = rows.aggregate(count=Count('id'), latest=Max('updated_at'))
+        latest = state['latest']
+        parts.append(f"{state['count']}-{latest.timestamp() if latest else 0}")
+    return ':'.join(parts)
+
+
+def _cache_key(year, month):
+    return f'{CACHE_PREFIX}:{_version()}:{year}:{month}:{fingerprint(year, month)}'
+
+
+def get_month(year, month):
+    """Cached build_month()"""
+    key = _cache_key(year, month)
+    cached = cache.get(key)
+    if cached is None:
+        cached = build_month(year, month)
+        cache.set(key, cached, CACHE_TIMEOUT)
+    return cached
+
+
+def invalidate():
+    """Drop every cached month"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def months_from(year, month, count):
+    """`count` consecutive (year, month) pairs starting at year/month"""
+    for _ in range(count):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def feed_etag(months):
+    """ETag of a feed covering several cached months"""
+    digest = hashlib.sha1(''.join(month['etag'] for month in months).encode()).hexdigest()[:16]
+    return f'"ics-{digest}"'
+
+
+# ------------------------------------------------------------------
+# iCalendar
+# ------------------------------------------------------------------
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet chunks (RFC 5545 3.1)"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    chunks = []
+    while data:
+        size = 75 if not chunks else 74
+        # Do not cut a multi-byte character in half
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1
+        chunks.append(data[:size].decode('utf-8'))
+        data = data[size:]
+    return '\r\n '.join(chunks)
+
+
+def _event(item, stamp):
+    day = date.fromisoformat(item['due_date'])
+    if item['type'] == 'announcement':
+        uid = f"{item['id']}@{ICS_DOMAIN}"
+        summary = item['title']
+        description = f"Announcement ({item['status_display']} priority)"
+    else:
+        uid = f"submission_{item['id']}@{ICS_DOMAIN}"
+        summary = f"{item['title']} - {item['barangay_name']}"
+        description = f"Status: {item['status_display']}"
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;VALUE=DATE:{day:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{date.fromordinal(day.toordinal() + 1):%Y%m%d}',
+        f'SUMMARY:{_escape(summary)}',
+        f'DESCRIPTION:{_escape(description)}',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+
+
+def to_ics(months):
+    """iCalendar text for the items of the given cached months"""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{ICS_PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:DILG Requirements Calendar',
+    ]
+    for month in months:
+        # DTSTAMP follows the month's content so an unchanged month renders identically
+        modified = month['last_modified'] or 0
+        stamp = datetime.fromtimestamp(modified, dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        for item in month['items']:
+            lines.extend(_event(item, stamp))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
@@ -0,0 +1,267 @@
+import re
+import time
+
+
+# Keywords searched for in extracted document text (PDF text / OCR output).
+# Each distinct keyword found adds its weight to the category score.
+DEFAULT_CONTENT_KEYWORDS = {
+    'appointive_certificates': [
+        'appointive official',
+        'appointive position',
+        'date of appointment',
+        'appointing authority',
+        'appointing punong barangay',
+        'barangay secretary',
+        'barangay treasurer',
+        'appointment',
+        'csc-erpo boe form 1(b)',
+    ],
+    'elective_certificates': [
+        'elective official',
+        'elective position',
+        'date of election',
+        'term of office',
+        'punong barangay',
+        'sanguniang barangay member',
+        'elected',
+        'election',
+        'csc-erpo boe form 1(a)',
+    ],
+    'ids': [
+        'identification',
+        'id card',
+        'government issued id',
+        'driver',
+        'passport',
+        'sss',
+        'philhealth',
+        'tin',
+        'voter',
+    ],
+    'signatures': [
+        'signature',
+        'sign here',
+        'e-signature',
+    ],
+}
+
+# Keywords searched for in the filename, with the bonus a hit gives.
+# A category gets its bonus once no matter how many of its hints match.
+DEFAULT_FILENAME_KEYWORDS = {
+    'ids': [('id_front', 5), ('id_back', 5), ('identification', 5), ('_id_', 5)],
+    'signatures': [('signature', 5), ('sign', 5), ('esign', 5)],
+    'appointive_certificates': [('appointive', 3)],
+    'elective_certificates': [('elective', 3)],
+}
+
+# Order used when only the filename is available (first hit wins)
+FILENAME_PRIORITY = ['ids', 'signatures', 'appointive_certificates', 'elective_certificates']
+
+DEFAULT_CATEGORY = 'ids'
+
+# Below this many keywords, one C-level substring scan per keyword beats the
+# combined regex in CPython (measured with `manage.py benchmark_categorization`).
+REGEX_MIN_KEYWORDS = 100
+
+
+def _trie_pattern(keywords):
+    """Build a regex alternation shaped like a trie so shared prefixes are tried once"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional tail keeps the match greedy: the longest keyword at a position wins
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Matches every keyword of every category in a single pass over the text.
+
+    Keywords are compiled into one trie-shaped regex, so each search step finds
+    the leftmost, longest keyword. Keywords contained inside that match are
+    credited with it, and the scan stops early once every keyword has been
+    seen. The result is the same as testing ``keyword in text`` per keyword.
+
+    Small keyword sets use plain substring scans instead (strategy='scan'),
+    which are faster until the list grows past REGEX_MIN_KEYWORDS.
+    """
+
+    def __init__(self, keyword_sets, strategy=None):
+        # keyword -> [(category, weight), ...]
+        self.categories = {}
+        for category, keywords in keyword_sets.items():
+            for entry in keywords:
+                keyword, weight = entry if isinstance(entry, tuple) else (entry, 1)
+                keyword = keyword.lower()
+                if keyword:
+                    self.categories.setdefault(keyword, []).append((category, weight))
+
+        self.category_names = list(keyword_sets.keys())
+        self.keywords = sorted(self.categories)
+
+        # Keywords that occur wherever a longer keyword occurs
+        self.contained = {
+            keyword: [other for other in self.keywords if other in keyword]
+            for keyword in self.keywords
+        }
+
+        # Keywords whose tail can be the start of another keyword (e.g. "punong
+        # barangay" / "barangay secretary"): after matching one of these, resume
+        # one character later instead of after the match so the overlapping
+        # keyword is not skipped.
+        self.overlapping = {
+            keyword for keyword in self.keywords
+            if any(
+                other.startswith(keyword[i:]) and len(other) > len(keyword) - i
+                for other in self.keywords
+                for i in range(1, len(keyword))
+            )
+        }
+
+        if strategy is None:
+            strategy = 'regex' if len(self.keywords) >= REGEX_MIN_KEYWORDS else 'scan'
+        self.strategy = strategy
+
+        if self.keywords:
+            self.pattern = re.compile(_trie_pattern(self.keywords))
+        else:
+            self.pattern = None
+
+    def find(self, text):
+        """Return the set of keywords that occur in the text (case-insensitive)"""
+        found = set()
+        if self.pattern is None or not text:
+            return found
+
+        text = text.lower()
+        if self.strategy == 'scan':
+            return {keyword for keyword in self.keywords if keyword in text}
+
+        total = len(self.keywords)
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            longest = match.group()
+            if longest not in found:
+                found.update(self.contained[longest])
+                if len(found) == total:
+                    break
+            pos = match.start() + 1 if longest in self.overlapping else match.end()
+            match = search(text, pos)
+        return found
+
+    def scores(self, text):
+        """Sum of weights of the distinct keywords found, per category"""
+        totals = dict.fromkeys(self.category_names, 0)
+        for keyword in self.find(text):
+            for category, weight in self.categories[keyword]:
+                totals[category] += weight
+        return totals
+
+    def hits(self, text):
+        """Highest weight among the keywords found, per category that matched"""
+        best = {}
+        for keyword in self.find(text):
+            for category, weight in self.categories[keyword]:
+                best[category] = max(best.get(category, 0), weight)
+        return best
+
+
+# Built-in matchers, compiled once at import
+DEFAULT_CONTENT_MATCHER = KeywordMatcher(DEFAULT_CONTENT_KEYWORDS)
+DEFAULT_FILENAME_MATCHER = KeywordMatcher(DEFAULT_FILENAME_KEYWORDS)
+
+# After a failed keyword load, the built-in matchers are used for this many
+# seconds before the database is tried again
+FALLBACK_TTL = 60
+
+_matchers = None
+_retry_at = 0.0
+
+
+def get_matchers():
+    """
+    Return the (content, filename) matchers.
+
+    Keywords come from the CategoryKeyword table when it has active rows for a
+    scope, otherwise the built-in lists are used. The result is cached until
+    the table changes (see reset_matchers); if the table cannot be read, the
+    built-in lists are used for FALLBACK_TTL seconds.
+    """
+    global _matchers, _retry_at
+    if _matchers is not None:
+        return _matchers
+
+    content_matcher = DEFAULT_CONTENT_MATCHER
+    filename_matcher = DEFAULT_FILENAME_MATCHER
+    if time.monotonic() < _retry_at:
+        return content_matcher, filename_matcher
+
+    try:
+        from .models import CategoryKeyword
+
+        keyword_sets = {'content': {}, 'filename': {}}
+        rows = CategoryKeyword.objects.filter(is_active=True).values_list(
+            'scope', 'category', 'keyword', 'weight'
+        )
+        for scope, category, keyword, weight in rows:
+            keyword_sets[scope].setdefault(category, []).append((keyword, weight))
+
+        if keyword_sets['content']:
+            content_matcher = KeywordMatcher(keyword_sets['content'])
+        if keyword_sets['filename']:
+            filename_matcher = KeywordMatcher(keyword_sets['filename'])
+    except Exception as e:
+        # Table missing (e.g. before migrate) - fall back to built-in keywords
+        print(f"⚠️ Could not load category keywords: {e}")
+        _retry_at = time.monotonic() + FALLBACK_TTL
+        return content_matcher, filename_matcher
+
+    _matchers = (content_matcher, filename_matcher)
+    return _matchers
+
+
+def reset_matchers():
+    """Drop the cached matchers so the next call recompiles from the database"""
+    global _matchers, _retry_at
+    _matchers = None
+    _retry_at = 0.0
+
+
+def score_text(text, filename=''):
+    """
+    Score extracted text and filename against every category in one pass each.
+
+    Returns: {category: score}
+    """
+    content_matcher, filename_matcher = get_matchers()
+
+    scores = content_matcher.scores(text)
+    for category, bonus in filename_matcher.hits(filename).items():
+        scores[category] = scores.get(category, 0) + bonus
+    return scores
+
+
+def category_from_filename(filename):
+    """Pick a category from filename hints alone, in FILENAME_PRIORITY order"""
+    _, filename_matcher = get_matchers()
+
+    hits = filename_matcher.hits(filename)
+    for category in FILENAME_PRIORITY:
+        if category in hits:
+            return category
+    for category in filename_matcher.category_names:
+        if category in hits:
+            return category
+    return DEFAULT_CATEGORY
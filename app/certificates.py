@@ -0,0 +1,665 @@
+"""
+Certificate rendering for approved eligibility requests.
+
+The static part of a certificate (borders, logos, header, form reference and
+title) only depends on the position type, so it is rendered once per position
+type and cached as a one-page PDF template. Each certificate draws just the
+applicant's details on a transparent overlay page and stamps it onto the
+cached template, so the logo is decoded and compressed once per process
+instead of twice per certificate.
+
+Many certificates can be generated at once with generate_certificates():
+the admin batch API renders small batches in the request, and
+`manage.py generate_certificates` renders across a process pool.
+
+With settings.CERTIFICATE_LAZY_RENDERING the PDF is not written at approval
+time; get_cached_certificate() renders it on first download and keeps the
+bytes in storage keyed by request id, TEMPLATE_VERSION and a fingerprint of
+the fields printed on it, deleting the render it replaces.
+
+Bump TEMPLATE_VERSION whenever the layout below changes.
+"""
+import hashlib
+import os
+import zipfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from PyPDF2 import PdfReader, PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+
+TEMPLATE_VERSION = 1
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+
+# position type -> (folder, form reference, position label)
+POSITION_LAYOUTS = {
+    'appointive': ('appointive_certificates', "CSC-ERPO BOE Form 1(b). April 2012", "(Appointive Official)"),
+    'elective': ('elective_certificates', "CSC-ERPO BOE Form 1(a) (Revised, June 2017)", "(Elective Official)"),
+}
+
+# Height of the line closing the static title block (returned by draw_static_page)
+TEMPLATE_BOTTOM = PAGE_HEIGHT - 3.48*inch
+
+# Fields printed on a certificate; editing any of them changes the fingerprint
+CERTIFICATE_FIELDS = [
+    'first_name', 'middle_initial', 'last_name', 'barangay', 'position_type',
+    'position_held', 'election_from', 'election_to', 'term_office', 'completed_term', 'incomplete_reason',
+    'appointment_from', 'appointment_to', 'years_in_service',
+    'appointing_punong_barangay', 'pb_date_elected', 'pb_years_service',
+    'date_processed',
+]
+
+CACHE_FOLDER = 'certificate_cache'
+
+DIRECTOR_NAME = "LEANDRO SIPOY GIGANTOCA, CESE"
+DIRECTOR_TITLE = "OIC-HUC Director, Lucena City"
+
+_templates = {}
+
+
+def position_layout(position_type):
+    """Return (folder, form_ref, position_label); anything but appointive is elective"""
+    return POSITION_LAYOUTS.get(position_type, POSITION_LAYOUTS['elective'])
+
+
+def find_logo():
+    """Return the path of the DILG logo, or None when it cannot be found"""
+    possible_logo_paths = [
+        os.path.join(settings.BASE_DIR, 'static', 'Pictures', 'logo1.png'),
+        os.path.join(settings.BASE_DIR, 'app', 'static', 'Pictures', 'logo1.png'),
+        os.path.join(settings.BASE_DIR, 'static', 'pictures', 'logo1.png'),
+        os.path.join(settings.STATIC_ROOT, 'Pictures', 'logo1.png') if getattr(settings, 'STATIC_ROOT', None) else None,
+    ]
+    for path in possible_logo_paths:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def draw_static_page(c, position_type):
+    """Draw the parts of the certificate that are the same for every applicant"""
+    width, height = PAGE_WIDTH, PAGE_HEIGHT
+    _, form_ref, position_label = position_layout(position_type)
+
+    # === BORDERS ===
+    c.setStrokeColor(colors.HexColor('#1A237E'))
+    c.setLineWidth(2)
+    c.rect(0.4*inch, 0.4*inch, width - 0.8*inch, height - 0.8*inch)
+
+    c.setLineWidth(0.5)
+    c.rect(0.5*inch, 0.5*inch, width - 1*inch, height - 1*inch)
+
+    # === LOGOS ===
+    logo_path = find_logo()
+    if logo_path:
+        try:
+            # One reader for both sides: reportlab embeds the image once and
+            # references it twice
+            img = ImageReader(logo_path)
+            logo_size = 0.7*inch
+            logo_y = height - 1.3*inch
+            c.drawImage(img, 0.75*inch, logo_y,
+                        width=logo_size, height=logo_size,
+                        preserveAspectRatio=True, mask='auto')
+            c.drawImage(img, width - 0.75*inch - logo_size, logo_y,
+                        width=logo_size, height=logo_size,
+                        preserveAspectRatio=True, mask='auto')
+        except Exception as e:
+            print(f"⚠️ Logo rendering error: {e}")
+    else:
+        print("⚠️ Logo file not found, rendering certificate template without logos")
+
+    # === HEADER ===
+    y_pos = height - 1*inch
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 9)
+    c.drawCentredString(width/2, y_pos, "Republic of the Philippines")
+
+    y_pos -= 0.2*inch
+    c.setFillColor(colors.HexColor('#1A237E'))
+    c.setFont("Helvetica-Bold", 11)
+    c.drawCentredString(width/2, y_pos, "DEPARTMENT OF THE INTERIOR AND")
+    y_pos -= 0.18*inch
+    c.drawCentredString(width/2, y_pos, "LOCAL GOVERNMENT")
+
+    y_pos -= 0.2*inch
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 9)
+    c.drawCentredString(width/2, y_pos, "REGION IV-A CALABARZON")
+
+    y_pos -= 0.15*inch
+    c.drawCentredString(width/2, y_pos, "CITY OF LUCENA")
+
+    c.setFont("Helvetica", 7)
+    c.setFillColor(colors.gray)
+    c.drawRightString(width - 0.6*inch, y_pos - 0.3*inch, form_ref)
+
+    # === LINE ===
+    y_pos -= 0.5*inch
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(1)
+    c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
+
+    # === TITLE ===
+    y_pos -= 0.5*inch
+    c.setFillColor(colors.HexColor('#1A237E'))
+    c.setFont("Helvetica-Bold", 18)
+    c.drawCentredString(width/2, y_pos, "CERTIFICATION")
+
+    y_pos -= 0.25*inch
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(width/2, y_pos, "on Services Rendered in the Barangay*")
+
+    y_pos -= 0.2*inch
+    c.setFont("Helvetica-Bold", 10)
+    c.drawCentredString(width/2, y_pos, position_label)
+
+    # === LINE ===
+    y_pos -= 0.3*inch
+    c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
+
+    return y_pos
+
+
+def get_template(position_type):
+    """Return the static page for a position type as PDF bytes, rendering it on first use"""
+    key = position_layout(position_type)[0]
+    if key not in _templates:
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=letter)
+        draw_static_page(c, position_type)
+        c.showPage()
+        c.save()
+        _templates[key] = buffer.getvalue()
+    return _templates[key]
+
+
+def reset_templates():
+    """Drop the cached templates (e.g. after replacing the logo)"""
+    _templates.clear()
+
+
+def _wrap(c, text, font, size, max_width):
+    """Split text into lines narrower than max_width"""
+    lines = []
+    current_line = []
+    for word in text.split():
+        test_line = ' '.join(current_line + [word])
+        if c.stringWidth(test_line, font, size) < max_width:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [word]
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
+
+
+def _date(value):
+    return value.strftime('%m/%d/%Y') if value else 'N/A'
+
+
+def draw_details(c, eligibility_request):
+    """Draw the applicant-specific part of the certificate below the static header"""
+    width, height = PAGE_WIDTH, PAGE_HEIGHT
+    is_elective = eligibility_request.position_type != 'appointive'
+    full_name = eligibility_request.full_name.upper()
+
+    # === BODY ===
+    y_pos = TEMPLATE_BOTTOM - 0.4*inch
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+
+    # First line with indentation (0.5 inch indent)
+    indent = 0.5*inch
+    text_line = "This is to certify that "
+    c.drawString(0.75*inch + indent, y_pos, text_line)
+
+    name_x = 0.75*inch + indent + c.stringWidth(text_line, "Helvetica", 10)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(name_x, y_pos, full_name)
+
+    after_name_x = name_x + c.stringWidth(full_name, "Helvetica-Bold", 10)
+    c.setFont("Helvetica", 10)
+    c.drawString(after_name_x, y_pos, " has rendered services in")
+
+    # Second line - no indent
+    y_pos -= 0.18*inch
+    c.drawString(0.75*inch, y_pos, f"Barangay {eligibility_request.barangay}, with the following details:")
+
+    # === TABLE ===
+    y_pos -= 0.5*inch
+
+    if is_elective:
+        table_data = [
+            ['Position Held', 'Date of Election\n(mm/dd/yyyy)', 'Term of Office\n(no. of years)',
+             'From\n(mm/dd/yyyy)', 'To\n(mm/dd/yyyy)'],
+            [
+                eligibility_request.position_held or 'N/A',
+                _date(eligibility_request.election_from),
+                eligibility_request.term_office or 'N/A',
+                _date(eligibility_request.election_from),
+                _date(eligibility_request.election_to),
+            ]
+        ]
+        col_widths = [1.4*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch]
+        row_heights = [0.5*inch, 0.4*inch]
+    else:
+        table_data = [
+            ['Position\nHeld', 'Date of\nAppointment', 'Inclusive Dates\nFrom', 'Inclusive Dates\nTo',
+             'No. of Years\nServed', 'Appointing Punong\nBarangay Name', 'Date Elected', 'Term of Office\n(years)'],
+            [
+                'Barangay\nSecretary',
+                _date(eligibility_request.appointment_from),
+                _date(eligibility_request.appointment_from),
+                _date(eligibility_request.appointment_to),
+                f"{float(eligibility_request.years_in_service)} yrs" if eligibility_request.years_in_service else '0.0 yrs',
+                eligibility_request.appointing_punong_barangay or 'N/A',
+                _date(eligibility_request.pb_date_elected),
+                f"{float(eligibility_request.pb_years_service)} yrs" if eligibility_request.pb_years_service else '0.0 yrs',
+            ]
+        ]
+        col_widths = [0.8*inch, 0.75*inch, 0.75*inch, 0.75*inch, 0.7*inch, 1.1*inch, 0.7*inch, 0.7*inch]
+        row_heights = [0.6*inch, 0.5*inch]
+
+    table = Table(table_data, colWidths=col_widths, rowHeights=row_heights)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1A237E')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+
+    table.wrapOn(c, width, height)
+    table_height = table._height
+    table.drawOn(c, 0.75*inch, y_pos - table_height)
+
+    y_pos -= (table_height + 0.3*inch)
+
+    # === COMPLETED TERM SECTION (ELECTIVE ONLY) ===
+    if is_elective:
+        c.setFont("Helvetica-Bold", 10)
+        c.setFillColor(colors.black)
+        c.drawString(0.75*inch, y_pos, "Completed Term of Office?")
+
+        c.setFont("Helvetica", 9)
+        c.drawString(2.9*inch, y_pos, "(Please check (√) appropriate box)")
+
+        y_pos -= 0.3*inch
+
+        completed_term = (eligibility_request.completed_term or '').lower()
+        checkbox_size = 0.15*inch
+
+        # YES checkbox
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(1)
+        c.rect(1.0*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
+        if completed_term == 'yes':
+            c.setFont("Helvetica-Bold", 14)
+            c.drawString(1.03*inch, y_pos - 0.02*inch, "✓")
+
+        c.setFont("Helvetica", 10)
+        c.drawString(1.25*inch, y_pos, "YES")
+
+        # NO checkbox
+        c.rect(2.1*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
+        if completed_term == 'no':
+            c.setFont("Helvetica-Bold", 14)
+            c.drawString(2.13*inch, y_pos - 0.02*inch, "✓")
+
+        c.setFont("Helvetica", 10)
+        c.drawString(2.35*inch, y_pos, "NO, Specify total number of days not served")
+
+        y_pos -= 0.3*inch
+
+        # Reason box - only shown when the term was not completed
+        if completed_term == 'no':
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(1.0*inch, y_pos, "Reason for non-completion:")
+
+            y_pos -= 0.25*inch
+
+            c.setFillColor(colors.HexColor('#f5f5f5'))
+            c.setStrokeColor(colors.HexColor('#cccccc'))
+            c.setLineWidth(0.5)
+            reason_box_height = 0.7*inch
+            c.rect(1.0*inch, y_pos - reason_box_height, 5.5*inch, reason_box_height, fill=1, stroke=1)
+
+            c.setFillColor(colors.black)
+            c.setFont("Helvetica", 9)
+
+            reason_text = eligibility_request.incomplete_reason or 'Not specified'
+            text_y = y_pos - 0.2*inch
+            for line in _wrap(c, reason_text, "Helvetica", 9, 5.2*inch)[:4]:
+                c.drawString(1.1*inch, text_y, line)
+                text_y -= 0.13*inch
+
+            y_pos -= (reason_box_height + 0.2*inch)
+
+        # "Assumed under rule on succession" checkbox
+        y_pos -= 0.25*inch
+        c.setStrokeColor(colors.black)
+        c.rect(1.0*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
+        c.setFont("Helvetica", 9)
+        c.drawString(1.25*inch, y_pos, "Assumed under rule on succession.")
+
+        y_pos -= 0.35*inch
+
+    # === FOOTER TEXT ===
+    c.setFont("Helvetica", 9)
+    c.setFillColor(colors.black)
+
+    left_margin = 0.75*inch
+    indent = 0.5*inch  # Same indent as opening paragraph
+    max_width = width - 1.5*inch - indent
+
+    if is_elective:
+        footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {full_name} for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance with CSC Resolution No. 1200865 dated June 14, 2012 and CSC Resolution No. 1601257 dated November 21, 2016."
+    else:
+        footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {full_name} for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance with CSC Resolution No. 13 series of 2012."
+
+    # First line gets the paragraph indent, the rest align with the margin
+    for i, line in enumerate(_wrap(c, footer_text, "Helvetica", 9, max_width)):
+        c.drawString(left_margin + indent if i == 0 else left_margin, y_pos, line)
+        y_pos -= 0.15*inch
+
+    # === DATE ===
+    y_pos -= 0.2*inch
+    issued = timezone.localtime(eligibility_request.date_processed) if eligibility_request.date_processed else timezone.now()
+    c.drawString(0.75*inch, y_pos, f"Lucena City, Quezon, {issued.strftime('%B %d, %Y')}.")
+
+    # === SIGNATURES ===
+    y_pos -= 0.8*inch
+
+    # Director signature (right side)
+    sig_line_width = 2.5*inch
+    sig_line_x_start = width - 0.75*inch - sig_line_width
+    sig_center_x = sig_line_x_start + (sig_line_width / 2)
+
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(0.5)
+    c.line(sig_line_x_start, y_pos, sig_line_x_start + sig_line_width, y_pos)
+
+    y_pos -= 0.18*inch
+    c.setFont("Helvetica-Bold", 10)
+    c.drawCentredString(sig_center_x, y_pos, DIRECTOR_NAME)
+
+    y_pos -= 0.15*inch
+    c.setFont("Helvetica", 9)
+    c.drawCentredString(sig_center_x, y_pos, DIRECTOR_TITLE)
+
+
+def render_certificate(eligibility_request):
+    """Render the certificate for an eligibility request and return the PDF bytes"""
+    overlay_buffer = BytesIO()
+    c = canvas.Canvas(overlay_buffer, pagesize=letter)
+    draw_details(c, eligibility_request)
+    c.showPage()
+    c.save()
+
+    # Fresh reader per call: merge_page modifies the page it is called on
+    page = PdfReader(BytesIO(get_template(eligibility_request.position_type))).pages[0]
+    page.merge_page(PdfReader(overlay_buffer).pages[0])
+
+    writer = PdfWriter()
+    writer.add_page(page)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def certificate_filename(eligibility_request):
+    """Storage filename for a newly generated certificate"""
+    safe_name = eligibility_request.full_name.replace(' ', '_').replace('.', '')
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+
+    if eligibility_request.position_type == 'elective':
+        return f"{safe_name}_Elective_{completion_tag(eligibility_request)}_Certificate_{timestamp}.pdf"
+    return f"{safe_name}_Appointive_Certificate_{timestamp}.pdf"
+
+
+def fingerprint(eligibility_request):
+    """Short hash of everything printed on the certificate"""
+    values = [str(getattr(eligibility_request, field)) for field in CERTIFICATE_FIELDS]
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()[:12]
+
+
+def certificate_etag(eligibility_request):
+    return f'"{eligibility_request.id}-v{TEMPLATE_VERSION}-{fingerprint(eligibility_request)}"'
+
+
+def cached_certificate_path(eligibility_request):
+    """Storage path of the cached render; a new template version or edited data gives a new path"""
+    return f"{CACHE_FOLDER}/v{TEMPLATE_VERSION}/{eligibility_request.id}-{fingerprint(eligibility_request)}.pdf"
+
+
+def get_cached_certificate(eligibility_request):
+    """Return the certificate PDF bytes, rendering and caching them on first use"""
+    path = cached_certificate_path(eligibility_request)
+    if default_storage.exists(path):
+        with default_storage.open(path, 'rb') as handle:
+            return handle.read()
+
+    pdf_data = render_certificate(eligibility_request)
+    try:
+        remove_cached_certificates(eligibility_request)
+        default_storage.save(path, ContentFile(pdf_data))
+    except OSError as e:
+        # Serving matters more than caching
+        print(f"⚠️ Could not cache certificate {path}: {e}")
+    return pdf_data
+
+
+def remove_cached_certificates(eligibility_request):
+    """Delete the cached renders of a request (superseded template versions or data)"""
+    if not default_storage.exists(CACHE_FOLDER):
+        return
+    prefix = f"{eligibility_request.id}-"
+    versions, _ = default_storage.listdir(CACHE_FOLDER)
+    for version in versions:
+        _, files = default_storage.listdir(f"{CACHE_FOLDER}/{version}")
+        for name in files:
+            if name.startswith(prefix):
+                default_storage.delete(f"{CACHE_FOLDER}/{version}/{name}")
+
+
+def completion_tag(eligibility_request):
+    completed = (
+        eligibility_request.position_type == 'elective'
+        and (eligibility_request.completed_term or '').lower() == 'yes'
+    )
+    return 'Completed' if completed else 'Incomplete'
+
+
+def get_category(position_type):
+    """FileCategory (folder) that certificates for a position type are filed under"""
+    from .models import FileCategory
+
+    folder = position_layout(position_type)[0]
+    category, _ = FileCategory.objects.get_or_create(
+        name=folder,
+        defaults={
+            'display_name': folder.replace('_', ' ').title(),
+            'folder_path': f'certification_files/{folder}/',
+        }
+    )
+    return category
+
+
+def save_certificate(eligibility_request, pdf_data):
+    """Write a rendered certificate to storage; returns (saved_path, filename)"""
+    folder = position_layout(eligibility_request.position_type)[0]
+    filename = certificate_filename(eligibility_request)
+    saved_path = default_storage.save(f"certification_files/{folder}/{filename}", ContentFile(pdf_data))
+    return saved_path, filename
+
+
+def certificate_record(eligibility_request, saved_path, filename, file_size, category):
+    """Unsaved CategorizedFile row for a stored certificate"""
+    from .models import CategorizedFile
+
+    tag = completion_tag(eligibility_request)
+    return CategorizedFile(
+        file=saved_path,
+        original_filename=filename,
+        file_type='pdf',
+        file_size=file_size,
+        mime_type='application/pdf',
+        category=category,
+        source='eligibility',
+        detected_content=f'{eligibility_request.get_position_type_display()} Certificate - {tag}',
+        eligibility_request=eligibility_request,
+        uploaded_by=eligibility_request.approved_by,
+        tags=f"{eligibility_request.full_name}, {eligibility_request.position_type}, {tag}"
+    )
+
+
+# ------------------------------------------------------------------
+# Batch generation
+# ------------------------------------------------------------------
+
+def render_and_store(eligibility_request):
+    """
+    Render one certificate and write it to storage.
+
+    Returns plain data and never touches the database, so
+    `manage.py generate_certificates` can run it in pool processes; the
+    parent process writes the rows.
+    """
+    try:
+        pdf_data = render_certificate(eligibility_request)
+        saved_path, filename = save_certificate(eligibility_request, pdf_data)
+        return {
+            'id': eligibility_request.id,
+            'path': saved_path,
+            'filename': filename,
+            'file_size': len(pdf_data),
+        }
+    except Exception as e:
+        return {'id': eligibility_request.id, 'error': str(e)}
+
+
+def batch_queryset(ids=None, date_from=None, date_to=None, missing_only=False):
+    """
+    Approved eligibility requests selected for batch generation.
+
+    `date_from`/`date_to` (dates) filter on the approval date; `missing_only`
+    skips requests that already have a certificate file.
+    """
+    from .models import CategorizedFile, EligibilityRequest
+
+    queryset = EligibilityRequest.objects.filter(status='approved').select_related('approved_by')
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    if date_from:
+        queryset = queryset.filter(date_processed__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date_processed__date__lte=date_to)
+    if missing_only:
+        certificates = CategorizedFile.objects.filter(
+            eligibility_request=OuterRef('pk'),
+            source='eligibility',
+            detected_content__contains='Certificate',
+        )
+        queryset = queryset.exclude(Exists(certificates))
+    return queryset.order_by('date_processed', 'id')
+
+
+def generate_certificates(eligibility_requests, bundle=None, progress=None, render=map):
+    """
+    Generate certificates for many eligibility requests.
+
+    Each certificate is stored and registered as a CategorizedFile, like a
+    certificate generated on approval. Certificates are rendered in this
+    process unless `render` is given: a map-like callable applied as
+    render(render_and_store, eligibility_requests), which the management
+    command uses to spread the work over a process pool. `bundle` can be
+    'pdf' (one merged PDF) or 'zip' (the individual PDFs) and is built from
+    the stored certificates under certification_files/batches/. `progress`
+    is called with (done, total) as results come in.
+
+    Returns {'generated': [result, ...], 'failed': [result, ...], 'bundle': path or None}
+    """
+    from . import search
+    from .models import CategorizedFile
+
+    eligibility_requests = list(eligibility_requests)
+    by_id = {er.id: er for er in eligibility_requests}
+    total = len(eligibility_requests)
+
+    categories = {}
+    for er in eligibility_requests:
+        folder = position_layout(er.position_type)[0]
+        if folder not in categories:
+            categories[folder] = get_category(er.position_type)
+
+    results = []
+    for result in render(render_and_store, eligibility_requests):
+        results.append(result)
+        if progress:
+            progress(len(results), total)
+
+    # Results of a pool come back in completion order
+    position = {er.id: index for index, er in enumerate(eligibility_requests)}
+    results.sort(key=lambda r: position[r['id']])
+    generated = [r for r in results if 'error' not in r]
+    failed = [r for r in results if 'error' in r]
+
+    rows = []
+    for result in generated:
+        er = by_id[result['id']]
+        rows.append(certificate_record(
+            er, result['path'], result['filename'], result['file_size'],
+            categories[position_layout(er.position_type)[0]],
+        ))
+    created = CategorizedFile.objects.bulk_create(rows)
+
+    # bulk_create skips post_save, so index the new rows here
+    search.index_files(row.pk for row in created if row.pk)
+    for category in categories.values():
+        category.update_file_count()
+
+    bundle_path = None
+    if bundle and generated:
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        buffer = BytesIO()
+        if bundle == 'pdf':
+            writer = PdfWriter()
+            for result in generated:
+                with default_storage.open(result['path'], 'rb') as handle:
+                    writer.append(BytesIO(handle.read()))
+            writer.write(buffer)
+        else:
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for result in generated:
+                    with default_storage.open(result['path'], 'rb') as handle:
+                        archive.writestr(result['filename'], handle.read())
+        bundle_path = default_storage.save(
+            f"certification_files/batches/certificates_{timestamp}.{bundle}", ContentFile(buffer.getvalue())
+        )
+
+    return {'generated': generated, 'failed': failed, 'bundle': bundle_path}
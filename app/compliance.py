@@ -0,0 +1,184 @@
+"""
+Barangay × requirement compliance matrix.
+
+For a period (a year, or one month of it) every barangay gets a row and
+every requirement with submissions due in the period gets a column. Each
+cell holds one status code summarising the barangay's submissions for that
+requirement; the codes are indexes into CODES so the whole city fits in a
+few kilobytes of JSON.
+
+The cells come from one grouped query over the submissions. Matrices are
+cached per period and, when a submission changes status, only the affected
+cell is recomputed and written back (see update_cell()). Anything that
+changes the axes - a new requirement or barangay, a renamed one, a bulk
+insert - calls invalidate(), which bumps a version number shared by every
+period's cache key. Like the barangay map, a cached matrix is discarded at
+the start of a new day since "overdue" depends on today's date.
+
+Both kinds of change have to reach every web worker and the cron jobs, so
+this relies on the cache being shared between processes (the database
+cache in settings.CACHES, not a per-process LocMemCache).
+"""
+import calendar
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+
+CACHE_PREFIX = 'compliance_matrix'
+VERSION_KEY = 'compliance_matrix_version'
+CACHE_TIMEOUT = 600
+
+# Status code of a cell is its index in CODES
+CODES = ['none', 'pending', 'in_progress', 'accomplished', 'approved', 'rejected', 'overdue']
+CODE = {name: code for code, name in enumerate(CODES)}
+
+STATUS_COUNTS = ['pending', 'in_progress', 'accomplished', 'approved', 'rejected']
+OPEN_STATUSES = ['pending', 'in_progress', 'accomplished']
+
+
+def period_bounds(year, month=None):
+    """(first, last) due date of a year or of one month"""
+    if month:
+        return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def cell_code(counts):
+    """Status code of one cell from its submission counts"""
+    if not counts['total']:
+        return CODE['none']
+    if counts['overdue']:
+        return CODE['overdue']
+    if counts['approved'] == counts['total']:
+        return CODE['approved']
+    for status in ('rejected', 'accomplished', 'in_progress'):
+        if counts[status]:
+            return CODE[status]
+    return CODE['pending']
+
+
+def _annotations(today):
+    annotations = {
+        'total': Count('id'),
+        'overdue': Count('id', filter=Q(status__in=OPEN_STATUSES, due_date__lt=today)),
+    }
+    for status in STATUS_COUNTS:
+        annotations[status] = Count('id', filter=Q(status=status))
+    return annotations
+
+
+def compute_matrix(year, month=None, today=None):
+    """The matrix payload for a period, built from one grouped query"""
+    from .models import Barangay, Requirement, RequirementSubmission
+
+    today = today or date.today()
+    first, last = period_bounds(year, month)
+    cells = (
+        RequirementSubmission.objects
+        .filter(due_date__gte=first, due_date__lte=last)
+        .values('barangay_id', 'requirement_id')
+        .annotate(**_annotations(today))
+        .order_by()
+    )
+    codes = {(cell['barangay_id'], cell['requirement_id']): cell_code(cell) for cell in cells}
+
+    barangays = list(Barangay.objects.order_by('name').values_list('id', 'name'))
+    requirements = list(
+        Requirement.objects
+        .filter(id__in={requirement_id for _, requirement_id in codes})
+        .order_by('title', 'id')
+        .values_list('id', 'title')
+    )
+
+    return {
+        'year': year,
+        'month': month,
+        'date': today.isoformat(),
+        'codes': CODES,
+        'barangays': [list(row) for row in barangays],
+        'requirements': [list(row) for row in requirements],
+        'matrix': [
+            [codes.get((barangay_id, requirement_id), 0) for requirement_id, _ in requirements]
+            for barangay_id, _ in barangays
+        ],
+    }
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def _cache_key(year, month=None):
+    return f'{CACHE_PREFIX}:{_version()}:{year}:{month or 0}'
+
+
+def get_matrix(year, month=None):
+    """Cached compute_matrix(); recomputed after invalidate() or on a new day"""
+    key = _cache_key(year, month)
+    cached = cache.get(key)
+    if cached and cached['date'] == date.today().isoformat():
+        return cached
+
+    matrix = compute_matrix(year, month)
+    cache.set(key, matrix, CACHE_TIMEOUT)
+    return matrix
+
+
+def invalidate():
+    """Drop every cached matrix"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def update_cell(barangay_id, requirement_id, due_date):
+    """
+    Recompute the one cell a submission belongs to in each cached matrix
+    that covers its due date (the year and its month).
+    """
+    from .models import RequirementSubmission
+
+    keys = [
+        (due_date.year, None, _cache_key(due_date.year)),
+        (due_date.year, due_date.month, _cache_key(due_date.year, due_date.month)),
+    ]
+    today = date.today()
+    for year, month, key in keys:
+        cached = cache.get(key)
+        if not cached or cached['date'] != today.isoformat():
+            continue
+
+        rows = [barangay for barangay, _ in cached['barangays']]
+        columns = [requirement for requirement, _ in cached['requirements']]
+        if barangay_id not in rows or requirement_id not in columns:
+            # A new column (or row) changes the layout; rebuild on next request
+            cache.delete(key)
+            continue
+
+        first, last = period_bounds(year, month)
+        counts = RequirementSubmission.objects.filter(
+            barangay_id=barangay_id,
+            requirement_id=requirement_id,
+            due_date__gte=first,
+            due_date__lte=last,
+        ).aggregate(**_annotations(today))
+        cached['matrix'][rows.index(barangay_id)][columns.index(requirement_id)] = cell_code(counts)
+        cache.set(key, cached, CACHE_TIMEOUT)
+
+
+def update_cells(submissions):
+    """update_cell() for many submissions, once per distinct cell and month"""
+    seen = set()
+    for submission in submissions:
+        cell = (submission.barangay_id, submission.requirement_id,
+                submission.due_date.year, submission.due_date.month)
+        if cell not in seen:
+            seen.add(cell)
+            update_cell(submission.barangay_id, submission.requirement_id, submission.due_date)
@@ -1,5 +1,8 @@
 # app/context_processors.py
 
+from .middleware import get_profile
+
+
 def user_role(request):
     """
     Context processor to add user role and permissions to all templates
@@ -19,9 +22,9 @@ def user_role(request):
     
     if request.user.is_authenticated:
         try:
-            # Try to get UserProfile - handle case where it doesn't exist
-            if hasattr(request.user, 'userprofile'):
-                profile = request.user.userprofile
+            # UserProfile loaded once per request by UserProfileMiddleware
+            profile = get_profile(request)
+            if profile is not None:
                 context['user_role'] = profile.role
                 context['user_barangay'] = profile.barangay
                 
@@ -45,7 +48,7 @@ def user_role(request):
             else:
                 # If no UserProfile exists, create one with default role
                 from .models import UserProfile
-                profile = UserProfile.objects.create(
+                profile = request.profile = UserProfile.objects.create(
                     user=request.user,
                     role='barangay official',  # Default role
                     is_approved=False
@@ -65,10 +68,24 @@ def user_role(request):
 def notification_counts(request):
     """
     Add notification counts to all templates for sidebar badges
+
+    Each count is a callable the template resolves on first use, so a page
+    only pays for the badges it actually shows (once each).
     """
+    from functools import cache
     from django.contrib.auth.models import User
     from .models import EligibilityRequest, Notification
     
+    def counter(build_queryset):
+        @cache
+        def count():
+            try:
+                return build_queryset().count()
+            except Exception as e:
+                print(f"⚠️ Error calculating notification counts: {e}")
+                return 0
+        return count
+    
     counts = {
         'pending_users_count': 0,
         'pending_applications_count': 0,
@@ -77,28 +94,24 @@ def notification_counts(request):
     }
     
     if request.user.is_authenticated:
-        try:
-            # Count pending user approvals (users waiting for admin approval)
-            counts['pending_users_count'] = User.objects.filter(
-                userprofile__is_approved=False
-            ).count()
-            
-            # Count pending applications (non-archived)
-            counts['pending_applications_count'] = EligibilityRequest.objects.filter(
-                status='pending',
-                archived=False
-            ).count()
-            
-            # Count unread notifications for current user
-            counts['unread_notifications_count'] = Notification.objects.filter(
-                user=request.user,
-                is_read=False
-            ).count()
-            
-            # Total items needing approval (for User Approvals page)
-            counts['user_approvals_count'] = counts['pending_users_count']
-            
-        except Exception as e:
-            print(f"⚠️ Error calculating notification counts: {e}")
+        # Count pending user approvals (users waiting for admin approval)
+        counts['pending_users_count'] = counter(lambda: User.objects.filter(
+            userprofile__is_approved=False
+        ))
+        
+        # Count pending applications (non-archived)
+        counts['pending_applications_count'] = counter(lambda: EligibilityRequest.objects.filter(
+            status='pending',
+            archived=False
+        ))
+        
+        # Count unread notifications for current user
+        counts['unread_notifications_count'] = counter(lambda: Notification.objects.filter(
+            user=request.user,
+            is_read=False
+        ))
+        
+        # Total items needing approval (for User Approvals page)
+        counts['user_approvals_count'] = counts['pending_users_count']
     
-    return counts
\ No newline at end of file
+    return counts
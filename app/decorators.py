@@ -2,11 +2,16 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .middleware import get_profile
+
 def role_required(*allowed_roles):
     """
     Restrict access to users with specific roles.
     Usage: @role_required('dilg staff', 'municipal officer')
     """
+    # Normalize allowed roles for comparison
+    allowed_roles_normalized = frozenset(r.strip().lower() for r in allowed_roles)
+
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
@@ -14,15 +19,12 @@ def role_required(*allowed_roles):
                 messages.error(request, "You must be logged in to access this page.")
                 return redirect('login_page')
             
-            # Get role from UserProfile
-            try:
-                role = request.user.userprofile.role.strip().lower()
-            except:
+            # Get role from the UserProfile loaded by UserProfileMiddleware
+            profile = get_profile(request)
+            if profile is None or not profile.role:
                 messages.error(request, "Your account has no role assigned. Contact admin.")
                 return redirect('landing_page')
-
-            # Normalize allowed roles for comparison
-            allowed_roles_normalized = [r.strip().lower() for r in allowed_roles]
+            role = profile.role.strip().lower()
 
             if role not in allowed_roles_normalized:
                 messages.error(request, "You are not authorized to access this page.")
@@ -0,0 +1,285 @@
+"""
+Bulk employee import from CSV or XLSX rosters.
+
+The first row holds the column headers: either the headers written by the
+employee export ('Name', 'Employee ID', 'Department', ...) or the model
+field names ('name', 'id_no', ...). Department and status accept the code
+or the label. Supervisor is the Employee ID of an existing employee or of
+another row in the same file.
+
+Files are read row by row (csv.reader, openpyxl read-only mode) and
+handled in chunks of `batch_size` rows inside one transaction, so only a
+chunk of rows is in memory at a time. Every row is checked with Employee's
+field validation and clean() rules; duplicate Employee IDs are found with
+one query per chunk plus a set of the IDs already seen. Valid rows are
+inserted with bulk_create together with the audit entries the per-row
+signal would have written. A row whose supervisor is a later row of the
+file is held until that row is inserted, and the whole import is rolled
+back at the end when any row turned out invalid (unless skip_invalid).
+
+The Supervisor column of the employee export holds the supervisor's
+Employee ID, so an export can be imported back as it is.
+"""
+import csv
+import io
+import os
+
+import openpyxl
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import audit
+from .models import Employee
+
+
+# Accepted header (lower-cased, spaces as underscores) -> Employee field
+HEADER_FIELDS = {
+    'name': 'name',
+    'employee_id': 'id_no',
+    'id_no': 'id_no',
+    'email': 'email',
+    'phone': 'phone',
+    'department': 'department',
+    'position': 'position',
+    'status': 'status',
+    'task': 'task',
+    'supervisor': 'supervisor',
+    'hire_date': 'hire_date',
+    'birth_date': 'birth_date',
+}
+
+AUDIT_FIELDS = ['name', 'id_no', 'department', 'position', 'status', 'task']
+
+
+class ImportFileError(ValueError):
+    """The file cannot be read as a roster at all"""
+
+
+def _header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        # Numeric IDs and phones typed into Excel come back as floats
+        return str(int(value))
+    return value
+
+
+def _records(header_row, rows):
+    fields = [HEADER_FIELDS.get(_header(value)) for value in header_row]
+    if 'name' not in fields or 'id_no' not in fields:
+        raise ImportFileError('The first row must include the "Name" and "Employee ID" columns')
+    for line, row in rows:
+        values = {field: _cell(value) for field, value in zip(fields, row) if field}
+        if any(value not in ('', None) for value in values.values()):
+            yield line, values
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            raise ImportFileError('The file is empty')
+        yield from _records(header, ((reader.line_num, row) for row in reader))
+    finally:
+        text.detach()
+
+
+def read_xlsx(file):
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f'Not a readable XLSX file: {e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError('The file is empty')
+        yield from _records(header, enumerate(rows, start=2))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """(line number, {field: value}) for every non-empty row of a .csv or .xlsx file"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return read_csv(file)
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx(file)
+    raise ImportFileError('Upload a .csv or .xlsx file')
+
+
+def _choice(value, choices):
+    """Choice code for a code or label (case-insensitive), or the value unchanged"""
+    lowered = str(value).strip().lower()
+    for code, label in choices:
+        if lowered in (code.lower(), label.lower()):
+            return code
+    return value
+
+
+def build_employee(values):
+    """Unsaved Employee for one row, or raise ValidationError"""
+    data = {field: value for field, value in values.items() if field != 'supervisor' and value != ''}
+    if 'department' in data:
+        data['department'] = _choice(data['department'], Employee.DEPARTMENT_CHOICES)
+    if 'status' in data:
+        data['status'] = _choice(data['status'], Employee.STATUS_CHOICES)
+    for field in ('id_no', 'phone'):
+        if field in data:
+            data[field] = str(data[field])
+
+    employee = Employee(**data)
+    errors = {}
+    try:
+        employee.clean_fields(exclude=['supervisor'])
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    try:
+        employee.clean()
+    except ValidationError as e:
+        for field, messages in e.message_dict.items():
+            errors.setdefault(field, []).extend(messages)
+    if errors:
+        raise ValidationError(errors)
+    return employee
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_employees(rows, user=None, dry_run=False, skip_invalid=False, batch_size=500):
+    """
+    Validate and insert the employees of `rows` (from read_rows()).
+
+    Nothing is inserted when any row is invalid, unless `skip_invalid` is set.
+    Returns {'created', 'valid', 'errors': [{'row', 'id_no', 'errors'}], 'dry_run'}.
+    """
+    seen = set()
+    rejected = {}  # Employee ID -> row, for rows of the file that are not imported
+    known = {}  # Employee ID -> pk of a possible supervisor (None on a dry run)
+    waiting = {}  # Employee ID of a later row of the file -> rows it supervises
+    created = []
+    errors = []
+    result = {'created': 0, 'valid': 0, 'errors': errors, 'dry_run': dry_run}
+
+    def release(ready, link=True):
+        """Insert the rows whose supervisor exists, then the rows waiting for them"""
+        while ready:
+            batch, ready = ready[:batch_size], ready[batch_size:]
+            result['valid'] += len(batch)
+            inserting = not dry_run and (skip_invalid or not errors)
+            if inserting:
+                for _, employee, supervisor in batch:
+                    if link and supervisor:
+                        employee.supervisor_id = known[supervisor]
+                Employee.objects.bulk_create([employee for _, employee, _ in batch])
+                with audit.batch(batch_size):
+                    for _, employee, _ in batch:
+                        audit.record(
+                            'CREATE',
+                            employee,
+                            user=user,
+                            new_values={field: getattr(employee, field) for field in AUDIT_FIELDS},
+                            description=f"Employee {employee.name} was created (import)",
+                        )
+                created.extend(employee.pk for _, employee, _ in batch)
+            for _, employee, _ in batch:
+                known[employee.id_no] = employee.pk if inserting else None
+                ready.extend(waiting.pop(employee.id_no, ()))
+
+    with transaction.atomic():
+        # Rows are validated and inserted one chunk at a time; a row whose
+        # supervisor is a later row of the file waits until that row is in.
+        for chunk in _chunks(rows, batch_size):
+            ids = {str(values.get('id_no', '')) for _, values in chunk} - seen
+            existing = set(Employee.objects.filter(id_no__in=ids).values_list('id_no', flat=True))
+
+            valid = []
+            for line, values in chunk:
+                try:
+                    employee = build_employee(values)
+                    if employee.id_no in seen:
+                        raise ValidationError({'id_no': ['Employee ID appears more than once in the file']})
+                    if employee.id_no in existing:
+                        raise ValidationError({'id_no': ['Employee ID already exists']})
+                except ValidationError as e:
+                    errors.append({'row': line, 'id_no': values.get('id_no', ''), 'errors': e.message_dict})
+                    rejected.setdefault(str(values.get('id_no', '')), line)
+                    continue
+                seen.add(employee.id_no)
+                supervisor = str(values.get('supervisor', '') or '')
+                valid.append((line, employee, '' if supervisor == employee.id_no else supervisor))
+
+            # Supervisors that are existing employees: one query per chunk
+            lookup = {supervisor for _, _, supervisor in valid if supervisor} - seen - set(known)
+            known.update(Employee.objects.filter(id_no__in=lookup).values_list('id_no', 'pk'))
+
+            ready = []
+            for item in valid:
+                if not item[2] or item[2] in known:
+                    ready.append(item)
+                else:
+                    waiting.setdefault(item[2], []).append(item)
+            release(ready)
+
+        # Rows still waiting: their supervisor is unknown or not imported, so
+        # they are dropped too, following the reporting chains down the file.
+        unresolved = [supervisor for supervisor in waiting if supervisor not in seen]
+        while unresolved:
+            supervisor = unresolved.pop()
+            for line, employee, _ in waiting.pop(supervisor, ()):
+                if supervisor in rejected:
+                    message = f'Supervisor {supervisor} (row {rejected[supervisor]}) is not imported'
+                else:
+                    message = f'Unknown Employee ID {supervisor}'
+                errors.append({'row': line, 'id_no': employee.id_no, 'errors': {'supervisor': [message]}})
+                rejected[employee.id_no] = line
+                unresolved.append(employee.id_no)
+
+        # What is left supervises itself through a loop of rows: insert it, then link it
+        looped = [item for items in waiting.values() for item in items]
+        waiting.clear()
+        release(looped, link=False)
+        linked = []
+        for _, employee, supervisor in looped:
+            if employee.pk is not None:
+                employee.supervisor_id = known[supervisor]
+                linked.append(employee)
+        if linked:
+            Employee.objects.bulk_update(linked, ['supervisor'], batch_size=batch_size)
+
+        errors.sort(key=lambda error: error['row'])
+        if dry_run or (errors and not skip_invalid):
+            # Chunks inserted before the first invalid row are undone
+            transaction.set_rollback(True)
+            return result
+
+        # bulk_create skips the post_save receivers
+        def refresh():
+            from . import org_chart, search
+            org_chart.invalidate()
+            search.index_employees(created)
+            cache.delete('employee_stats')
+
+        transaction.on_commit(refresh)
+
+    result['created'] = len(created)
+    return result
@@ -0,0 +1,134 @@
+"""
+Streaming table exports (CSV and XLSX).
+
+An export is a queryset plus a list of (header, value function) columns.
+Rows are read with .iterator(chunk_size=...), so only one chunk of model
+instances is in memory at a time:
+
+- CSV is generated row by row into a StreamingHttpResponse.
+- XLSX is written with openpyxl's write-only workbook to a temporary file,
+  which is then streamed back with FileResponse and deleted when closed.
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+import openpyxl
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+
+CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _display(obj, field):
+    return getattr(obj, f'get_{field}_display')() or ''
+
+
+def _name(user):
+    return (user.get_full_name() or user.username) if user else ''
+
+
+EMPLOYEE_COLUMNS = [
+    ('ID', lambda e: e.id),
+    ('Name', lambda e: e.name),
+    ('Employee ID', lambda e: e.id_no),
+    ('Email', lambda e: e.email or ''),
+    ('Department', lambda e: _display(e, 'department')),
+    ('Position', lambda e: e.position or ''),
+    ('Status', lambda e: _display(e, 'status')),
+    ('Task', lambda e: e.task or ''),
+    ('Supervisor', lambda e: e.supervisor.id_no if e.supervisor else ''),  # Employee ID, as the import expects
+    ('Hire Date', lambda e: e.hire_date),
+    ('Created At', lambda e: e.created_at),
+]
+
+ELIGIBILITY_COLUMNS = [
+    ('ID', lambda r: r.id),
+    ('Last Name', lambda r: r.last_name),
+    ('First Name', lambda r: r.first_name),
+    ('M.I.', lambda r: r.middle_initial or ''),
+    ('Email', lambda r: r.email or ''),
+    ('Barangay', lambda r: r.barangay),
+    ('Position Type', lambda r: _display(r, 'position_type')),
+    ('Certifier', lambda r: _display(r, 'certifier')),
+    ('Status', lambda r: _display(r, 'status')),
+    ('Date Submitted', lambda r: r.date_submitted),
+    ('Date Processed', lambda r: r.date_processed),
+    ('Processed By', lambda r: _name(r.approved_by)),
+    ('Archived', lambda r: 'Yes' if r.archived else 'No'),
+]
+
+SUBMISSION_COLUMNS = [
+    ('ID', lambda s: s.id),
+    ('Requirement', lambda s: s.requirement.title),
+    ('Period', lambda s: s.requirement.get_period_display()),
+    ('Barangay', lambda s: s.barangay.name),
+    ('Week', lambda s: s.week_number or ''),
+    ('Year', lambda s: s.year),
+    ('Due Date', lambda s: s.due_date),
+    ('Status', lambda s: _display(s, 'status')),
+    ('Submitted By', lambda s: _name(s.submitted_by)),
+    ('Submitted At', lambda s: s.submitted_at),
+    ('Reviewed By', lambda s: _name(s.reviewed_by)),
+    ('Reviewed At', lambda s: s.reviewed_at),
+    ('Review Notes', lambda s: s.review_notes),
+]
+
+
+def _rows(queryset, columns, chunk_size):
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield [value(obj) for _, value in columns]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, columns, filename, chunk_size=CHUNK_SIZE):
+    """StreamingHttpResponse of `queryset` as CSV"""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow([header for header, _ in columns])
+        for row in _rows(queryset, columns, chunk_size):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _xlsx_value(value):
+    # Excel has no time zones: write aware datetimes as local wall time
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def stream_xlsx(queryset, columns, filename, sheet_title='Sheet1', chunk_size=CHUNK_SIZE):
+    """FileResponse of `queryset` as an XLSX built in write-only mode in a temp file"""
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_title)
+    worksheet.append([header for header, _ in columns])
+    for row in _rows(queryset, columns, chunk_size):
+        worksheet.append([_xlsx_value(value) for value in row])
+
+    # Deleted by the OS as soon as FileResponse closes it
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+def export_response(queryset, columns, name, format_type='csv', sheet_title='Sheet1'):
+    """CSV or XLSX ('excel' / 'xlsx') download named `<name>_<YYYYMMDD>.<ext>`"""
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    if format_type in ('excel', 'xlsx'):
+        return stream_xlsx(queryset, columns, f'{name}_{stamp}.xlsx', sheet_title)
+    return stream_csv(queryset, columns, f'{name}_{stamp}.csv')
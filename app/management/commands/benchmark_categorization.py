@@ -0,0 +1,110 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.categorization import DEFAULT_CONTENT_KEYWORDS, KeywordMatcher, get_matchers
+
+
+FILLER_WORDS = (
+    'republic of the philippines department interior local government lucena city '
+    'quezon province barangay office certify that the above named official has '
+    'rendered service from to records show days performance rating satisfactory'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Measure document categorizer throughput on long OCR-like texts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=1_000_000,
+            help='Length of the generated text in characters (default: 1000000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per method (default: 5)'
+        )
+        parser.add_argument(
+            '--hit-rate',
+            type=float,
+            default=0.01,
+            help='Fraction of words that are real keywords; 0 gives keyword-free text (default: 0.01)'
+        )
+        parser.add_argument(
+            '--extra-keywords',
+            type=int,
+            default=0,
+            help='Add this many random keywords to simulate a larger keyword table'
+        )
+
+    def handle(self, *args, **options):
+        size = options['size']
+        repeat = options['repeat']
+        rng = random.Random(42)
+
+        keyword_sets = {category: list(keywords) for category, keywords in DEFAULT_CONTENT_KEYWORDS.items()}
+        if options['extra_keywords']:
+            letters = 'abcdefghijklmnopqrstuvwxyz '
+            keyword_sets['extra'] = [
+                ''.join(rng.choice(letters) for _ in range(rng.randint(5, 20))).strip() or 'x'
+                for _ in range(options['extra_keywords'])
+            ]
+        else:
+            matcher = get_matchers()[0]
+            keyword_sets = {
+                category: [kw for kw in matcher.keywords if any(c == category for c, _ in matcher.categories[kw])]
+                for category in matcher.category_names
+            }
+        scan_matcher = KeywordMatcher(keyword_sets, strategy='scan')
+        regex_matcher = KeywordMatcher(keyword_sets, strategy='regex')
+        auto_strategy = KeywordMatcher(keyword_sets).strategy
+
+        # OCR-like text: filler words with the occasional real keyword mixed in
+        all_keywords = [kw for keywords in keyword_sets.values() for kw in keywords]
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(all_keywords) if rng.random() < options['hit_rate'] else rng.choice(FILLER_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        text = ' '.join(words)[:size].upper()
+
+        def legacy(text):
+            text_lower = text.lower()
+            return {
+                category: sum(1 for keyword in keywords if keyword in text_lower)
+                for category, keywords in keyword_sets.items()
+            }
+
+        methods = [
+            ('legacy lists', legacy),
+            ('matcher (scan)', scan_matcher.scores),
+            ('matcher (regex)', regex_matcher.scores),
+        ]
+
+        expected = legacy(text)
+        for name, func in methods[1:]:
+            scores = func(text)
+            if scores != expected:
+                self.stdout.write(self.style.ERROR(f'{name} score mismatch: {scores} != {expected}'))
+                return
+
+        self.stdout.write(
+            f'Text: {len(text):,} chars, keywords: {len(regex_matcher.keywords)}, '
+            f'runs: {repeat}, auto strategy: {auto_strategy}'
+        )
+        self.stdout.write(f'Scores: {expected}')
+
+        for name, func in methods:
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(text)
+                best = min(best, time.perf_counter() - start)
+            throughput = len(text) / best / (1024 * 1024)
+            self.stdout.write(f'  {name:<16} {best * 1000:8.2f} ms  {throughput:8.1f} MB/s')
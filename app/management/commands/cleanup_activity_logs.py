@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
-from app.models import AuditLog  
+
+from app import audit, audit_partitions
 
 class Command(BaseCommand):
     help = 'Clean up old activity logs to prevent database bloat'
@@ -30,61 +32,85 @@ class Command(BaseCommand):
         keep_security = options['keep_security']
         
         cutoff_date = timezone.now() - timedelta(days=days_to_keep)
+        security_actions = ['SECURITY_ALERT', 'LOGIN_FAILED', 'UNAUTHORIZED_ACCESS']
         
-        # Base queryset for old logs
-        old_logs = AuditLog.objects.filter(timestamp__lt=cutoff_date)
+        # Months entirely before the cutoff are dropped as whole partitions;
+        # the month containing the cutoff (and unpartitioned rows) row by row
+        drop_before = audit_partitions.month_start(*audit_partitions.month_of(cutoff_date))
+        whole = audit_partitions.months_between(end=drop_before)
+        if keep_security:
+            whole = [
+                month for month in whole
+                if not audit_partitions.partition_model(*month).objects.filter(action__in=security_actions).exists()
+            ]
         
-        # Exclude security logs if requested
+        dropped_models = {audit_partitions.partition_model(*month) for month in whole}
+        old_logs = [
+            queryset for queryset in audit_partitions.query(end=cutoff_date)
+            if queryset.model not in dropped_models
+        ]
         if keep_security:
-            security_actions = ['SECURITY_ALERT', 'LOGIN_FAILED', 'UNAUTHORIZED_ACCESS']
-            old_logs = old_logs.exclude(action__in=security_actions)
+            old_logs = [queryset.exclude(action__in=security_actions) for queryset in old_logs]
         
-        count = old_logs.count()
+        whole_counts = {
+            audit_partitions.table_name(*month): audit_partitions.partition_model(*month).objects.count()
+            for month in whole
+        }
+        count = sum(whole_counts.values()) + sum(queryset.count() for queryset in old_logs)
         
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(f'DRY RUN: Would delete {count} activity logs older than {days_to_keep} days')
             )
             
+            for table, rows in whole_counts.items():
+                self.stdout.write(f"  Would drop partition {table} ({rows} logs)")
+            
             # Show breakdown by action type
-            from django.db.models import Count
-            breakdown = old_logs.values('action').annotate(count=Count('id')).order_by('-count')
+            breakdown = {}
+            for queryset in old_logs:
+                for item in queryset.values('action').annotate(count=Count('id')).order_by():
+                    breakdown[item['action']] = breakdown.get(item['action'], 0) + item['count']
             
-            self.stdout.write('\nBreakdown by action type:')
-            for item in breakdown:
-                self.stdout.write(f"  {item['action']}: {item['count']}")
+            self.stdout.write('\nBreakdown by action type (outside dropped partitions):')
+            for action, action_count in sorted(breakdown.items(), key=lambda item: -item[1]):
+                self.stdout.write(f"  {action}: {action_count}")
         
         else:
             if count == 0:
                 self.stdout.write(self.style.SUCCESS('No old activity logs to delete'))
                 return
             
-            # Delete in batches to avoid memory issues
-            batch_size = 1000
             deleted_total = 0
-            
-            while old_logs.exists():
-                batch_ids = list(old_logs.values_list('id', flat=True)[:batch_size])
-                deleted_count = AuditLog.objects.filter(id__in=batch_ids).delete()[0]
-                deleted_total += deleted_count
-                
+            for month in whole:
+                deleted_total += sum(audit_partitions.drop_month(*month).values())
                 self.stdout.write(f'Deleted {deleted_total}/{count} logs...', ending='\r')
             
+            # Delete the rest in batches to avoid memory issues
+            batch_size = 1000
+            for queryset in old_logs:
+                while True:
+                    batch_ids = list(queryset.values_list('id', flat=True)[:batch_size])
+                    if not batch_ids:
+                        break
+                    deleted_total += queryset.model.objects.filter(id__in=batch_ids).delete()[0]
+                    self.stdout.write(f'Deleted {deleted_total}/{count} logs...', ending='\r')
+            
             self.stdout.write(
                 self.style.SUCCESS(f'\nSuccessfully deleted {deleted_total} activity logs older than {days_to_keep} days')
             )
             
             # Log the cleanup activity
             try:
-                AuditLog.objects.create(
-                    action='MAINTENANCE',
+                audit.record(
+                    'MAINTENANCE',
                     description=f'Cleaned up {deleted_total} old activity logs (older than {days_to_keep} days)',
                     new_values={
                         'deleted_count': deleted_total,
+                        'dropped_partitions': list(whole_counts),
                         'cutoff_date': cutoff_date.isoformat(),
                         'kept_security_logs': keep_security
                     }
                 )
             except:
                 pass  # Don't fail if logging the cleanup fails
-
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.management.workers import init_worker
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date (expected YYYY-MM-DD): {value}')
+
+
+class Command(BaseCommand):
+    help = 'Generate certificates for approved eligibility requests across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Eligibility request IDs (default: all approved)')
+        parser.add_argument('--from', dest='date_from', help='Only requests approved on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Only requests approved on or before this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Skip requests that already have a certificate'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: all cores)'
+        )
+        parser.add_argument(
+            '--bundle',
+            choices=['pdf', 'zip'],
+            help='Also save one merged PDF or a ZIP of all certificates for printing'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the certificates that would be generated'
+        )
+
+    def handle(self, *args, **options):
+        from app.certificates import batch_queryset, generate_certificates, get_template
+
+        queryset = batch_queryset(
+            ids=options['ids'],
+            date_from=parse_date(options['date_from']) if options['date_from'] else None,
+            date_to=parse_date(options['date_to']) if options['date_to'] else None,
+            missing_only=options['missing_only'],
+        )
+        eligibility_requests = list(queryset)
+        self.stdout.write(f'{len(eligibility_requests)} certificates to generate')
+        if options['dry_run'] or not eligibility_requests:
+            return
+
+        def progress(done, total):
+            self.stdout.write(f'Generated {done}/{total} certificates...', ending='\r')
+
+        workers = max(1, min(options['workers'], len(eligibility_requests)))
+        if workers == 1:
+            result = generate_certificates(eligibility_requests, bundle=options['bundle'], progress=progress)
+        else:
+            # Build the templates before forking so every worker inherits them, and
+            # close DB connections so no process shares the parent's SQLite handle
+            for position_type in {er.position_type for er in eligibility_requests}:
+                get_template(position_type)
+            connections.close_all()
+
+            chunksize = max(1, min(20, len(eligibility_requests) // (workers * 4) or 1))
+            with Pool(workers, initializer=init_worker) as pool:
+                result = generate_certificates(
+                    eligibility_requests,
+                    bundle=options['bundle'],
+                    progress=progress,
+                    render=lambda func, items: pool.imap_unordered(func, items, chunksize=chunksize),
+                )
+
+        for failure in result['failed']:
+            self.stdout.write(self.style.WARNING(f"Failed request #{failure['id']}: {failure['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"\nGenerated {len(result['generated'])} certificates, {len(result['failed'])} failed"
+        ))
+        if result['bundle']:
+            self.stdout.write(f"Bundle saved to {result['bundle']}")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Import employees from a CSV or XLSX roster (header row with at least Name and Employee ID)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the .csv or .xlsx file')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file')
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Insert the valid rows even when some rows fail validation'
+        )
+
+    def handle(self, *args, **options):
+        from app.employee_import import ImportFileError, import_employees, read_rows
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_employees(
+                    read_rows(file, options['path']),
+                    dry_run=options['dry_run'],
+                    skip_invalid=options['skip_invalid'],
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            messages = '; '.join(f'{field}: {" ".join(text)}' for field, text in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"  Row {error['row']} ({error['id_no']}): {messages}"))
+
+        if result['dry_run']:
+            self.stdout.write(f"{result['valid']} valid rows, {len(result['errors'])} invalid (dry run, nothing imported)")
+        elif result['errors'] and not result['created']:
+            raise CommandError(
+                f"{len(result['errors'])} invalid rows; nothing imported (fix them or use --skip-invalid)"
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {result['created']} employees"))
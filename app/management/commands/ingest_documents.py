@@ -0,0 +1,239 @@
+import hashlib
+import mimetypes
+import os
+from multiprocessing import Pool
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from app.management.workers import init_worker
+
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff'}
+
+PROGRESS_FILENAME = '.ingest_progress'
+
+
+def scan_directory(root):
+    """Yield (absolute path, path relative to root) for every supported file, using os.scandir"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield entry.path, os.path.relpath(entry.path, root)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_copy(path, category, digest):
+    """
+    Copy a scanned file into media storage under a name derived from its hash.
+
+    A run that crashed after copying leaves the same name behind, so the
+    resumed run reuses that copy instead of adding another one; duplicate
+    files share a single copy too.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    target = f"certification_files/{category}/ingested/{digest}{extension}"
+    if default_storage.exists(target):
+        if default_storage.size(target) == os.path.getsize(path):
+            return target
+        default_storage.delete(target)  # partial copy from an interrupted run
+    with open(path, 'rb') as handle:
+        return default_storage.save(target, File(handle, name=os.path.basename(path)))
+
+
+def categorize_path(job):
+    """
+    Worker: categorize one scanned file and copy it into media storage.
+
+    Runs in a pool process, so it returns plain data and never touches the
+    database; the parent process writes the rows.
+    """
+    path, relative_path = job
+    from app.views import categorize_file_with_text
+
+    try:
+        with open(path, 'rb') as handle:
+            category, text = categorize_file_with_text(File(handle, name=os.path.basename(path)))
+        digest = file_hash(path)
+        stored_path = store_copy(path, category, digest)
+
+        mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mime_type.startswith('image/'):
+            file_type = 'image'
+        elif mime_type == 'application/pdf':
+            file_type = 'pdf'
+        elif mime_type.startswith('application/'):
+            file_type = 'document'
+        else:
+            file_type = 'other'
+
+        return {
+            'relative_path': relative_path,
+            'stored_path': stored_path,
+            'hash': digest,
+            'category': category,
+            'text': text,
+            'file_size': os.path.getsize(path),
+            'mime_type': mime_type,
+            'file_type': file_type,
+        }
+    except Exception as e:
+        return {'relative_path': relative_path, 'error': str(e)}
+
+
+class Command(BaseCommand):
+    help = 'Bulk-ingest a folder of scanned documents into categorized files (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Folder with scanned documents (searched recursively)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: all cores)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Rows inserted per bulk_create batch (default: 200)'
+        )
+        parser.add_argument(
+            '--progress-file',
+            help=f'File recording ingested paths, used to resume (default: <directory>/{PROGRESS_FILENAME})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the files that would be ingested'
+        )
+
+    def handle(self, *args, **options):
+        from app.categorization import get_matchers
+
+        root = os.path.abspath(options['directory'])
+        if not os.path.isdir(root):
+            raise CommandError(f'Not a directory: {root}')
+
+        progress_path = options['progress_file'] or os.path.join(root, PROGRESS_FILENAME)
+        done = set()
+        if os.path.exists(progress_path):
+            with open(progress_path, encoding='utf-8') as progress:
+                done = {line.rstrip('\n') for line in progress if line.strip()}
+
+        jobs = [job for job in scan_directory(root) if job[1] not in done]
+        self.stdout.write(f'{len(jobs)} files to ingest ({len(done)} already done)')
+        if options['dry_run'] or not jobs:
+            return
+
+        # Load the keyword matchers before forking so workers inherit them, and
+        # close DB connections so no process shares the parent's SQLite handle
+        get_matchers()
+        connections.close_all()
+
+        self.categories = {}
+        ingested = failed = 0
+        batch = []
+
+        with open(progress_path, 'a', encoding='utf-8') as progress, \
+                Pool(options['workers'], initializer=init_worker) as pool:
+            chunksize = max(1, min(50, len(jobs) // (options['workers'] * 4) or 1))
+            for result in pool.imap_unordered(categorize_path, jobs, chunksize=chunksize):
+                if 'error' in result:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"Failed {result['relative_path']}: {result['error']}"))
+                    continue
+
+                batch.append(result)
+                if len(batch) >= options['batch_size']:
+                    ingested += self.write_batch(batch, progress)
+                    batch = []
+                    self.stdout.write(f'Ingested {ingested}/{len(jobs)} files...', ending='\r')
+
+            if batch:
+                ingested += self.write_batch(batch, progress)
+
+        for category in self.categories.values():
+            category.update_file_count()
+
+        self.stdout.write(self.style.SUCCESS(f'\nIngested {ingested} files, {failed} failed'))
+
+    def write_batch(self, results, progress):
+        """
+        Insert one batch of CategorizedFile rows and record it as done.
+
+        Files are keyed by source_hash: rows already inserted by an earlier,
+        interrupted run (or a duplicate file in this one) are skipped, so a
+        crash between the insert and the progress write cannot duplicate rows.
+        """
+        from app import search
+        from app.models import CategorizedFile, FileCategory
+
+        hashes = {result['hash'] for result in results}
+        existing = set(CategorizedFile.objects.filter(source_hash__in=hashes).values_list('source_hash', flat=True))
+
+        rows = []
+        seen = set(existing)
+        now = timezone.now()
+        for result in results:
+            if result['hash'] in seen:
+                continue
+            seen.add(result['hash'])
+
+            name = result['category']
+            if name not in self.categories:
+                self.categories[name] = FileCategory.objects.get_or_create(
+                    name=name,
+                    defaults={
+                        'display_name': name.replace('_', ' ').title(),
+                        'folder_path': f'certification_files/{name}/'
+                    }
+                )[0]
+
+            folder = os.path.dirname(result['relative_path'])
+            rows.append(CategorizedFile(
+                file=result['stored_path'],
+                original_filename=os.path.basename(result['relative_path'])[:255],
+                file_type=result['file_type'],
+                file_size=result['file_size'],
+                mime_type=result['mime_type'],
+                category=self.categories[name],
+                source='manual',
+                detected_content='Scanned Document',
+                tags=f"Ingested, {folder}"[:500] if folder else 'Ingested',
+                extracted_text=result['text'],
+                text_extracted_at=now,
+                source_hash=result['hash'],
+            ))
+
+        with transaction.atomic():
+            CategorizedFile.objects.bulk_create(rows, ignore_conflicts=True)
+
+        # bulk_create skips post_save (and gives no pks with ignore_conflicts),
+        # so look the new rows up to index them
+        new_hashes = [row.source_hash for row in rows]
+        search.index_files(CategorizedFile.objects.filter(source_hash__in=new_hashes).values_list('pk', flat=True))
+
+        progress.writelines(result['relative_path'] + '\n' for result in results)
+        progress.flush()
+        return len(rows)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from app import audit_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Move audit log entries from app_auditlog into the monthly partition tables, '
+        'create the partitions of this month and the next, and bring their indexes up to date'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Entries moved per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        moved = audit_partitions.move_legacy(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} audit log entries into monthly partitions'))
+
+        # Created here so the buffered audit writer never has to run the DDL
+        audit_partitions.ensure_ahead()
+
+        indexes = audit_partitions.add_missing_indexes()
+        if indexes:
+            self.stdout.write(self.style.SUCCESS(f'Added {indexes} missing indexes to existing partitions'))
+
+        for year, month in audit_partitions.existing():
+            count = audit_partitions.partition_model(year, month).objects.count()
+            self.stdout.write(f'  {audit_partitions.table_name(year, month)}: {count}')
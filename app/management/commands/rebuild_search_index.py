@@ -0,0 +1,95 @@
+from django.core.files.base import File
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from app import search
+from app.models import CategorizedFile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes (files, requirement submissions, employees, applicants)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--extract-text',
+            action='store_true',
+            help='Extract PDF text / OCR images not tried yet before indexing'
+        )
+        parser.add_argument(
+            '--extract-only',
+            action='store_true',
+            help='Only extract text for files not tried yet and index those files '
+                 '(cheap enough to run from cron after uploads)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Rows saved per batch when extracting text (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        if not search.create_indexes():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5; nothing to do'))
+            return
+
+        if options['extract_only']:
+            # bulk_update skips the post_save receivers, so index the files here
+            search.index_files(self.extract_missing_text(options['batch_size']))
+            return
+
+        if options['extract_text']:
+            self.extract_missing_text(options['batch_size'])
+
+        search.rebuild()
+
+        for index in search.INDEXES:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {index}")
+                count = cursor.fetchone()[0]
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} rows into {index}'))
+
+    def extract_missing_text(self, batch_size):
+        """
+        Fill extracted_text for PDFs and images not tried yet; returns the ids given text.
+
+        Every attempt is stamped in text_extracted_at, including files that
+        yield no text or cannot be read, so they are not OCR'd again on the
+        next run. Clear the stamp to have a file tried again.
+        """
+        from app.views import extract_text_from_file
+
+        files = CategorizedFile.objects.filter(
+            text_extracted_at__isnull=True,
+            file_type__in=['image', 'pdf']
+        ).only('id', 'file')
+
+        batch = []
+        done = []
+        tried = 0
+
+        def save(batch):
+            CategorizedFile.objects.bulk_update(batch, ['extracted_text', 'text_extracted_at'])
+            done.extend(categorized.pk for categorized in batch if categorized.extracted_text)
+
+        for categorized in files.iterator(chunk_size=batch_size):
+            categorized.extracted_text = ''
+            try:
+                with categorized.file.open('rb') as handle:
+                    categorized.extracted_text = extract_text_from_file(File(handle, name=categorized.file.name))
+            except (OSError, ValueError) as e:
+                self.stdout.write(self.style.WARNING(f'Skipped {categorized.file.name}: {e}'))
+
+            categorized.text_extracted_at = timezone.now()
+            batch.append(categorized)
+            tried += 1
+            if len(batch) >= batch_size:
+                save(batch)
+                batch = []
+                self.stdout.write(f'Extracted text for {len(done)} of {tried} files...', ending='\r')
+
+        if batch:
+            save(batch)
+        self.stdout.write(self.style.SUCCESS(f'Extracted text for {len(done)} of {tried} files'))
+        return done
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the submissions of upcoming periods for every active recurring requirement. '
+        'Safe to run repeatedly; meant to run daily (e.g. from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help='Materialize periods starting on or before this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--lookahead-days',
+            type=int,
+            default=7,
+            help='When --until is not given, schedule periods starting within this many days (default: 7)'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Also create submissions for periods that already ended'
+        )
+        parser.add_argument('--requirement', type=int, action='append', help='Only schedule this requirement ID (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be created')
+
+    def handle(self, *args, **options):
+        from app.models import Requirement
+        from app.provisioning import schedule_requirements
+
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date (expected YYYY-MM-DD): {options['until']}")
+        else:
+            until = timezone.localdate() + timedelta(days=options['lookahead_days'])
+
+        requirements = Requirement.objects.filter(is_active=True)
+        if options['requirement']:
+            requirements = requirements.filter(pk__in=options['requirement'])
+
+        scheduled = schedule_requirements(
+            until=until,
+            backfill=options['backfill'],
+            dry_run=options['dry_run'],
+            requirements=requirements,
+        )
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        for requirement, count in scheduled.items():
+            self.stdout.write(f'  {requirement}: {count} submissions')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sum(scheduled.values())} submissions for {len(scheduled)} requirements through {until}'
+        ))
@@ -0,0 +1,12 @@
+"""
+Helpers shared by the management commands that fan work out to a
+multiprocessing Pool (ingest_documents, generate_certificates).
+"""
+
+
+def init_worker():
+    """Make Django usable in worker processes (needed on spawn platforms like Windows)"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
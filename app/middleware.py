@@ -44,4 +44,50 @@ class RequestLoggerMiddleware(MiddlewareMixin):
             
             print("📤"*40 + "\n")
         
-        return response
\ No newline at end of file
+        return response
+
+def load_profile(user):
+    """`user`'s UserProfile with its barangay (one query), or None"""
+    if not user.is_authenticated:
+        return None
+    from .models import UserProfile
+    profile = UserProfile.objects.select_related('barangay').filter(user_id=user.pk).first()
+    if profile is None:
+        # Cache the miss too: hasattr(user, 'userprofile') is then False without a query
+        UserProfile.user.field.remote_field.set_cached_value(user, None)
+    else:
+        # Also caches the profile as user.userprofile
+        profile.user = user
+    return profile
+
+
+def attach_profile(request):
+    """Load the current user's profile into request.profile, remembering whose it is"""
+    request.profile = load_profile(request.user)
+    request._profile_user_id = request.user.pk
+    return request.profile
+
+
+def get_profile(request):
+    """
+    The profile attached by UserProfileMiddleware, loaded here when the
+    middleware did not run or the user changed since (login / logout).
+    """
+    if getattr(request, '_profile_user_id', False) != request.user.pk:
+        return attach_profile(request)
+    return request.profile
+
+
+class UserProfileMiddleware(MiddlewareMixin):
+    """
+    Loads the signed-in user's profile once per request.
+
+    It is attached as request.profile (None for anonymous users or users
+    without one) and cached on request.user, so request.user.userprofile in
+    the views, role_required and the context processors all reuse it, along
+    with profile.barangay, instead of querying again.
+    """
+
+    def process_request(self, request):
+        attach_profile(request)
+        return None
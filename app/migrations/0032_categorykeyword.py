@@ -0,0 +1,93 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# Keyword lists as they were when this migration was written; later edits to
+# app/categorization.py must not change what this migration seeds.
+CONTENT_KEYWORDS = {
+    'appointive_certificates': [
+        'appointive official',
+        'appointive position',
+        'date of appointment',
+        'appointing authority',
+        'appointing punong barangay',
+        'barangay secretary',
+        'barangay treasurer',
+        'appointment',
+        'csc-erpo boe form 1(b)',
+    ],
+    'elective_certificates': [
+        'elective official',
+        'elective position',
+        'date of election',
+        'term of office',
+        'punong barangay',
+        'sanguniang barangay member',
+        'elected',
+        'election',
+        'csc-erpo boe form 1(a)',
+    ],
+    'ids': [
+        'identification',
+        'id card',
+        'government issued id',
+        'driver',
+        'passport',
+        'sss',
+        'philhealth',
+        'tin',
+        'voter',
+    ],
+    'signatures': [
+        'signature',
+        'sign here',
+        'e-signature',
+    ],
+}
+
+FILENAME_KEYWORDS = {
+    'ids': [('id_front', 5), ('id_back', 5), ('identification', 5), ('_id_', 5)],
+    'signatures': [('signature', 5), ('sign', 5), ('esign', 5)],
+    'appointive_certificates': [('appointive', 3)],
+    'elective_certificates': [('elective', 3)],
+}
+
+
+def seed_keywords(apps, schema_editor):
+    """Copy the built-in keyword lists into the table so they can be edited"""
+    CategoryKeyword = apps.get_model('app', 'CategoryKeyword')
+    rows = []
+    for category, keywords in CONTENT_KEYWORDS.items():
+        for keyword in keywords:
+            rows.append(CategoryKeyword(category=category, keyword=keyword, scope='content', weight=1))
+    for category, keywords in FILENAME_KEYWORDS.items():
+        for keyword, weight in keywords:
+            rows.append(CategoryKeyword(category=category, keyword=keyword, scope='filename', weight=weight))
+    CategoryKeyword.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0031_merge_20251206_0835'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('appointive_certificates', 'Appointive Certificates'), ('elective_certificates', 'Elective Certificates'), ('ids', 'Identification Documents'), ('signatures', 'Signatures')], max_length=50)),
+                ('keyword', models.CharField(max_length=100)),
+                ('scope', models.CharField(choices=[('content', 'Document Text'), ('filename', 'Filename')], default='content', max_length=10)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['scope', 'category', 'keyword'],
+                'unique_together': {('scope', 'category', 'keyword')},
+            },
+        ),
+        migrations.RunPython(seed_keywords, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations, models
+
+
+# The index definitions as of this migration, written out so later changes
+# to app/search.py do not change what it creates.
+INDEXES = {
+    'app_categorizedfile_fts': {
+        'columns': 'original_filename, detected_content, tags, extracted_text',
+        'select': (
+            'SELECT f.id, f.original_filename, f.detected_content, f.tags, f.extracted_text '
+            'FROM app_categorizedfile f'
+        ),
+    },
+    'app_requirementsubmission_fts': {
+        'columns': 'title, description, barangay, update_text',
+        'select': (
+            'SELECT s.id, r.title, r.description, b.name, s.update_text '
+            'FROM app_requirementsubmission s '
+            'JOIN app_requirement r ON r.id = s.requirement_id '
+            'JOIN app_barangay b ON b.id = s.barangay_id'
+        ),
+    },
+}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for index, spec in INDEXES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{spec['columns']}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(f"DELETE FROM {index}")
+            cursor.execute(f"INSERT INTO {index}(rowid, {spec['columns']}) {spec['select']}")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f"DROP TABLE IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0032_categorykeyword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorizedfile',
+            name='extracted_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_categorizedfile_extracted_text_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requirement',
+            name='scheduled_through',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
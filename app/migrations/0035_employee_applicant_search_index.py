@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+# The index definitions as of this migration, written out so later changes
+# to app/search.py do not change what it creates.
+INDEXES = {
+    'app_employee_fts': {
+        'columns': 'name, id_no, email, position, department, task',
+        'select': (
+            "SELECT e.id, e.name, e.id_no, COALESCE(e.email, ''), COALESCE(e.position, ''), "
+            "COALESCE(e.department, '') || ' ' || CASE e.department "
+            "WHEN 'admin' THEN 'Administration' "
+            "WHEN 'hr' THEN 'Human Resources' "
+            "WHEN 'finance' THEN 'Finance' "
+            "WHEN 'operations' THEN 'Operations' "
+            "WHEN 'it' THEN 'Information Technology' "
+            "ELSE '' END, "
+            "COALESCE(e.task, '') "
+            "FROM app_employee e"
+        ),
+    },
+    'app_eligibilityrequest_fts': {
+        'columns': 'name, barangay, email',
+        'select': (
+            "SELECT r.id, r.first_name || ' ' || COALESCE(r.middle_initial, '') || ' ' || r.last_name, "
+            "r.barangay, COALESCE(r.email, '') "
+            "FROM app_eligibilityrequest r"
+        ),
+    },
+}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for index, spec in INDEXES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{spec['columns']}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(f"DELETE FROM {index}")
+            cursor.execute(f"INSERT INTO {index}(rowid, {spec['columns']}) {spec['select']}")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f"DROP TABLE IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0034_requirement_scheduled_through'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0037_auditlog_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorizedfile',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
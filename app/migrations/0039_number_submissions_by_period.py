@@ -0,0 +1,69 @@
+"""
+Number the submissions made on requirement creation like the scheduled ones.
+
+Creation used to number weekly submissions 1-4 counting from the creation
+week and leave week_number empty for the other periods, while the scheduler
+stores the ISO week, month, quarter, half or 1 (annual) within the year.
+This renumbers the old rows to the period they were made for:
+
+- weekly rows numbered 1-4 and created the same day as their requirement
+  get the ISO week of creation plus (number - 1) weeks;
+- rows without a number get the period containing their creation date.
+
+Rows whose new number is already taken keep their old one.
+"""
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+PERIOD_MONTHS = {'monthly': 1, 'quarterly': 3, 'semestral': 6, 'annually': 12}
+
+
+def period_number(period, day):
+    if period == 'weekly':
+        year, week, _ = day.isocalendar()
+        return week, year
+    return (day.month - 1) // PERIOD_MONTHS.get(period, 12) + 1, day.year
+
+
+def renumber(apps, schema_editor):
+    RequirementSubmission = apps.get_model('app', 'RequirementSubmission')
+
+    taken = set(
+        RequirementSubmission.objects.filter(week_number__isnull=False)
+        .values_list('requirement_id', 'barangay_id', 'week_number', 'year')
+    )
+    rows = RequirementSubmission.objects.select_related('requirement').filter(week_number__isnull=True)
+    weekly = RequirementSubmission.objects.select_related('requirement').filter(
+        requirement__period='weekly', week_number__lte=4,
+    ).order_by('-week_number')  # week 4 first, so each row moves into a freed number
+
+    for submission in list(rows) + list(weekly):
+        requirement = submission.requirement
+        created = timezone.localdate(submission.created_at)
+        if submission.week_number is None:
+            number, year = period_number(requirement.period, created)
+        elif requirement.period == 'weekly' and created == timezone.localdate(requirement.created_at):
+            number, year = period_number('weekly', created + timedelta(weeks=submission.week_number - 1))
+        else:
+            continue
+
+        key = (submission.requirement_id, submission.barangay_id, number, year)
+        if (number, year) == (submission.week_number, submission.year) or key in taken:
+            continue
+        taken.discard((submission.requirement_id, submission.barangay_id, submission.week_number, submission.year))
+        taken.add(key)
+        RequirementSubmission.objects.filter(pk=submission.pk).update(week_number=number, year=year)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0038_categorizedfile_source_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0039_number_submissions_by_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='calendar_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
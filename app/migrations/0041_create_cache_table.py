@@ -0,0 +1,23 @@
+"""
+Create the table of the shared database cache (settings.CACHES).
+
+createcachetable skips tables that already exist, so this is safe on
+databases where the command was run by hand.
+"""
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0040_userprofile_calendar_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_extracted(apps, schema_editor):
+    # Files that already have text are done; the others get one more try
+    CategorizedFile = apps.get_model('app', 'CategorizedFile')
+    CategorizedFile.objects.exclude(extracted_text='').update(text_extracted_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0041_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorizedfile',
+            name='text_extracted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_extracted, migrations.RunPython.noop),
+    ]
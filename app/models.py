@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
@@ -7,6 +8,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save, pre_delete, post_delete
+import secrets
 import threading, traceback
 from django.core.mail import send_mail
 from django.conf import settings
@@ -15,6 +17,67 @@ from django.dispatch import receiver
 import os
 
 
+class TrackedFieldsMixin:
+    """
+    Remembers the values of `tracked_fields` as loaded from the database, so
+    signal handlers can tell what changed without re-reading the row.
+
+    The snapshot is taken in from_db() and refreshed after every save(), so
+    pre_save/post_save handlers compare against the stored values. Tracked
+    fields that were deferred (or an instance built in memory) are read from
+    the row before it is written.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self, fields=None):
+        # Deferred fields are missing from __dict__ and are left out
+        names = self.tracked_fields if fields is None else [name for name in self.tracked_fields if name in fields]
+        values = {name: self.__dict__[name] for name in names if name in self.__dict__}
+        if fields is None:
+            self._loaded_values = values
+        else:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **values}
+
+    def _load_missing(self):
+        """Read the stored value of tracked fields missing from the snapshot"""
+        loaded = getattr(self, '_loaded_values', {})
+        missing = [name for name in self.tracked_fields if name not in loaded]
+        if missing and not self._state.adding and self.pk is not None:
+            row = type(self)._base_manager.filter(pk=self.pk).values(*missing).first()
+            self._loaded_values = {**(row or {}), **loaded}
+
+    def old_value(self, field):
+        """Value of `field` when the instance was loaded (None for new instances)"""
+        if self._state.adding or self.pk is None:
+            return None
+        if field not in getattr(self, '_loaded_values', {}):
+            self._load_missing()
+        return self._loaded_values.get(field)
+
+    def has_changed(self, field):
+        """True if `field` differs from the stored value (always True for new instances)"""
+        if self._state.adding or self.pk is None:
+            return True
+        return self.old_value(field) != getattr(self, field)
+
+    def save(self, *args, **kwargs):
+        # Afterwards the row holds the new values, so read any missing old ones now
+        self._load_missing()
+        super().save(*args, **kwargs)
+        self._snapshot()
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Loading a deferred field must not reset the snapshot of the others
+        self._snapshot(fields)
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -33,7 +96,8 @@ class AuditLog(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is recorded; audit.py may write it a little later
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
@@ -52,6 +116,7 @@ class AuditLog(models.Model):
     class Meta:
         ordering = ['-timestamp']
         indexes = [
+            models.Index(fields=['timestamp']),
             models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['action', 'timestamp']),
             models.Index(fields=['content_type', 'object_id']),
@@ -136,16 +201,19 @@ class Employee(models.Model):
     
     @property
     def subordinate_count(self):
-        """Count direct subordinates"""
-        return self.subordinates.count()
+        """Count direct subordinates (from prefetched subordinates or the cached org tree)"""
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('subordinates')
+        if prefetched is not None:
+            return len(prefetched)
+        from .org_chart import get_tree
+        return get_tree().direct_count(self.pk)
     
     def get_all_subordinates(self):
-        """Get all subordinates recursively"""
-        subordinates = []
-        for subordinate in self.subordinates.all():
-            subordinates.append(subordinate)
-            subordinates.extend(subordinate.get_all_subordinates())
-        return subordinates
+        """Get all subordinates at any depth, depth first (two queries at most)"""
+        from .org_chart import get_tree
+        ids = get_tree().subtree_ids(self.pk)
+        employees = Employee.objects.in_bulk(ids)
+        return [employees[pk] for pk in ids if pk in employees]
     
     @classmethod
     def get_by_department(cls, department):
@@ -185,15 +253,23 @@ def employee_post_save(sender, instance, created, **kwargs):
         'task': instance.task,
     }
     
-    AuditLog.objects.create(
-        action=action,
-        content_object=instance,
+    from . import audit
+    audit.record(
+        action,
+        instance,
         old_values=old_values,
         new_values=new_values,
         description=f"Employee {instance.name} was {'created' if created else 'updated'}"
     )
 
 
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_org_tree(sender, instance, **kwargs):
+    from . import org_chart
+    transaction.on_commit(org_chart.invalidate)
+
+
 @receiver(pre_delete, sender=Employee)
 def employee_pre_delete(sender, instance, **kwargs):
     """Store values before deletion"""
@@ -210,8 +286,11 @@ def employee_pre_delete(sender, instance, **kwargs):
 @receiver(post_delete, sender=Employee)
 def employee_post_delete(sender, instance, **kwargs):
     """Log employee deletion"""
-    AuditLog.objects.create(
-        action='DELETE',
+    from . import audit
+    audit.record(
+        'DELETE',
+        model=Employee,
+        object_id=instance.pk,
         old_values=getattr(instance, '_pre_delete_values', {}),
         description=f"Employee {instance.name} was deleted"
     )
@@ -229,6 +308,44 @@ def get_client_ip(request):
 
 # app/models.py
 
+# Permissions of each role, checked by UserProfile.has_permission()
+ROLE_PERMISSIONS = {
+    'dilg staff': frozenset([
+        # DILG Staff has ALL permissions (they are the admin)
+        'view_dashboard',
+        'manage_users',
+        'approve_requests',
+        'reject_requests',
+        'view_all_requests',
+        'view_reports',
+        'manage_settings',
+        'manage_requirements',
+        'view_all_barangays',
+        'manage_announcements',
+        'delete_requests',
+        'archive_requests',
+        'manage_roles',
+        'view_audit_logs',
+    ]),
+    'municipal officer': frozenset([
+        # Municipal officers can view and monitor, but not manage system
+        'view_dashboard',
+        'view_all_requests',
+        'view_reports',
+        'view_all_barangays',
+        'view_requirements',
+    ]),
+    'barangay official': frozenset([
+        # Barangay officials can only submit and view their own data
+        'submit_requirements',
+        'view_own_barangay',
+        'view_own_submissions',
+        'upload_attachments',
+    ]),
+}
+NO_PERMISSIONS = frozenset()
+
+
 class UserProfile(models.Model):
     ROLE_CHOICES = [
         ('dilg staff', 'DILG Staff'),  # This is the admin role
@@ -272,55 +389,39 @@ class UserProfile(models.Model):
     # Display preferences
     compact_view = models.BooleanField(default=False)
 
+    # Secret in the calendar feed URL; calendar clients cannot send a session cookie
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
     def __str__(self):
         barangay_name = f" - {self.barangay.name}" if self.barangay else ""
         return f"{self.user.username} - {self.role.title()}{barangay_name}"
 
     def update_login_info(self, ip_address):
-        """Update login info after each login"""
+        """
+        Update login info after each login.
+
+        One UPDATE of just these two columns, run once the surrounding
+        transaction commits; F() makes concurrent logins add up instead of
+        overwriting each other's count.
+        """
         self.last_login_ip = ip_address
         self.login_count += 1
-        self.save()
+        pk = self.pk
+        transaction.on_commit(lambda: UserProfile.objects.filter(pk=pk).update(
+            last_login_ip=ip_address,
+            login_count=F('login_count') + 1,
+        ))
+
+    def get_calendar_token(self, reset=False):
+        """The user's calendar feed token, created on first use; `reset` replaces it"""
+        if reset or not self.calendar_token:
+            self.calendar_token = secrets.token_urlsafe(32)
+            UserProfile.objects.filter(pk=self.pk).update(calendar_token=self.calendar_token)
+        return self.calendar_token
 
     def has_permission(self, permission):
         """Check if user has specific permission based on role"""
-        permissions = {
-            'dilg staff': [
-                # DILG Staff has ALL permissions (they are the admin)
-                'view_dashboard',
-                'manage_users', 
-                'approve_requests', 
-                'reject_requests',
-                'view_all_requests',
-                'view_reports', 
-                'manage_settings',
-                'manage_requirements',
-                'view_all_barangays',
-                'manage_announcements',
-                'delete_requests',
-                'archive_requests',
-                'manage_roles',
-                'view_audit_logs',
-            ],
-            'municipal officer': [
-                # Municipal officers can view and monitor, but not manage system
-                'view_dashboard',
-                'view_all_requests',
-                'view_reports',
-                'view_all_barangays',
-                'view_requirements',
-            ],
-            'barangay official': [
-                # Barangay officials can only submit and view their own data
-                'submit_requirements',
-                'view_own_barangay',
-                'view_own_submissions',
-                'upload_attachments',
-            ],
-        }
-        
-        user_permissions = permissions.get(self.role, [])
-        return permission in user_permissions
+        return permission in ROLE_PERMISSIONS.get(self.role, NO_PERMISSIONS)
 
     def can_access_barangay(self, barangay):
         """Check if user has permission to access this barangay's data"""
@@ -387,7 +488,9 @@ class UserProfile(models.Model):
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
 
-class EligibilityRequest(models.Model):
+class EligibilityRequest(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('status',)
+
     CERTIFIER_CHOICES = [
         ('punong_barangay', 'Punong Barangay'),
         ('dilg_municipality', 'DILG - Municipality'),
@@ -615,22 +718,10 @@ This is an automated message. Please do not reply to this email.
     email_thread.start()
 
 
-@receiver(pre_save, sender=EligibilityRequest)
-def track_status_change(sender, instance, **kwargs):
-    """Track the old status before saving"""
-    if instance.pk:  # Only for updates
-        try:
-            old_instance = EligibilityRequest.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except EligibilityRequest.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
-
 @receiver(post_save, sender=EligibilityRequest)
 def notify_eligibility_status_change(sender, instance, created, **kwargs):
     """Signal to send email when status changes"""
-    if not created:  # Only for updates, not new records
+    if not created and instance.has_changed('status'):  # Only for updates, not new records
         if instance.status in ['approved', 'rejected', 'processing']:
             # ✅ Pass all required arguments
             send_certificate_notification_async(
@@ -686,6 +777,9 @@ class Requirement(models.Model):
 
     applicable_barangays = models.ManyToManyField(Barangay, blank=True)
     
+    # Last day covered by materialized submissions (see manage.py schedule_requirements)
+    scheduled_through = models.DateField(null=True, blank=True)
+    
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_requirements')
     created_at = models.DateTimeField(default=timezone.now)
@@ -701,8 +795,10 @@ class Requirement(models.Model):
         return f"{self.title} ({self.get_period_display()})"
 
 
-class RequirementSubmission(models.Model):
+class RequirementSubmission(TrackedFieldsMixin, models.Model):
     """Model for tracking requirement submissions by barangays"""
+    tracked_fields = ('status', 'due_date')
+
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
@@ -762,7 +858,8 @@ class RequirementSubmission(models.Model):
         self.save()
         
         # Log the submission
-        AuditLog.objects.create(
+        from . import audit
+        audit.record(
             user=user,
             action='CREATE',
             content_object=self,
@@ -802,35 +899,24 @@ class RequirementAttachment(models.Model):
         super().delete(*args, **kwargs)
 
 
-@receiver(pre_save, sender=RequirementSubmission)
-def track_submission_status_change(sender, instance, **kwargs):
-    """Track the old status before saving"""
-    if instance.pk:
-        try:
-            old_instance = RequirementSubmission.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except RequirementSubmission.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
-
-
 @receiver(post_save, sender=RequirementSubmission)
 def log_submission_status_change(sender, instance, created, **kwargs):
     """Log status changes"""
+    from . import audit
     if created:
-        AuditLog.objects.create(
+        audit.record(
             action='CREATE',
             content_object=instance,
             description=f"New requirement submission: {instance.requirement.title} for {instance.barangay.name}"
         )
-    elif hasattr(instance, '_old_status') and instance._old_status != instance.status:
-        AuditLog.objects.create(
+    elif instance.has_changed('status'):
+        old_status = instance.old_value('status')
+        audit.record(
             action='UPDATE',
             content_object=instance,
-            old_values={'status': instance._old_status},
+            old_values={'status': old_status},
             new_values={'status': instance.status},
-            description=f"Status changed: {instance.requirement.title} - {instance._old_status} → {instance.status}"
+            description=f"Status changed: {instance.requirement.title} - {old_status} → {instance.status}"
         )
 
 
@@ -954,6 +1040,48 @@ class FileCategory(models.Model):
         self.save()
 
 
+class CategoryKeyword(models.Model):
+    """Keyword used by the document categorizer (overrides the built-in lists)"""
+    SCOPE_CHOICES = [
+        ('content', 'Document Text'),
+        ('filename', 'Filename'),
+    ]
+
+    CATEGORY_CHOICES = [
+        ('appointive_certificates', 'Appointive Certificates'),
+        ('elective_certificates', 'Elective Certificates'),
+        ('ids', 'Identification Documents'),
+        ('signatures', 'Signatures'),
+    ]
+
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    keyword = models.CharField(max_length=100)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, default='content')
+    weight = models.PositiveIntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['scope', 'category', 'keyword']
+        unique_together = [['scope', 'category', 'keyword']]
+
+    def __str__(self):
+        return f"{self.keyword} ({self.get_category_display()}, {self.scope})"
+
+    def save(self, *args, **kwargs):
+        # Matching is case-insensitive; store keywords lowercased
+        self.keyword = self.keyword.strip().lower()
+        super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=CategoryKeyword)
+@receiver(post_delete, sender=CategoryKeyword)
+def reset_keyword_matchers(sender, instance, **kwargs):
+    """Recompile the categorizer on next use after keywords change"""
+    from .categorization import reset_matchers
+    reset_matchers()
+
+
 class CategorizedFile(models.Model):
     """Model for categorized files with metadata"""
     FILE_SOURCE_CHOICES = [
@@ -1014,6 +1142,11 @@ class CategorizedFile(models.Model):
     
     # Tags for searching
     tags = models.CharField(max_length=500, blank=True)  # comma-separated tags
+    extracted_text = models.TextField(blank=True)  # PDF text / OCR output, for full-text search
+    # When text extraction was last tried, so files that yield no text are not OCR'd again on every run
+    text_extracted_at = models.DateTimeField(null=True, blank=True)
+    # SHA-256 of the scanned file for rows created by ingest_documents, so a resumed run cannot insert it twice
+    source_hash = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
     
     # Status
     is_archived = models.BooleanField(default=False)
@@ -1226,4 +1359,115 @@ class MonitoringFile(models.Model):
     file = models.FileField(upload_to='monitoring_files/')
     category = models.CharField(max_length=50)  # weekly, monthly, etc.
     barangay = models.ForeignKey('Barangay', on_delete=models.CASCADE)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+
+# Keep the full-text search index (app/search.py) in sync
+@receiver(post_save, sender=CategorizedFile)
+def index_categorized_file(sender, instance, **kwargs):
+    from . import search
+    search.index_file(instance.pk)
+
+
+@receiver(post_delete, sender=CategorizedFile)
+def unindex_categorized_file(sender, instance, **kwargs):
+    from . import search
+    search.unindex_file(instance.pk)
+
+
+@receiver(post_save, sender=RequirementSubmission)
+def index_requirement_submission(sender, instance, **kwargs):
+    from . import search
+    search.index_submission(instance.pk)
+
+
+@receiver(post_delete, sender=RequirementSubmission)
+def unindex_requirement_submission(sender, instance, **kwargs):
+    from . import search
+    search.unindex_submission(instance.pk)
+
+
+@receiver(post_save, sender=Requirement)
+def index_requirement_submissions(sender, instance, created, **kwargs):
+    if not created:
+        from . import search
+        search.index_requirement(instance.pk)
+
+
+@receiver(post_save, sender=Barangay)
+def index_barangay_submissions(sender, instance, created, **kwargs):
+    if not created:
+        from . import search
+        search.index_barangay(instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+def index_employee(sender, instance, **kwargs):
+    from . import search
+    search.index_employee(instance.pk)
+
+
+@receiver(post_delete, sender=Employee)
+def unindex_employee(sender, instance, **kwargs):
+    from . import search
+    search.unindex_employee(instance.pk)
+
+
+@receiver(post_save, sender=EligibilityRequest)
+def index_applicant(sender, instance, **kwargs):
+    from . import search
+    search.index_applicant(instance.pk)
+
+
+@receiver(post_delete, sender=EligibilityRequest)
+def unindex_applicant(sender, instance, **kwargs):
+    from . import search
+    search.unindex_applicant(instance.pk)
+
+
+@receiver(post_save, sender=RequirementSubmission)
+@receiver(post_delete, sender=RequirementSubmission)
+@receiver(post_save, sender=Barangay)
+@receiver(post_delete, sender=Barangay)
+def invalidate_barangay_status(sender, instance, **kwargs):
+    """Submission counts or barangay names changed - recompute the map on next request"""
+    from . import barangay_status
+    barangay_status.invalidate()
+
+
+@receiver(post_save, sender=RequirementSubmission)
+def update_compliance_matrix(sender, instance, created, **kwargs):
+    """Recompute the submission's cell in the cached compliance matrices"""
+    from . import compliance
+    if not created and instance.has_changed('due_date'):
+        # Moved to another period: its old cell loses a submission too
+        compliance.update_cell(instance.barangay_id, instance.requirement_id, instance.old_value('due_date'))
+    elif not (created or instance.has_changed('status')):
+        return
+    compliance.update_cell(instance.barangay_id, instance.requirement_id, instance.due_date)
+
+
+@receiver(post_delete, sender=RequirementSubmission)
+def update_compliance_matrix_on_delete(sender, instance, **kwargs):
+    from . import compliance
+    compliance.update_cell(instance.barangay_id, instance.requirement_id, instance.due_date)
+
+
+@receiver(post_save, sender=Requirement)
+@receiver(post_delete, sender=Requirement)
+@receiver(post_save, sender=Barangay)
+@receiver(post_delete, sender=Barangay)
+def invalidate_compliance_matrix(sender, instance, **kwargs):
+    """Rows or columns of the compliance matrix changed"""
+    from . import compliance
+    compliance.invalidate()
+
+
+@receiver(post_save, sender=Requirement)
+@receiver(post_delete, sender=Requirement)
+@receiver(post_save, sender=Barangay)
+@receiver(post_delete, sender=Barangay)
+def invalidate_calendar(sender, instance, **kwargs):
+    """Requirement titles and barangay names appear on every month"""
+    from . import calendar_feed
+    calendar_feed.invalidate()
@@ -0,0 +1,190 @@
+"""
+Employee reporting hierarchy.
+
+The whole supervisor adjacency is read with one values_list() query and
+indexed in memory as an OrgTree, which answers subtree listings, depth,
+direct-report counts and headcount rollups without further queries. The
+tree is cached until an employee is saved or deleted (see the receivers in
+models.py) or changed through bulk_employee_operations, so an employee page
+costs at most one query for the hierarchy however deep it is.
+
+invalidate() bumps a version kept in the cache, which reaches the other web
+workers and the management commands because settings.CACHES is shared
+between processes (a per-process LocMemCache would leave them on the old
+tree). Each process also keeps the built tree for the current version and
+reads the version again at most every VERSION_CHECK_INTERVAL seconds, so
+the per-employee helpers neither rebuild the tree nor query the cache for
+every row of a page.
+
+Traversal is iterative and tolerates bad data: an employee whose supervisor
+chain loops back on itself is treated as the root of its own branch rather
+than recursing forever.
+"""
+import time
+
+from django.core.cache import cache
+
+
+CACHE_KEY = 'org_tree'
+VERSION_KEY = 'org_tree_version'
+CACHE_TIMEOUT = 600
+VERSION_CHECK_INTERVAL = 1.0
+
+# (cache version, OrgTree, monotonic time the version was last read) in this process
+_built = (None, None, 0.0)
+
+NODE_FIELDS = ('id', 'supervisor_id', 'name', 'id_no', 'position', 'department', 'status', 'archived')
+
+
+class OrgTree:
+    """In-memory index of the supervisor relation built from NODE_FIELDS rows"""
+
+    def __init__(self, rows):
+        self.nodes = {row[0]: dict(zip(NODE_FIELDS, row)) for row in rows}
+        self.children = {pk: [] for pk in self.nodes}
+        self.roots = []
+        for pk, node in self.nodes.items():
+            parent = node['supervisor_id']
+            if parent in self.nodes and parent != pk:
+                self.children[parent].append(pk)
+            else:
+                self.roots.append(pk)
+
+        for kids in self.children.values():
+            kids.sort(key=lambda pk: (self.nodes[pk]['name'], pk))
+        self.roots.sort(key=lambda pk: (self.nodes[pk]['name'], pk))
+
+        self.depth = {}
+        self.headcount = {}
+        self.parent = {}
+        self._index()
+
+    def _index(self):
+        """Depth and subtree size of every node, breaking supervisor cycles"""
+        order = []
+        for root in list(self.roots):
+            self._walk(root, order)
+
+        # Nodes left over sit on a supervisor cycle: cut each cycle at its lowest id
+        for pk in sorted(self.nodes):
+            if pk not in self.depth:
+                parent = self.nodes[pk]['supervisor_id']
+                if parent in self.children and pk in self.children[parent]:
+                    self.children[parent].remove(pk)
+                self.roots.append(pk)
+                self._walk(pk, order)
+
+        for pk in reversed(order):
+            self.headcount[pk] = 1 + sum(self.headcount[child] for child in self.children[pk])
+        self.parent = {child: pk for pk, kids in self.children.items() for child in kids}
+
+    def _walk(self, root, order):
+        self.depth[root] = 0
+        stack = [root]
+        while stack:
+            pk = stack.pop()
+            order.append(pk)
+            for child in self.children[pk]:
+                if child not in self.depth:
+                    self.depth[child] = self.depth[pk] + 1
+                    stack.append(child)
+
+    def __contains__(self, pk):
+        return pk in self.nodes
+
+    def direct_count(self, pk):
+        return len(self.children.get(pk, ()))
+
+    def subtree_size(self, pk):
+        """Number of employees below `pk`, at any depth"""
+        return self.headcount.get(pk, 1) - 1
+
+    def subtree_ids(self, pk):
+        """Ids of every employee below `pk`, depth first in name order"""
+        ids = []
+        stack = list(reversed(self.children.get(pk, ())))
+        seen = {pk}
+        while stack:
+            child = stack.pop()
+            if child in seen:
+                continue
+            seen.add(child)
+            ids.append(child)
+            stack.extend(reversed(self.children[child]))
+        return ids
+
+    def chain(self, pk):
+        """Ids of the supervisors of `pk`, nearest first"""
+        ids = []
+        parent = self.parent.get(pk)
+        while parent is not None:
+            ids.append(parent)
+            parent = self.parent.get(parent)
+        return ids
+
+    def chart(self, root=None, max_depth=None):
+        """Nested org-chart dicts below `root` (or for every top-level employee)"""
+        def build(pk, level):
+            node = dict(self.nodes[pk])
+            node.update(
+                depth=self.depth[pk],
+                direct_reports=self.direct_count(pk),
+                headcount=self.subtree_size(pk),
+            )
+            if max_depth is None or level < max_depth:
+                node['children'] = [build(child, level + 1) for child in self.children[pk]]
+            else:
+                node['children'] = []
+            return node
+
+        return [build(pk, 0) for pk in ([root] if root is not None else self.roots)]
+
+
+def _rows():
+    from .models import Employee
+    return list(Employee.objects.order_by().values_list(*NODE_FIELDS))
+
+
+def load_tree():
+    """OrgTree straight from the database (one query)"""
+    return OrgTree(_rows())
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def get_tree():
+    """Cached load_tree(); reused within the process while the version is unchanged"""
+    global _built
+    built_version, tree, checked = _built
+    now = time.monotonic()
+    if tree is not None and now - checked < VERSION_CHECK_INTERVAL:
+        return tree
+    version = _version()
+    if tree is not None and built_version == version:
+        _built = (version, tree, now)
+        return tree
+
+    key = f'{CACHE_KEY}:{version}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = _rows()
+        cache.set(key, rows, CACHE_TIMEOUT)
+    tree = OrgTree(rows)
+    _built = (version, tree, now)
+    return tree
+
+
+def invalidate():
+    """Drop the cached tree here at once, and in other processes through the shared version"""
+    global _built
+    _built = (None, None, 0.0)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
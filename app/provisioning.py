@@ -0,0 +1,266 @@
+"""
+Provisioning of requirement submissions for barangays.
+
+Creating a requirement gives every target barangay a pending submission
+for the current period (the current and next three weeks for weekly
+requirements) and notifies their officials. Rows are built
+in memory and inserted with bulk_create in one transaction, so the
+per-row signals (old-status lookup, per-submission audit entry, search index
+and barangay map updates) are skipped; one summary audit entry is written
+instead and the search index is refreshed for the whole requirement at once.
+
+Recurring requirements are rolled forward by schedule_requirements() (run
+daily by `manage.py schedule_requirements`). Each period gets its own
+submission per barangay, numbered within its year in `week_number` (ISO
+week, month, quarter, half or 1 for annual requirements; see
+period_containing()), so the (requirement, barangay, week_number, year)
+unique constraint makes reruns harmless. Submissions made on creation are
+numbered the same way, and current_period() gives the number the views
+look up. `Requirement.scheduled_through` records how far each requirement
+has been materialized.
+"""
+import calendar
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Barangay, Notification, Requirement, RequirementSubmission
+
+
+WEEKS_PER_WEEKLY_REQUIREMENT = 4
+
+# Months per period for the non-weekly periods
+PERIOD_MONTHS = {'monthly': 1, 'quarterly': 3, 'semestral': 6, 'annually': 12}
+
+PERIODS = ['weekly', *PERIOD_MONTHS]
+
+PRIORITY_EMOJI = {'normal': '📋', 'important': '⚠️', 'urgent': '🚨'}
+
+
+def build_submissions(requirement, barangays, due_date):
+    """Unsaved pending submissions for each barangay and each of initial_periods()"""
+    now = timezone.now()
+    return [
+        RequirementSubmission(
+            requirement=requirement,
+            barangay=barangay,
+            week_number=number,
+            year=year,
+            due_date=due_date,
+            status='pending',
+            created_at=now,
+        )
+        for barangay in barangays
+        for start, end, number, year in initial_periods(requirement)
+    ]
+
+
+def build_notifications(requirement, barangays, due_date):
+    """Unsaved 'new requirement' notifications for the officials of the barangays"""
+    officials = User.objects.filter(
+        userprofile__role='barangay official',
+        userprofile__barangay__in=barangays,
+    )
+    title = f"{PRIORITY_EMOJI.get(requirement.priority, '📋')} New {requirement.priority.upper()} Requirement"
+    message = (
+        f"A new {requirement.period} requirement has been added: {requirement.title}. "
+        f"Due date: {due_date.strftime('%B %d, %Y')}"
+    )
+    now = timezone.now()
+    return [
+        Notification(
+            user=user,
+            notification_type='new_requirement',
+            title=title,
+            message=message,
+            is_read=False,
+            created_at=now,
+        )
+        for user in officials
+    ]
+
+
+def provision_requirement(requirement, barangays, due_date, user=None, batch_size=500):
+    """
+    Create the submissions and notifications for a new requirement.
+
+    Returns (submissions_created, notifications_sent).
+    """
+    barangays = list(barangays)
+
+    with transaction.atomic():
+        submissions = RequirementSubmission.objects.bulk_create(
+            build_submissions(requirement, barangays, due_date), batch_size=batch_size
+        )
+        notifications = Notification.objects.bulk_create(
+            build_notifications(requirement, barangays, due_date), batch_size=batch_size
+        )
+        audit.record(
+            user=user,
+            action='CREATE',
+            content_object=requirement,
+            new_values={
+                'barangays': len(barangays),
+                'submissions': len(submissions),
+                'notifications': len(notifications),
+            },
+            description=(
+                f"DILG Admin created new {requirement.priority} requirement: {requirement.title} "
+                f"with {len(submissions)} submissions"
+            ),
+        )
+
+    # bulk_create skips post_save, so index the new submissions and refresh
+    # the barangay map here, once the caller's transaction is committed too
+    transaction.on_commit(lambda: _refresh([requirement.pk]))
+
+    return len(submissions), len(notifications)
+
+
+def _refresh(requirement_pks):
+    """
+    Index the submissions of the requirements and drop the caches built from them.
+
+    The calendar needs nothing: its months are keyed on their rows.
+    """
+    from . import barangay_status, compliance, search
+
+    for pk in requirement_pks:
+        search.index_requirement(pk)
+    barangay_status.invalidate()
+    compliance.invalidate()
+
+
+# ------------------------------------------------------------------
+# Recurring schedule
+# ------------------------------------------------------------------
+
+def period_containing(period, day):
+    """(start, end, number, year) of the `period` that contains `day`"""
+    if period == 'weekly':
+        year, week, weekday = day.isocalendar()
+        start = day - timedelta(days=weekday - 1)
+        return start, start + timedelta(days=6), week, year
+
+    months = PERIOD_MONTHS[period]
+    number = (day.month - 1) // months + 1
+    first_month = (number - 1) * months + 1
+    last_month = first_month + months - 1
+    start = date(day.year, first_month, 1)
+    end = date(day.year, last_month, calendar.monthrange(day.year, last_month)[1])
+    return start, end, number, day.year
+
+
+def periods_after(period, horizon, until):
+    """Periods following `horizon` (a period's last day) that start on or before `until`"""
+    day = horizon + timedelta(days=1)
+    while day <= until:
+        bounds = period_containing(period, day)
+        yield bounds
+        day = bounds[1] + timedelta(days=1)
+
+
+def current_period(period, day=None):
+    """(week_number, year) of the submissions for the `period` containing `day` (default: today)"""
+    _, _, number, year = period_containing(period, day or timezone.localdate())
+    return number, year
+
+
+def initial_periods(requirement):
+    """Periods given submissions when the requirement is created, starting with the current one"""
+    created = timezone.localdate(requirement.created_at)
+    count = WEEKS_PER_WEEKLY_REQUIREMENT if requirement.period == 'weekly' else 1
+    return list(islice(periods_after(requirement.period, created - timedelta(days=1), date.max), count))
+
+
+def initial_horizon(requirement):
+    """Last day covered by the submissions made when the requirement was created"""
+    return initial_periods(requirement)[-1][1]
+
+
+def schedule_requirement(requirement, until, barangays, backfill=False, dry_run=False, batch_size=500):
+    """
+    Materialize the submissions of `requirement` for every period starting
+    on or before `until` that is not yet covered, and advance its horizon.
+
+    Periods that already ended are skipped unless `backfill` is set, so a
+    requirement left unscheduled for a while does not come back overdue.
+    Each submission is due on the last day of its period.
+
+    Returns the number of submissions inserted (or that would be, for a dry run).
+    """
+    horizon = requirement.scheduled_through or initial_horizon(requirement)
+    periods = list(periods_after(requirement.period, horizon, until))
+    if not periods:
+        if requirement.scheduled_through is None and not dry_run:
+            Requirement.objects.filter(pk=requirement.pk).update(scheduled_through=horizon)
+            requirement.scheduled_through = horizon
+        return 0
+
+    today = timezone.localdate()
+    now = timezone.now()
+    rows = [
+        RequirementSubmission(
+            requirement=requirement,
+            barangay=barangay,
+            week_number=number,
+            year=year,
+            due_date=end,
+            status='pending',
+            created_at=now,
+        )
+        for start, end, number, year in periods
+        if backfill or end >= today
+        for barangay in barangays
+    ]
+    if dry_run:
+        return len(rows)
+
+    existing = RequirementSubmission.objects.filter(requirement=requirement)
+    with transaction.atomic():
+        before = existing.count()
+        # Rows that already exist (an earlier or concurrent run) hit the
+        # unique constraint and are skipped
+        RequirementSubmission.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        inserted = existing.count() - before
+        Requirement.objects.filter(pk=requirement.pk).update(scheduled_through=periods[-1][1])
+    requirement.scheduled_through = periods[-1][1]
+    return inserted
+
+
+def schedule_requirements(until=None, backfill=False, dry_run=False, requirements=None):
+    """
+    Roll every active requirement forward to `until` (default: today).
+
+    Returns {requirement: submissions inserted} for the requirements that got rows.
+    """
+    until = until or timezone.localdate()
+    if requirements is None:
+        requirements = Requirement.objects.filter(is_active=True)
+    requirements = requirements.prefetch_related('applicable_barangays')
+    all_barangays = list(Barangay.objects.all())
+
+    scheduled = {}
+    for requirement in requirements:
+        barangays = list(requirement.applicable_barangays.all()) or all_barangays
+        count = schedule_requirement(requirement, until, barangays, backfill=backfill, dry_run=dry_run)
+        if count:
+            scheduled[requirement] = count
+
+    if scheduled and not dry_run:
+        audit.record(
+            action='CREATE',
+            new_values={str(requirement.pk): count for requirement, count in scheduled.items()},
+            description=(
+                f"Scheduled {sum(scheduled.values())} submissions for "
+                f"{len(scheduled)} recurring requirements through {until:%B %d, %Y}"
+            ),
+        )
+        pks = [requirement.pk for requirement in scheduled]
+        transaction.on_commit(lambda: _refresh(pks))
+
+    return scheduled
@@ -0,0 +1,138 @@
+"""
+Review (approve / reject) of requirement submissions.
+
+review_submissions() handles many submissions in one transaction: the rows
+are locked and read once, the status change is a single UPDATE, and the
+audit entries (one audit batch) and barangay notifications are written
+with bulk_create. Because update() and bulk_create skip the per-row
+signals, the barangay map cache and calendar months are invalidated and
+the compliance matrix cells are refreshed here. The search index only
+covers text fields, so a status change does not touch it.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Notification, RequirementSubmission
+
+
+REVIEW_ACTIONS = ('approved', 'rejected')
+
+
+def review_message(submission, action, review_notes=''):
+    """(title, message, notification_type) telling a barangay how its submission was reviewed"""
+    title = submission.requirement.title
+    if action == 'approved':
+        message = f"Your submission for '{title}' has been approved!"
+        if review_notes:
+            message += f" Admin notes: {review_notes}"
+        return f"✅ Approved: {title}", message, 'completed'
+
+    message = f"Your submission for '{title}' needs revision."
+    if review_notes:
+        message += f" Admin feedback: {review_notes}"
+    return f"❌ Needs Revision: {title}", message, 'info'
+
+
+def build_review_notifications(submissions, action, review_notes=''):
+    """Unsaved notifications for the officials of each submission's barangay"""
+    officials = {}
+    rows = User.objects.filter(
+        userprofile__role='barangay official',
+        userprofile__barangay__in={submission.barangay_id for submission in submissions},
+    ).values_list('id', 'userprofile__barangay')
+    for user_id, barangay_id in rows:
+        officials.setdefault(barangay_id, []).append(user_id)
+
+    now = timezone.now()
+    notifications = []
+    for submission in submissions:
+        title, message, notification_type = review_message(submission, action, review_notes)
+        notifications.extend(
+            Notification(
+                user_id=user_id,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                submission=submission,
+                barangay=submission.barangay,
+                is_read=False,
+                created_at=now,
+            )
+            for user_id in officials.get(submission.barangay_id, [])
+        )
+    return notifications
+
+
+def review_submissions(submission_ids, action, review_notes='', user=None, batch_size=500):
+    """
+    Set `action` ('approved' or 'rejected') on every submission in `submission_ids`.
+
+    Submissions already in that status are left alone so a repeated request
+    does not notify the barangay twice.
+
+    Returns ({id: {'success', 'status', 'old_status' or 'error'}}, notifications_sent),
+    keyed in the order the ids were given.
+    """
+    if action not in REVIEW_ACTIONS:
+        raise ValueError(f'Invalid action: {action}')
+
+    ids = list(dict.fromkeys(int(pk) for pk in submission_ids))
+    results = {pk: {'success': False, 'error': 'Submission not found'} for pk in ids}
+
+    with transaction.atomic():
+        submissions = list(
+            RequirementSubmission.objects.select_for_update()
+            .select_related('requirement', 'barangay')
+            .filter(pk__in=ids)
+        )
+
+        changed = []
+        for submission in submissions:
+            if submission.status == action:
+                results[submission.pk] = {
+                    'success': False,
+                    'status': submission.status,
+                    'error': f'Already {action}',
+                }
+            else:
+                changed.append(submission)
+
+        if not changed:
+            return results, 0
+
+        now = timezone.now()
+        RequirementSubmission.objects.filter(pk__in=[submission.pk for submission in changed]).update(
+            status=action,
+            reviewed_by=user,
+            reviewed_at=now,
+            review_notes=review_notes,
+            updated_at=now,
+        )
+
+        with audit.batch(batch_size):
+            for submission in changed:
+                audit.record(
+                    'UPDATE',
+                    submission,
+                    user=user,
+                    old_values={'status': submission.status},
+                    new_values={'status': action},
+                    description=(
+                        f"Status changed: {submission.requirement.title} - {submission.status} → {action}"
+                    ),
+                )
+
+        notifications = Notification.objects.bulk_create(
+            build_review_notifications(changed, action, review_notes), batch_size=batch_size
+        )
+
+    for submission in changed:
+        results[submission.pk] = {'success': True, 'status': action, 'old_status': submission.status}
+
+    from . import barangay_status, compliance
+    barangay_status.invalidate()
+    compliance.update_cells(changed)
+
+    return results, len(notifications)
@@ -0,0 +1,355 @@
+"""
+Full-text search over categorized files, requirement submissions,
+employees and eligibility applicants.
+
+Backed by SQLite FTS5 virtual tables whose rowid is the primary key of the
+indexed row. The tables are kept in sync by the signal handlers in models.py
+and can be rebuilt with `manage.py rebuild_search_index`. When the database
+has no FTS5 tables the search helpers return None and callers fall back to
+icontains filters.
+"""
+import re
+
+from django.db import connection, DatabaseError
+from django.db.models.expressions import RawSQL
+
+
+FILE_INDEX = 'app_categorizedfile_fts'
+SUBMISSION_INDEX = 'app_requirementsubmission_fts'
+EMPLOYEE_INDEX = 'app_employee_fts'
+APPLICANT_INDEX = 'app_eligibilityrequest_fts'
+
+# Department labels are indexed next to the stored code so "finance" and
+# "information technology" both find the employee
+_DEPARTMENT_LABEL = (
+    "CASE e.department "
+    "WHEN 'admin' THEN 'Administration' "
+    "WHEN 'hr' THEN 'Human Resources' "
+    "WHEN 'finance' THEN 'Finance' "
+    "WHEN 'operations' THEN 'Operations' "
+    "WHEN 'it' THEN 'Information Technology' "
+    "ELSE '' END"
+)
+
+INDEXES = {
+    FILE_INDEX: {
+        'columns': ['original_filename', 'detected_content', 'tags', 'extracted_text'],
+        # bm25 weight per column: filename and tags matter more than body text
+        'weights': [10.0, 5.0, 5.0, 1.0],
+        'key': 'f.id',
+        'select': 'f.original_filename, f.detected_content, f.tags, f.extracted_text',
+        'from': 'app_categorizedfile f',
+    },
+    SUBMISSION_INDEX: {
+        'columns': ['title', 'description', 'barangay', 'update_text'],
+        'weights': [10.0, 2.0, 5.0, 1.0],
+        'key': 's.id',
+        'select': 'r.title, r.description, b.name, s.update_text',
+        'from': (
+            'app_requirementsubmission s '
+            'JOIN app_requirement r ON r.id = s.requirement_id '
+            'JOIN app_barangay b ON b.id = s.barangay_id'
+        ),
+    },
+    EMPLOYEE_INDEX: {
+        'columns': ['name', 'id_no', 'email', 'position', 'department', 'task'],
+        'weights': [10.0, 8.0, 3.0, 2.0, 1.0, 1.0],
+        'key': 'e.id',
+        'select': (
+            "e.name, e.id_no, COALESCE(e.email, ''), COALESCE(e.position, ''), "
+            f"COALESCE(e.department, '') || ' ' || {_DEPARTMENT_LABEL}, COALESCE(e.task, '')"
+        ),
+        'from': 'app_employee e',
+    },
+    APPLICANT_INDEX: {
+        'columns': ['name', 'barangay', 'email'],
+        'weights': [10.0, 3.0, 2.0],
+        'key': 'r.id',
+        'select': (
+            "r.first_name || ' ' || COALESCE(r.middle_initial, '') || ' ' || r.last_name, "
+            "r.barangay, COALESCE(r.email, '')"
+        ),
+        'from': 'app_eligibilityrequest r',
+    },
+}
+
+_available = {}
+
+
+def create_indexes(conn=None):
+    """Create the FTS5 tables if the database supports them"""
+    conn = conn or connection
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        for index, spec in INDEXES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{', '.join(spec['columns'])}, "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+    _available.clear()
+    return True
+
+
+def drop_indexes(conn=None):
+    """Drop the FTS5 tables"""
+    conn = conn or connection
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f"DROP TABLE IF EXISTS {index}")
+    _available.clear()
+
+
+def is_available():
+    """True when the FTS tables exist on the current database"""
+    key = connection.settings_dict['NAME']
+    if key not in _available:
+        _available[key] = (
+            connection.vendor == 'sqlite'
+            and set(INDEXES) <= set(connection.introspection.table_names())
+        )
+    return _available[key]
+
+
+def reindex(index, where='', params=(), conn=None):
+    """
+    Replace the index rows whose source rows match `where` (SQL over the
+    aliases in INDEXES[index]['from']). An empty `where` rebuilds everything.
+    Rows that no longer exist in the source are removed.
+    """
+    conn = conn or connection
+    spec = INDEXES[index]
+    columns = ', '.join(spec['columns'])
+    with conn.cursor() as cursor:
+        if where:
+            cursor.execute(
+                f"DELETE FROM {index} WHERE rowid IN "
+                f"(SELECT {spec['key']} FROM {spec['from']} WHERE {where})",
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {index}(rowid, {columns}) "
+                f"SELECT {spec['key']}, {spec['select']} FROM {spec['from']} WHERE {where}",
+                params,
+            )
+        else:
+            cursor.execute(f"DELETE FROM {index}")
+            cursor.execute(
+                f"INSERT INTO {index}(rowid, {columns}) "
+                f"SELECT {spec['key']}, {spec['select']} FROM {spec['from']}"
+            )
+
+
+def remove(index, pk):
+    """Drop one row from an index"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {index} WHERE rowid = %s", [pk])
+
+
+def rebuild():
+    """Rebuild every index from its source tables"""
+    create_indexes()
+    for index in INDEXES:
+        reindex(index)
+    with connection.cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('optimize')")
+
+
+# ------------------------------------------------------------------
+# Sync helpers (called from the signal handlers in models.py)
+# ------------------------------------------------------------------
+
+def _safe(func, *args):
+    if not is_available():
+        return
+    try:
+        func(*args)
+    except DatabaseError as e:
+        # A stale index is fixed by rebuild_search_index; never block the save
+        print(f"⚠️ Search index update failed: {e}")
+
+
+def _reindex_many(index, key, pks):
+    pks = list(pks)
+    if pks:
+        placeholders = ', '.join(['%s'] * len(pks))
+        _safe(reindex, index, f'{key} IN ({placeholders})', pks)
+
+
+def index_file(pk):
+    _safe(reindex, FILE_INDEX, 'f.id = %s', [pk])
+
+
+def index_files(pks):
+    """Index many files at once (rows written with bulk_create skip the signals)"""
+    _reindex_many(FILE_INDEX, 'f.id', pks)
+
+
+def unindex_file(pk):
+    _safe(remove, FILE_INDEX, pk)
+
+
+def index_submission(pk):
+    _safe(reindex, SUBMISSION_INDEX, 's.id = %s', [pk])
+
+
+def unindex_submission(pk):
+    _safe(remove, SUBMISSION_INDEX, pk)
+
+
+def index_requirement(pk):
+    """Re-index every submission of a requirement (title/description changed)"""
+    _safe(reindex, SUBMISSION_INDEX, 's.requirement_id = %s', [pk])
+
+
+def index_barangay(pk):
+    """Re-index every submission of a barangay (name changed)"""
+    _safe(reindex, SUBMISSION_INDEX, 's.barangay_id = %s', [pk])
+
+
+def index_employee(pk):
+    _safe(reindex, EMPLOYEE_INDEX, 'e.id = %s', [pk])
+
+
+def index_employees(pks):
+    """Index many employees at once (bulk_create / update() skip the signals)"""
+    _reindex_many(EMPLOYEE_INDEX, 'e.id', pks)
+
+
+def unindex_employee(pk):
+    _safe(remove, EMPLOYEE_INDEX, pk)
+
+
+def index_applicant(pk):
+    _safe(reindex, APPLICANT_INDEX, 'r.id = %s', [pk])
+
+
+def unindex_applicant(pk):
+    _safe(remove, APPLICANT_INDEX, pk)
+
+
+# ------------------------------------------------------------------
+# Querying
+# ------------------------------------------------------------------
+
+def build_match_query(text, columns=None):
+    """
+    Turn free text from a search box into a safe FTS5 query.
+
+    Every word must match, and the last one is treated as a prefix so
+    results narrow while the user types. `columns` limits the match to
+    some of the indexed columns.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    query = ' '.join(quoted)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def search_ids(index, text, limit=None, columns=None):
+    """
+    Return primary keys matching `text`, best match first.
+
+    Returns None when full-text search is unavailable so the caller can
+    fall back to icontains filters.
+    """
+    if not is_available():
+        return None
+    query = build_match_query(text, columns)
+    if not query:
+        return []
+
+    weights = ', '.join(str(w) for w in INDEXES[index]['weights'])
+    sql = f"SELECT rowid FROM {index} WHERE {index} MATCH %s ORDER BY bm25({index}, {weights})"
+    params = [query]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError as e:
+        print(f"⚠️ Full-text search failed, falling back: {e}")
+        return None
+
+
+def ranked(queryset, index, text, columns=None):
+    """
+    `queryset` joined to the index, narrowed to the rows matching `text` and
+    ordered by relevance, or None when full-text search is unavailable.
+
+    The MATCH, the caller's filters and the bm25 ordering run as one query,
+    so slicing the result applies the caller's LIMIT / OFFSET to it.
+    """
+    if not is_available():
+        return None
+    query = build_match_query(text, columns)
+    if not query:
+        return queryset.none()
+
+    qn = connection.ops.quote_name
+    weights = ', '.join(str(w) for w in INDEXES[index]['weights'])
+    pk_column = f'{qn(queryset.model._meta.db_table)}.{qn(queryset.model._meta.pk.column)}'
+    return queryset.extra(
+        tables=[index],
+        where=[f'{qn(index)}.rowid = {pk_column}', f'{qn(index)} MATCH %s'],
+        params=[query],
+        select={'search_rank': f'bm25({qn(index)}, {weights})'},
+        order_by=['search_rank'],
+    )
+
+
+def ranked_pks(queryset, index, text, columns=None, limit=None, offset=0):
+    """
+    Apply full-text search to a filtered queryset.
+
+    Returns the matching primary keys of `queryset` ordered by relevance
+    (`limit` of them from `offset`), or None when full-text search is
+    unavailable.
+    """
+    results = ranked(queryset, index, text, columns)
+    if results is None:
+        return None
+    pks = results.values_list('pk', flat=True)
+    try:
+        return list(pks[offset:offset + limit] if limit is not None else pks[offset:])
+    except DatabaseError as e:
+        print(f"⚠️ Full-text search failed, falling back: {e}")
+        return None
+
+
+def matching(queryset, index, text, columns=None):
+    """
+    `queryset` narrowed to the rows matching `text` (as a subquery, so any
+    ordering and pagination still apply), or None when full-text search is
+    unavailable.
+    """
+    if not is_available():
+        return None
+    query = build_match_query(text, columns)
+    if not query:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {index} WHERE {index} MATCH %s", [query]))
+
+
+def ranked_objects(queryset, index, text, columns=None):
+    """Like ranked_pks but returns the model instances in relevance order"""
+    results = ranked(queryset, index, text, columns)
+    if results is None:
+        return None
+    try:
+        return list(results)
+    except DatabaseError as e:
+        print(f"⚠️ Full-text search failed, falling back: {e}")
+        return None
@@ -12,7 +12,7 @@ def create_submission_notifications(sender, instance, created, **kwargs):
     """
     try:
         # Only create notifications for status changes (not on creation)
-        if created:
+        if created or not instance.has_changed('status'):
             return
         
         # Check if status changed to 'accomplished' (submitted)
@@ -1,3 +1,476 @@
-from django.test import TestCase
+import io
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import audit, audit_partitions, calendar_feed, exports, org_chart, provisioning, views
+from .employee_import import import_employees, read_rows
+from .middleware import UserProfileMiddleware, get_profile
+from .pagination import InvalidCursor
+from .models import AuditLog, Barangay, Employee, Requirement, RequirementSubmission
+
+
+class RequirementListQueryCountTests(TestCase):
+    """The requirement lists must cost the same number of queries however many requirements exist"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', first_name='Dilg', last_name='Staff')
+        cls.staff.userprofile.role = 'dilg staff'
+        cls.staff.userprofile.save()
+        cls.barangays = [Barangay.objects.create(name=f'Barangay {i}', code=f'B{i}') for i in range(3)]
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def add_requirements(self, count):
+        for i in range(count):
+            requirement = Requirement.objects.create(
+                title=f'Requirement {Requirement.objects.count()}',
+                description='Monthly report',
+                period='monthly',
+                created_by=self.staff,
+            )
+            requirement.applicable_barangays.set(self.barangays[:2])
+            for barangay, status in zip(self.barangays, ['pending', 'pending', 'accomplished']):
+                RequirementSubmission.objects.create(
+                    requirement=requirement,
+                    barangay=barangay,
+                    due_date=date(2026, 1, 31),
+                    year=2026,
+                    status=status,
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def assertConstantQueries(self, url):
+        self.add_requirements(2)
+        few, _ = self.count_queries(url)
+        self.add_requirements(8)
+        many, data = self.count_queries(url)
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['requirements']), 10)
+        return data
+
+    def test_requirements_list(self):
+        data = self.assertConstantQueries('/api/admin/requirements/list/')
+        for requirement in data['requirements']:
+            self.assertEqual(requirement['total_submissions'], 3)
+            self.assertEqual(requirement['pending_count'], 2)
+            self.assertEqual(requirement['approved_count'], 0)
+            self.assertEqual(requirement['created_by'], 'Dilg Staff')
+
+    def test_all_requirements(self):
+        data = self.assertConstantQueries(reverse('api_all_requirements'))
+        for requirement in data['requirements']:
+            self.assertEqual(requirement['applicable_barangays'], ['Barangay 0', 'Barangay 1'])
+            self.assertEqual(requirement['created_by'], 'Dilg Staff')
+
+    def test_all_requirements_without_barangays(self):
+        Requirement.objects.create(title='Everyone', description='-', period='weekly', created_by=self.staff)
+        _, data = self.count_queries(reverse('api_all_requirements'))
+        self.assertEqual(data['requirements'][0]['applicable_barangays'], ['All Barangays'])
+
+
+class SubmissionNumberingTests(TestCase):
+    """Creation, the scheduler and the views must agree on week_number/year"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barangay = Barangay.objects.create(name='Barangay 0', code='B0')
+        cls.official = User.objects.create_user('official', password='x')
+        cls.official.userprofile.role = 'barangay official'
+        cls.official.userprofile.barangay = cls.barangay
+        cls.official.userprofile.save()
+
+    def create_requirement(self, period):
+        requirement = Requirement.objects.create(title=f'{period} report', description='-', period=period)
+        provisioning.provision_requirement(requirement, [self.barangay], timezone.localdate())
+        return requirement
+
+    def numbers(self, requirement):
+        return sorted(requirement.submissions.values_list('week_number', 'year'))
+
+    def barangay_view(self, period, **params):
+        self.client.force_login(self.official)
+        response = self.client.get(reverse('api_barangay_requirements'), {'period': period, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['submissions']
+
+    def test_creation_numbers_weeks_like_the_scheduler(self):
+        requirement = self.create_requirement('weekly')
+        today = timezone.localdate()
+        expected = [provisioning.current_period('weekly', today + timedelta(weeks=n)) for n in range(4)]
+        self.assertEqual(self.numbers(requirement), sorted(expected))
+
+        provisioning.schedule_requirements(until=today + timedelta(weeks=5))
+        expected += [provisioning.current_period('weekly', today + timedelta(weeks=n)) for n in (4, 5)]
+        self.assertEqual(self.numbers(requirement), sorted(expected))
+
+    def test_scheduled_period_appears_in_barangay_view(self):
+        requirement = self.create_requirement('monthly')
+        self.assertEqual(self.numbers(requirement), [provisioning.current_period('monthly')])
+        self.assertEqual(len(self.barangay_view('monthly')), 1)
+
+        next_month = requirement.scheduled_through or provisioning.initial_horizon(requirement)
+        next_month += timedelta(days=1)
+        provisioning.schedule_requirements(until=next_month)
+        number, year = provisioning.current_period('monthly', next_month)
+        submissions = self.barangay_view('monthly', week=number, year=year)
+        self.assertEqual([s['title'] for s in submissions], ['monthly report'])
+
+    def test_requirements_list_reuses_the_current_submission(self):
+        requirement = self.create_requirement('quarterly')
+        request = RequestFactory().get('/', {'barangay_id': self.barangay.id, 'period': 'quarterly'})
+        request.user = self.official
+        response = views.get_requirements_list(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(requirement.submissions.count(), 1)
+
+
+class TrackedFieldsTests(TestCase):
+    """old_value()/has_changed() must report the stored values in post_save handlers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        requirement = Requirement.objects.create(title='Report', description='-', period='monthly')
+        barangay = Barangay.objects.create(name='Barangay 0', code='B0')
+        cls.submission = RequirementSubmission.objects.create(
+            requirement=requirement, barangay=barangay, due_date=date(2026, 1, 31), year=2026, status='pending',
+        )
+
+    def capture_status(self):
+        seen = []
+
+        def capture(sender, instance, created, **kwargs):
+            seen.append((instance.old_value('status'), instance.has_changed('status')))
+
+        post_save.connect(capture, sender=RequirementSubmission)
+        self.addCleanup(post_save.disconnect, capture, sender=RequirementSubmission)
+        return seen
+
+    def test_deferred_field_is_read_before_the_update(self):
+        seen = self.capture_status()
+        submission = RequirementSubmission.objects.defer('status').get(pk=self.submission.pk)
+        submission.status = 'accomplished'
+        submission.save()
+        self.assertEqual(seen, [('pending', True)])
+        self.assertFalse(submission.has_changed('status'))
+
+    def test_loading_a_deferred_field_keeps_other_changes(self):
+        submission = RequirementSubmission.objects.defer('due_date').get(pk=self.submission.pk)
+        submission.status = 'accomplished'
+        self.assertEqual(submission.due_date, date(2026, 1, 31))
+        self.assertTrue(submission.has_changed('status'))
+        self.assertEqual(submission.old_value('status'), 'pending')
+
+    def test_refreshing_one_field_snapshots_only_that_field(self):
+        submission = RequirementSubmission.objects.get(pk=self.submission.pk)
+        submission.status = 'accomplished'
+        submission.due_date = date(2026, 2, 28)
+        submission.refresh_from_db(fields=['due_date'])
+        self.assertFalse(submission.has_changed('due_date'))
+        self.assertTrue(submission.has_changed('status'))
+
+
+class EmployeeImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Employee.objects.create(name='Existing Boss', id_no='EMP001')
+
+    def run_import(self, lines, **options):
+        data = 'Name,Employee ID,Supervisor\n' + ''.join(f'{line}\n' for line in lines)
+        return import_employees(read_rows(io.BytesIO(data.encode()), 'roster.csv'), **options)
+
+    def error_rows(self, result):
+        return {error['row']: error['errors'] for error in result['errors']}
+
+    def test_dry_run_inserts_nothing(self):
+        result = self.run_import(['Ana,EMP002,EMP001'], dry_run=True)
+        self.assertEqual((result['valid'], result['created']), (1, 0))
+        self.assertFalse(Employee.objects.filter(id_no='EMP002').exists())
+
+    def test_duplicate_ids_are_rejected(self):
+        result = self.run_import(['Ana,EMP001,', 'Ben,EMP002,', 'Bea,EMP002,'])
+        self.assertEqual(set(self.error_rows(result)), {2, 4})
+        self.assertEqual(result['created'], 0)
+
+    def test_supervisors_from_the_same_file(self):
+        result = self.run_import(['Ana,EMP003,EMP002', 'Ben,EMP002,EMP001'])
+        self.assertEqual((result['errors'], result['created']), ([], 2))
+        ana = Employee.objects.get(id_no='EMP003')
+        self.assertEqual(ana.supervisor.id_no, 'EMP002')
+        self.assertEqual(ana.supervisor.supervisor.id_no, 'EMP001')
+
+    def test_skip_invalid_drops_rows_whose_supervisor_is_dropped(self):
+        # Carl reports to Ben, who reports to an unknown ID; Ana is fine
+        result = self.run_import(
+            ['Carl,EMP004,EMP003', 'Ben,EMP003,EMP999', 'Ana,EMP002,EMP001'], skip_invalid=True,
+        )
+        errors = self.error_rows(result)
+        self.assertEqual(errors[3], {'supervisor': ['Unknown Employee ID EMP999']})
+        self.assertEqual(errors[2], {'supervisor': ['Supervisor EMP003 (row 3) is not imported']})
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(
+            list(Employee.objects.exclude(id_no='EMP001').values_list('id_no', 'supervisor__id_no')),
+            [('EMP002', 'EMP001')],
+        )
+
+    def test_supervisor_in_a_later_chunk(self):
+        result = self.run_import(['Ana,EMP003,EMP004', 'Ben,EMP002,EMP001', 'Carl,EMP004,EMP002'], batch_size=1)
+        self.assertEqual((result['errors'], result['created']), ([], 3))
+        self.assertEqual(Employee.objects.get(id_no='EMP003').supervisor.supervisor.id_no, 'EMP002')
+
+    def test_invalid_row_in_a_later_chunk_undoes_earlier_chunks(self):
+        result = self.run_import(['Ana,EMP002,EMP001', 'Ben,EMP003,EMP999'], batch_size=1)
+        self.assertEqual((set(self.error_rows(result)), result['created']), ({3}, 0))
+        self.assertFalse(Employee.objects.filter(id_no='EMP002').exists())
+
+    def test_export_imports_back(self):
+        Employee.objects.create(
+            name='Ana', id_no='EMP002', supervisor=Employee.objects.get(id_no='EMP001'),
+            department='hr', status='on_leave', hire_date=date(2024, 2, 1),
+        )
+        Employee.objects.create(name='Ben', id_no='EMP003', supervisor=Employee.objects.get(id_no='EMP002'))
+        fields = ('name', 'id_no', 'supervisor__id_no', 'department', 'status', 'hire_date')
+        before = list(Employee.objects.order_by('id_no').values_list(*fields))
+        queryset = Employee.objects.select_related('supervisor').order_by('name', 'id')
+
+        for filename, stream in (('roster.csv', exports.stream_csv), ('roster.xlsx', exports.stream_xlsx)):
+            with self.subTest(filename):
+                data = b''.join(
+                    line if isinstance(line, bytes) else line.encode()
+                    for line in stream(queryset, exports.EMPLOYEE_COLUMNS, filename).streaming_content
+                )
+                Employee.objects.all().delete()
+                result = import_employees(read_rows(io.BytesIO(data), filename))
+                self.assertEqual((result['errors'], result['created']), ([], 3))
+                self.assertEqual(list(Employee.objects.order_by('id_no').values_list(*fields)), before)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class AuditPartitionTests(TestCase):
+    """Entries go to the table of their month; reads span months and legacy app_auditlog rows"""
+
+    def entry(self, timestamp, description):
+        entry = audit.make_entry('UPDATE', description=description)
+        entry.timestamp = timestamp
+        return entry
+
+    def test_entries_are_routed_to_their_month(self):
+        audit_partitions.save([
+            self.entry(utc(2025, 1, 31, 23, 59), 'january'),
+            self.entry(utc(2025, 2, 1), 'february'),
+            self.entry(utc(2025, 2, 14), 'february'),
+        ])
+        self.assertEqual(audit_partitions.months_between(), [(2025, 2), (2025, 1)])
+        self.assertEqual(audit_partitions.partition_model(2025, 1).objects.count(), 1)
+        self.assertEqual(audit_partitions.partition_model(2025, 2).objects.count(), 2)
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_reads_merge_legacy_rows_newest_first(self):
+        audit_partitions.save([self.entry(utc(2025, 1, 10), 'jan 10'), self.entry(utc(2025, 2, 10), 'feb 10')])
+        AuditLog.objects.bulk_create([self.entry(utc(2025, 1, 20), 'legacy jan 20'), self.entry(utc(2024, 12, 1), 'legacy dec')])
+
+        descriptions = [entry.description for entry in audit_partitions.entries()]
+        self.assertEqual(descriptions, ['feb 10', 'legacy jan 20', 'jan 10', 'legacy dec'])
+        in_january = audit_partitions.entries(start=utc(2025, 1, 1), end=utc(2025, 2, 1))
+        self.assertEqual([entry.description for entry in in_january], ['legacy jan 20', 'jan 10'])
+        self.assertEqual(audit_partitions.count(), 4)
+
+    def test_drop_removes_whole_months(self):
+        audit_partitions.save([self.entry(utc(2025, 1, 10), 'old'), self.entry(utc(2025, 2, 10), 'kept')])
+        dropped = audit_partitions.drop(utc(2025, 2, 1))
+        self.assertEqual(dropped, {audit_partitions.table_name(2025, 1): 1})
+        self.assertEqual([entry.description for entry in audit_partitions.entries()], ['kept'])
+
+
+class AuditPageTests(TestCase):
+    """page() cursors must walk across months and legacy rows without gaps or repeats"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def entry(timestamp, description):
+            entry = audit.make_entry('LOGIN' if 'login' in description else 'UPDATE', description=description)
+            entry.timestamp = timestamp
+            return entry
+
+        # Same-timestamp rows in one month, rows in three months, legacy rows in between
+        same = utc(2025, 2, 10, 8)
+        audit_partitions.save([
+            entry(utc(2025, 3, 1), 'mar 1'),
+            entry(same, 'feb 10 a'), entry(same, 'feb 10 b login'), entry(same, 'feb 10 c'),
+            entry(utc(2025, 1, 5), 'jan 5 login'),
+            entry(utc(2025, 1, 31, 23), 'jan 31'),
+        ])
+        AuditLog.objects.bulk_create([
+            entry(utc(2025, 2, 20), 'legacy feb 20'),
+            entry(utc(2025, 1, 20), 'legacy jan 20 login'),
+        ])
+
+    def walk(self, limit, **filters):
+        pages = []
+        cursor = None
+        while True:
+            rows, cursor = audit_partitions.page(cursor=cursor, limit=limit, **filters)
+            pages.append([row.description for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_in_order(self):
+        everything = [entry.description for entry in audit_partitions.entries()]
+        self.assertEqual(len(everything), 8)
+        for limit in (1, 2, 3, 8):
+            pages = self.walk(limit)
+            self.assertEqual(sum(pages, []), everything)
+            self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_filters_apply_across_months(self):
+        self.assertEqual(self.walk(1, action='LOGIN'), [['feb 10 b login'], ['legacy jan 20 login'], ['jan 5 login']])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            audit_partitions.page(cursor='not-a-cursor')
+
+
+class AuditBulkUpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x')
+        cls.active = Employee.objects.create(name='Ana', id_no='EMP001', status='active', department='admin')
+        cls.inactive = Employee.objects.create(name='Ben', id_no='EMP002', status='inactive', department='admin')
+
+    def updates(self):
+        return audit_partitions.entries(action='UPDATE')
+
+    def test_one_entry_per_changed_row_with_only_changed_fields(self):
+        count = audit.bulk_update(
+            Employee.objects.all(), {'status': 'inactive', 'department': 'admin'}, user=self.staff,
+            describe=lambda row: f"{row['name']}: {row['status']}", label_fields=('name',),
+        )
+        self.assertEqual(count, 2)
+
+        [entry] = self.updates()
+        self.assertEqual(entry.object_id, self.active.pk)
+        self.assertEqual(entry.content_type.model_class(), Employee)
+        self.assertEqual(entry.user, self.staff)
+        self.assertEqual(entry.old_values, {'status': 'active'})
+        self.assertEqual(entry.new_values, {'status': 'inactive'})
+        self.assertEqual(entry.description, 'Ana: active')
+
+    def test_no_entries_when_nothing_changes(self):
+        audit.bulk_update(Employee.objects.filter(pk=self.inactive.pk), {'status': 'inactive'})
+        self.assertEqual(self.updates(), [])
+
+    def test_dates_are_stored_as_text(self):
+        audit.bulk_update(Employee.objects.filter(pk=self.active.pk), {'hire_date': date(2024, 5, 1)})
+        [entry] = self.updates()
+        self.assertEqual((entry.old_values, entry.new_values), ({'hire_date': None}, {'hire_date': '2024-05-01'}))
+
+
+class ProfileMiddlewareTests(TestCase):
+    """get_profile() must follow the user when login()/logout() run during the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('official', password='x')
+        cls.other = User.objects.create_user('other', password='x')
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        UserProfileMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_login_after_anonymous_middleware(self):
+        request = self.request(AnonymousUser())
+        self.assertIsNone(get_profile(request))
+        request.user = self.user
+        self.assertEqual(get_profile(request).user_id, self.user.pk)
+
+    def test_switching_and_logging_out(self):
+        request = self.request(self.user)
+        request.user = self.other
+        self.assertEqual(get_profile(request).user_id, self.other.pk)
+        request.user = AnonymousUser()
+        self.assertIsNone(get_profile(request))
+
+    def test_profile_is_loaded_once(self):
+        request = self.request(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile(request).user_id, self.user.pk)
+
+
+class CalendarMonthCacheTests(TestCase):
+    """A cached month follows the database even when no receiver told it about the change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        staff = User.objects.create_user('staff', password='x')
+        barangay = Barangay.objects.create(name='Barangay 1', code='B1')
+        requirement = Requirement.objects.create(
+            title='Monthly report', description='Monthly report', period='monthly', created_by=staff,
+        )
+        cls.submissions = [
+            RequirementSubmission.objects.create(
+                requirement=requirement, barangay=barangay, due_date=date(2026, 3, day), year=2026,
+            )
+            for day in (10, 20)
+        ]
+
+    def test_queryset_update_changes_the_month(self):
+        before = calendar_feed.get_month(2026, 3)
+        RequirementSubmission.objects.filter(pk=self.submissions[0].pk).update(
+            status='approved', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        after = calendar_feed.get_month(2026, 3)
+        self.assertNotEqual(before['etag'], after['etag'])
+        self.assertEqual(after['items'][0]['status'], 'approved')
+
+    def test_queryset_delete_changes_the_month(self):
+        calendar_feed.get_month(2026, 3)
+        RequirementSubmission.objects.filter(pk=self.submissions[1].pk).delete()
+        self.assertEqual([item['id'] for item in calendar_feed.get_month(2026, 3)['items']], [self.submissions[0].pk])
+
+
+class OrgTreeCacheTests(TestCase):
+    """Another process invalidating the tree reaches this one through the shared version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = Employee.objects.create(name='Boss', id_no='EMP001')
+        cls.staff = Employee.objects.create(name='Staff', id_no='EMP002')
+
+    def setUp(self):
+        org_chart.invalidate()
+
+    def test_version_bump_from_elsewhere_is_picked_up(self):
+        start = org_chart.time.monotonic()
+        with mock.patch.object(org_chart.time, 'monotonic', return_value=start):
+            self.assertEqual(org_chart.get_tree().direct_count(self.boss.pk), 0)
+        # What a receiver in another worker does: no signal here, only the shared version moves
+        Employee.objects.filter(pk=self.staff.pk).update(supervisor=self.boss)
+        cache.incr(org_chart.VERSION_KEY)
+
+        with mock.patch.object(org_chart.time, 'monotonic', return_value=start + 0.5):
+            with self.assertNumQueries(0):
+                self.assertEqual(org_chart.get_tree().direct_count(self.boss.pk), 0)
+        with mock.patch.object(org_chart.time, 'monotonic', return_value=start + 2):
+            self.assertEqual(org_chart.get_tree().direct_count(self.boss.pk), 1)
@@ -29,6 +29,8 @@ urlpatterns = [
     #  Changed from /admin/submissions/ to /dilg/submissions/
     path('api/eligibility-request/<int:request_id>/', views.api_get_eligibility_request, name='api_get_eligibility_request'),
     path('api/admin/calendar/', views.admin_calendar_view, name='admin_calendar'),
+    path('api/admin/calendar/feed/', views.admin_calendar_feed_url, name='admin_calendar_feed_url'),
+    path('api/admin/calendar/<str:token>.ics', views.admin_calendar_ics, name='admin_calendar_ics'),
     path('dilg/submissions/', views.admin_submissions_page, name='admin_submissions_page'),
     path('dilg/application-requests/', views.application_request, name='application_request'),
 
@@ -66,18 +68,24 @@ urlpatterns = [
     path('api/requirements/submission/<int:submission_id>/delete/', views.api_submission_delete, name='api_submission_delete'),
     path('api/requirements/attachment/<int:attachment_id>/delete/', views.api_attachment_delete, name='api_attachment_delete'),
     path('api/barangay/<int:barangay_id>/status/', views.get_barangay_status, name='barangay_status'),
+    path('api/barangays/status/', views.api_barangay_statuses, name='barangay_statuses'),
+    path('api/compliance/matrix/', views.api_compliance_matrix, name='api_compliance_matrix'),
+    path('api/admin/audit-log/', views.api_audit_log, name='api_audit_log'),
     
     # ============================================
     # API ENDPOINTS - DILG ADMIN REVIEW
     # ============================================
     path('api/admin/submissions/', views.api_admin_submissions_list, name='api_admin_submissions_list'),
     path('api/admin/review/<int:submission_id>/', views.api_admin_review_submission, name='api_admin_review_submission'),
+    path('api/admin/review/bulk/', views.api_admin_bulk_review_submissions, name='api_admin_bulk_review_submissions'),
     
     # ============================================
     # API ENDPOINTS - ELIGIBILITY REQUESTS
     # ============================================
     path('api/eligibility/submit/', views.submit_eligibility_request, name='submit_eligibility_request'),
     path('api/eligibility/update-status/', views.update_application_status, name='update_application_status'),
+    path('api/eligibility/generate-certificates/', views.api_generate_certificates, name='api_generate_certificates'),
+    path('api/eligibility/<int:request_id>/certificate/', views.api_download_certificate, name='api_download_certificate'),
     
     # ============================================
     # API ENDPOINTS - EMPLOYEES
@@ -87,8 +95,13 @@ urlpatterns = [
     path('api/employees/edit/<int:employee_id>/', views.edit_employee, name='edit_employee'),
     path('api/employees/delete/<int:employee_id>/', views.delete_employee, name='delete_employee'),
     path('api/employees/export/', views.export_employees, name='export_employees'),
+    path('api/employees/import/', views.import_employees, name='import_employees'),
+    path('api/eligibility/search/', views.api_applicant_search, name='api_applicant_search'),
+    path('api/eligibility/export/', views.export_eligibility_requests, name='export_eligibility_requests'),
+    path('api/admin/submissions/export/', views.export_submissions, name='export_submissions'),
     path('api/employees/search/', views.employee_search_api, name='employee_search_api'),
     path('api/employees/bulk/', views.bulk_employee_operations, name='bulk_employee_operations'),
+    path('api/employees/org-chart/', views.api_org_chart, name='api_org_chart'),
     
     
     # ============================================
@@ -12,7 +12,7 @@ from .models import UserProfile
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 from .decorators import role_required
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Avg, Sum, Prefetch
 from django.db import transaction, connection
 from django.core.paginator import Paginator
 from django.core.cache import cache
@@ -21,6 +21,7 @@ import csv
 import openpyxl
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.db.models import Q, Count, Avg, Sum  
 from .models import EligibilityRequest, Barangay, Requirement, RequirementSubmission, RequirementAttachment, Notification, Announcement, FileCategory, MonitoringFile
 from django.views.decorators.http import require_POST
@@ -36,6 +37,13 @@ from datetime import timedelta
 import traceback
 from PIL import Image
 import pytesseract, PyPDF2
+from .categorization import score_text, category_from_filename
+from . import search as ranked_search
+from . import audit, org_chart
+from .pagination import InvalidCursor, keyset_page, page_size
+from .reviews import REVIEW_ACTIONS, review_message, review_submissions
+from django.conf import settings
+from django.urls import reverse
 
 
 
@@ -70,7 +78,7 @@ def landing_page(request):
 def logout_view(request):
     if request.user.is_authenticated:
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='LOGOUT',
                 ip_address=get_client_ip(request),
@@ -374,9 +382,10 @@ def employees_profile(request):
     # Base queryset with optimizations
     employees = Employee.objects.select_related('supervisor').prefetch_related('subordinates')
     
-    # Apply filters
+    # Apply filters (full-text index when available, icontains otherwise)
     if search_query:
-        employees = employees.filter(
+        matched = ranked_search.matching(employees, ranked_search.EMPLOYEE_INDEX, search_query)
+        employees = matched if matched is not None else employees.filter(
             Q(name__icontains=search_query) |
             Q(id_no__icontains=search_query) |
             Q(email__icontains=search_query) |
@@ -580,6 +589,10 @@ def restore_employee(request, employee_id):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+# Results returned by the typeahead endpoints
+TYPEAHEAD_LIMIT = 10
+
+
 @login_required
 def employee_search_api(request):
     """AJAX endpoint for advanced employee search"""
@@ -588,6 +601,14 @@ def employee_search_api(request):
     if len(query) < 2:
         return JsonResponse({'employees': []})
     
+    fields = ('id', 'name', 'id_no', 'email', 'department', 'status')
+    
+    # Ranked prefix match on the full-text index
+    ids = ranked_search.search_ids(ranked_search.EMPLOYEE_INDEX, query, limit=TYPEAHEAD_LIMIT)
+    if ids is not None:
+        rows = {row['id']: row for row in Employee.objects.filter(pk__in=ids).values(*fields)}
+        return JsonResponse({'employees': [rows[pk] for pk in ids if pk in rows]})
+    
     # Complex search across multiple fields
     try:
         employees = Employee.objects.filter(
@@ -596,7 +617,7 @@ def employee_search_api(request):
             Q(email__icontains=query) |
             Q(position__icontains=query) |
             Q(department__icontains=query)
-        ).values('id', 'name', 'id_no', 'email', 'department', 'status')[:10]
+        ).values(*fields)[:TYPEAHEAD_LIMIT]
     except:
         employees = Employee.objects.filter(
             Q(name__icontains=query) |
@@ -608,6 +629,88 @@ def employee_search_api(request):
     })
 
 
+# Largest roster accepted through the web form; bigger files go through
+# `manage.py import_employees`
+MAX_IMPORT_FILE_SIZE = 10 * 1024 * 1024
+
+
+@login_required
+@require_http_methods(["POST"])
+def import_employees(request):
+    """
+    Import employees from an uploaded CSV or XLSX roster ('file').
+
+    Form fields: dry_run=true only validates, skip_invalid=true inserts the
+    valid rows even when others fail. Returns the per-row errors.
+    """
+    from .employee_import import ImportFileError, import_employees as run_import, read_rows
+
+    try:
+        if request.user.userprofile.role != 'dilg staff':
+            return JsonResponse({'success': False, 'error': 'Unauthorized - Admin only'}, status=403)
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return JsonResponse({'success': False, 'error': 'No file uploaded'}, status=400)
+        if upload.size > MAX_IMPORT_FILE_SIZE:
+            return JsonResponse({'success': False, 'error': 'File too large (max 10 MB); use the import_employees command'}, status=400)
+
+        try:
+            result = run_import(
+                read_rows(upload, upload.name),
+                user=request.user,
+                dry_run=request.POST.get('dry_run') == 'true',
+                skip_invalid=request.POST.get('skip_invalid') == 'true',
+            )
+        except ImportFileError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+        print(f"📥 Employee import by {request.user.username}: {result['created']} created, "
+              f"{len(result['errors'])} invalid rows")
+
+        return JsonResponse({'success': not result['errors'] or result['created'] > 0, **result})
+
+    except Exception as e:
+        print(f"❌ Employee import error: {str(e)}")
+        print(traceback.format_exc())
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_org_chart(request):
+    """
+    Employee org chart as nested JSON.
+
+    ?root=<employee id> returns that employee's branch (default: every
+    top-level employee), ?depth=<n> limits how many levels are expanded.
+    Every node carries its depth, direct_reports and total headcount below it.
+    """
+    try:
+        tree = org_chart.get_tree()
+
+        root = request.GET.get('root')
+        max_depth = request.GET.get('depth')
+        try:
+            root = int(root) if root else None
+            max_depth = max(0, int(max_depth)) if max_depth else None
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'root and depth must be integers'}, status=400)
+
+        if root is not None and root not in tree:
+            return JsonResponse({'success': False, 'error': 'Employee not found'}, status=404)
+
+        return JsonResponse({
+            'success': True,
+            'total_employees': len(tree.nodes),
+            'chain': [tree.nodes[pk]['name'] for pk in tree.chain(root)] if root is not None else [],
+            'chart': tree.chart(root, max_depth),
+        })
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 # Bulk operations
 @login_required
 @require_http_methods(["POST"])
@@ -621,53 +724,52 @@ def bulk_employee_operations(request):
         if not employee_ids:
             return JsonResponse({'success': False, 'error': 'No employees selected'})
         
-        with transaction.atomic():
+        with transaction.atomic(), audit.batch():
             employees = Employee.objects.filter(id__in=employee_ids)
             
+            def describe(row):
+                return f"Employee {row['name']} was updated (bulk {action})"
+            
             if action == 'delete':
+                # employee_post_delete records one entry per employee into the batch
                 count = employees.count()
                 employees.delete()
                 message = f'{count} employees deleted successfully'
                 
             elif action == 'activate':
-                if hasattr(Employee, 'status'):
-                    count = employees.update(status='active')
-                    message = f'{count} employees activated'
-                else:
-                    return JsonResponse({'success': False, 'error': 'Status field not available'})
+                count = audit.bulk_update(employees, {'status': 'active'}, user=request.user,
+                                          describe=describe, label_fields=('name',))
+                message = f'{count} employees activated'
                 
             elif action == 'deactivate':
-                if hasattr(Employee, 'status'):
-                    count = employees.update(status='inactive')
-                    message = f'{count} employees deactivated'
-                else:
-                    return JsonResponse({'success': False, 'error': 'Status field not available'})
+                count = audit.bulk_update(employees, {'status': 'inactive'}, user=request.user,
+                                          describe=describe, label_fields=('name',))
+                message = f'{count} employees deactivated'
                 
             elif action == 'update_department':
                 department = data.get('department')
                 if not department:
                     return JsonResponse({'success': False, 'error': 'Department required'})
-                if hasattr(Employee, 'department'):
-                    count = employees.update(department=department)
-                    message = f'{count} employees moved to {department}'
-                else:
-                    return JsonResponse({'success': False, 'error': 'Department field not available'})
+                count = audit.bulk_update(employees, {'department': department}, user=request.user,
+                                          describe=describe, label_fields=('name',))
+                ranked_search.index_employees(employee_ids)
+                message = f'{count} employees moved to {department}'
                 
             else:
                 return JsonResponse({'success': False, 'error': 'Invalid action'})
             
-            # Log bulk operation
-            try:
-                AuditLog.objects.create(
-                    user=request.user,
-                    action='UPDATE',
-                    description=f"Bulk operation: {action} on {len(employee_ids)} employees"
-                )
-            except:
-                pass  # Skip audit logging if AuditLog doesn't exist
+            # Summary of the whole operation next to the per-employee entries
+            audit.record(
+                'DELETE' if action == 'delete' else 'UPDATE',
+                user=request.user,
+                new_values={'action': action, 'employee_ids': employee_ids, 'count': count},
+                description=f"Bulk operation: {action} on {count} employees"
+            )
             
-            # Clear cache
-            cache.delete('employee_stats')
+            # Clear cache once the changes are committed, so no other request
+            # rebuilds the stats or the org tree from the old rows meanwhile
+            transaction.on_commit(lambda: cache.delete('employee_stats'))
+            transaction.on_commit(org_chart.invalidate)
             
             return JsonResponse({'success': True, 'message': message})
             
@@ -1131,7 +1233,7 @@ def approve_user(request, user_id):
         profile.save()
         
         # Log the approval
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='UPDATE',
             description=f"Approved user: {profile.user.username} ({profile.role})"
@@ -1155,7 +1257,7 @@ def reject_user(request, user_id):
         username = profile.user.username
         
         # Log before deletion
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='DELETE',
             description=f"Rejected and deleted user: {username} ({profile.role})"
@@ -1173,94 +1275,17 @@ def reject_user(request, user_id):
 
 @login_required
 def export_employees(request):
-    """Export employees data"""
+    """Export employees data (streamed; see exports.py)"""
+    from .exports import EMPLOYEE_COLUMNS, export_response
+
     format_type = request.GET.get('format', 'csv')
     
-    employees = Employee.objects.select_related('supervisor').all()
-    
-    if format_type == 'excel':
-        # Create Excel file
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="employees_{datetime.now().strftime("%Y%m%d")}.xlsx"'
-        
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Employees'
-        
-        # Headers
-        headers = ['ID', 'Name', 'Employee ID', 'Email', 'Department', 'Position', 'Status', 'Task', 'Supervisor', 'Hire Date', 'Created At']
-        for col, header in enumerate(headers, 1):
-            worksheet.cell(row=1, column=col, value=header)
-        
-        # Data
-        for row, employee in enumerate(employees, 2):
-            worksheet.cell(row=row, column=1, value=employee.id)
-            worksheet.cell(row=row, column=2, value=employee.name)
-            worksheet.cell(row=row, column=3, value=employee.id_no)
-            worksheet.cell(row=row, column=4, value=getattr(employee, 'email', '') or '')
-            
-            # Handle department display
-            if hasattr(employee, 'get_department_display'):
-                dept = employee.get_department_display() or ''
-            else:
-                dept = getattr(employee, 'department', '') or ''
-            worksheet.cell(row=row, column=5, value=dept)
-            
-            worksheet.cell(row=row, column=6, value=getattr(employee, 'position', '') or '')
-            
-            # Handle status display
-            if hasattr(employee, 'get_status_display'):
-                status = employee.get_status_display()
-            else:
-                status = getattr(employee, 'status', '') or ''
-            worksheet.cell(row=row, column=7, value=status)
-            
-            worksheet.cell(row=row, column=8, value=getattr(employee, 'task', '') or '')
-            worksheet.cell(row=row, column=9, value=employee.supervisor.name if employee.supervisor else '')
-            worksheet.cell(row=row, column=10, value=getattr(employee, 'hire_date', ''))
-            worksheet.cell(row=row, column=11, value=getattr(employee, 'created_at', ''))
-        
-        workbook.save(response)
-        
-    else:  # CSV format
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="employees_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Name', 'Employee ID', 'Email', 'Department', 'Position', 'Status', 'Task', 'Supervisor', 'Hire Date', 'Created At'])
-        
-        for employee in employees:
-            # Handle department display
-            if hasattr(employee, 'get_department_display'):
-                dept = employee.get_department_display() or ''
-            else:
-                dept = getattr(employee, 'department', '') or ''
-            
-            # Handle status display
-            if hasattr(employee, 'get_status_display'):
-                status = employee.get_status_display()
-            else:
-                status = getattr(employee, 'status', '') or ''
-            
-            writer.writerow([
-                employee.id,
-                employee.name,
-                employee.id_no,
-                getattr(employee, 'email', '') or '',
-                dept,
-                getattr(employee, 'position', '') or '',
-                status,
-                getattr(employee, 'task', '') or '',
-                employee.supervisor.name if employee.supervisor else '',
-                getattr(employee, 'hire_date', ''),
-                getattr(employee, 'created_at', '')
-            ])
+    employees = Employee.objects.select_related('supervisor').order_by('name', 'id')
+    response = export_response(employees, EMPLOYEE_COLUMNS, 'employees', format_type, sheet_title='Employees')
     
     # Log export action
     try:
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='CREATE',
             description=f"Exported employees data as {format_type.upper()}"
@@ -1271,6 +1296,101 @@ def export_employees(request):
     return response
 
 
+@login_required
+@require_http_methods(["GET"])
+def api_applicant_search(request):
+    """Typeahead over eligibility applicants by name, barangay or email (?q=), best match first"""
+    if request.user.userprofile.role != 'dilg staff':
+        return JsonResponse({'success': False, 'error': 'Unauthorized - Admin only'}, status=403)
+
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'applicants': []})
+
+    applicants = EligibilityRequest.objects.only(
+        'id', 'first_name', 'middle_initial', 'last_name', 'barangay', 'status', 'position_type', 'date_submitted'
+    )
+    ids = ranked_search.search_ids(ranked_search.APPLICANT_INDEX, query, limit=TYPEAHEAD_LIMIT)
+    if ids is not None:
+        found = applicants.in_bulk(ids)
+        applicants = [found[pk] for pk in ids if pk in found]
+    else:
+        for term in query.split():
+            applicants = applicants.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term) | Q(barangay__icontains=term)
+            )
+        applicants = applicants.order_by('-date_submitted')[:TYPEAHEAD_LIMIT]
+
+    return JsonResponse({
+        'applicants': [
+            {
+                'id': applicant.id,
+                'full_name': applicant.full_name,
+                'barangay': applicant.barangay,
+                'status': applicant.status,
+                'position_type': applicant.position_type,
+                'date_submitted': applicant.date_submitted.strftime('%Y-%m-%d'),
+            }
+            for applicant in applicants
+        ]
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_eligibility_requests(request):
+    """Export eligibility requests as CSV or XLSX (?format=excel), filtered by ?status= and ?archived="""
+    from .exports import ELIGIBILITY_COLUMNS, export_response
+
+    if request.user.userprofile.role != 'dilg staff':
+        return JsonResponse({'success': False, 'error': 'Unauthorized - Admin only'}, status=403)
+
+    format_type = request.GET.get('format', 'csv')
+    eligibility_requests = EligibilityRequest.objects.select_related('approved_by').order_by('-date_submitted', '-id')
+    if request.GET.get('status'):
+        eligibility_requests = eligibility_requests.filter(status=request.GET['status'])
+    if request.GET.get('archived') in ('true', 'false'):
+        eligibility_requests = eligibility_requests.filter(archived=request.GET['archived'] == 'true')
+
+    audit.record(
+        user=request.user,
+        action='CREATE',
+        description=f"Exported eligibility requests as {format_type.upper()}"
+    )
+    return export_response(
+        eligibility_requests, ELIGIBILITY_COLUMNS, 'eligibility_requests', format_type, sheet_title='Eligibility Requests'
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_submissions(request):
+    """Export requirement submissions as CSV or XLSX, filtered by ?status=, ?barangay=, ?requirement= and ?year="""
+    from .exports import SUBMISSION_COLUMNS, export_response
+
+    if request.user.userprofile.role != 'dilg staff':
+        return JsonResponse({'success': False, 'error': 'Unauthorized - Admin only'}, status=403)
+
+    format_type = request.GET.get('format', 'csv')
+    submissions = RequirementSubmission.objects.select_related(
+        'requirement', 'barangay', 'submitted_by', 'reviewed_by'
+    ).order_by('-due_date', 'barangay__name', 'id')
+    try:
+        for param, lookup in (('barangay', 'barangay_id'), ('requirement', 'requirement_id'), ('year', 'year')):
+            if request.GET.get(param):
+                submissions = submissions.filter(**{lookup: int(request.GET[param])})
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'barangay, requirement and year must be integers'}, status=400)
+    if request.GET.get('status'):
+        submissions = submissions.filter(status=request.GET['status'])
+
+    audit.record(
+        user=request.user,
+        action='CREATE',
+        description=f"Exported requirement submissions as {format_type.upper()}"
+    )
+    return export_response(submissions, SUBMISSION_COLUMNS, 'submissions', format_type, sheet_title='Submissions')
+
 
 #---------------ANALYTICS DASHBOARD VIEW---------------#
 @login_required
@@ -2026,42 +2146,57 @@ def smart_categorize_file(file, file_type_hint):
     
     Returns: 'appointive_certificates', 'elective_certificates', 'ids', or 'signatures'
     """
+    category, _ = categorize_file_with_text(file, file_type_hint)
+    return category
+
+
+def categorize_file_with_text(file, file_type_hint=None):
+    """
+    Same as smart_categorize_file, but also returns the extracted text
+    (empty when categorized from the hint or filename alone).
+    
+    Returns: (category, text_content)
+    """
     try:
         print(f"🔍 Analyzing: {file.name}")
         
         # Force categorization based on file type hint
         if file_type_hint in ['id_front', 'id_back']:
             print(f"   ✅ Category: ids (based on file type)")
-            return 'ids'
+            return 'ids', ''
         
         if file_type_hint == 'signature':
             print(f"   ✅ Category: signatures (based on file type)")
-            return 'signatures'
+            return 'signatures', ''
         
         # For other files, analyze content
-        file_extension = file.name.lower().split('.')[-1]
-        text_content = ""
-        
-        # Extract text based on file type
-        if file_extension == 'pdf':
-            text_content = extract_text_from_pdf(file)
-        elif file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
-            text_content = extract_text_from_image(file)
+        text_content = extract_text_from_file(file)
         
         # If we have text, analyze it
         if text_content:
             category = analyze_text_for_category(text_content, file.name)
             print(f"   ✅ Category: {category} (based on content analysis)")
-            return category
+            return category, text_content
         
         # Fallback to filename analysis
         category = categorize_by_filename(file.name)
         print(f"   ✅ Category: {category} (based on filename)")
-        return category
+        return category, ''
         
     except Exception as e:
         print(f"   ⚠️ Categorization error: {e}")
-        return 'ids'  # Default fallback
+        return 'ids', ''  # Default fallback
+
+
+def extract_text_from_file(file):
+    """Extract text from a PDF or image based on its extension ('' for other files)"""
+    file_extension = file.name.lower().split('.')[-1]
+    
+    if file_extension == 'pdf':
+        return extract_text_from_pdf(file)
+    elif file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
+        return extract_text_from_image(file)
+    return ""
 
 
 def extract_text_from_pdf(file):
@@ -2094,79 +2229,12 @@ def analyze_text_for_category(text, filename):
     """
     Analyze extracted text to determine certificate type
     """
-    text_lower = text.lower()
-    filename_lower = filename.lower()
-    
-    # Keywords for different certificate types
-    appointive_keywords = [
-        'appointive official',
-        'appointive position',
-        'date of appointment',
-        'appointing authority',
-        'appointing punong barangay',
-        'barangay secretary',
-        'barangay treasurer',
-        'appointment',
-        'csc-erpo boe form 1(b)'
-    ]
-    
-    elective_keywords = [
-        'elective official',
-        'elective position',
-        'date of election',
-        'term of office',
-        'punong barangay',
-        'sanguniang barangay member',
-        'elected',
-        'election',
-        'csc-erpo boe form 1(a)'
-    ]
-    
-    id_keywords = [
-        'identification',
-        'id card',
-        'government issued id',
-        'driver',
-        'passport',
-        'sss',
-        'philhealth',
-        'tin',
-        'voter'
-    ]
-    
-    signature_keywords = [
-        'signature',
-        'sign here',
-        'e-signature'
-    ]
-    
-    # Count keyword matches
-    appointive_score = sum(1 for keyword in appointive_keywords if keyword in text_lower)
-    elective_score = sum(1 for keyword in elective_keywords if keyword in text_lower)
-    id_score = sum(1 for keyword in id_keywords if keyword in text_lower)
-    signature_score = sum(1 for keyword in signature_keywords if keyword in text_lower)
-    
-    # Check filename hints
-    if any(word in filename_lower for word in ['id_front', 'id_back', 'identification']):
-        id_score += 5
-    if 'signature' in filename_lower or 'sign' in filename_lower:
-        signature_score += 5
-    if 'appointive' in filename_lower:
-        appointive_score += 3
-    if 'elective' in filename_lower:
-        elective_score += 3
-    
-    print(f"    Scores - Appointive:{appointive_score}, Elective:{elective_score}, ID:{id_score}, Signature:{signature_score}")
-    
-    # Determine category based on highest score
-    scores = {
-        'appointive_certificates': appointive_score,
-        'elective_certificates': elective_score,
-        'ids': id_score,
-        'signatures': signature_score
-    }
+    # Keyword lists are compiled into one matcher (see app/categorization.py)
+    scores = score_text(text, filename)
+    
+    print(f"    Scores - Appointive:{scores.get('appointive_certificates', 0)}, Elective:{scores.get('elective_certificates', 0)}, ID:{scores.get('ids', 0)}, Signature:{scores.get('signatures', 0)}")
     
-    max_score = max(scores.values())
+    max_score = max(scores.values()) if scores else 0
     
     if max_score == 0:
         return categorize_by_filename(filename)
@@ -2181,18 +2249,9 @@ def analyze_text_for_category(text, filename):
 
 def categorize_by_filename(filename):
     """Fallback categorization based on filename"""
-    filename_lower = filename.lower()
-    
-    if any(word in filename_lower for word in ['id_front', 'id_back', 'identification', '_id_']):
-        return 'ids'
-    elif any(word in filename_lower for word in ['signature', 'sign', 'esign']):
-        return 'signatures'
-    elif 'appointive' in filename_lower:
-        return 'appointive_certificates'
-    elif 'elective' in filename_lower:
-        return 'elective_certificates'
-    else:
-        return 'ids'
+    return category_from_filename(filename)
+
+
 def save_categorized_eligibility_file(file, category, user_name, file_type, request_id):
     """
     Save file to storage AND create CategorizedFile database entry
@@ -2257,421 +2316,6 @@ def save_categorized_eligibility_file(file, category, user_name, file_type, requ
     return path
 
 
-# Add this helper function for generating certificates (when admin approves)
-def generate_certificate_pdf(eligibility_request):
-    """
-    Generate certificate PDF with DILG logos and proper formatting
-    Fixed: Logo placement, Director name, Table formatting
-    """
-    try:
-        from django.core.files.storage import default_storage
-        from django.core.files.base import ContentFile
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.platypus import Table, TableStyle
-        from io import BytesIO
-        import os
-        from django.conf import settings
-        
-        print(f"\n{'='*70}")
-        print(f"📄 GENERATING OFFICIAL DILG CERTIFICATE")
-        print(f"{'='*70}")
-        print(f"Request ID: {eligibility_request.id}")
-        print(f"Name: {eligibility_request.full_name}")
-        print(f"Position: {eligibility_request.position_type}")
-        print(f"Barangay: {eligibility_request.barangay}")
-        
-        # Determine folder
-        if eligibility_request.position_type == 'appointive':
-            folder = 'appointive_certificates'
-            form_ref = "CSC-ERPO BOE Form 1(b). April 2012"
-            position_label = "(Appointive Official)"
-        else:
-            folder = 'elective_certificates'
-            form_ref = "CSC-ERPO BOE Form 1(a) (Revised, June 2017)"
-            position_label = "(Elective Official)"
-        
-        # Get or create category
-        from .models import FileCategory, CategorizedFile
-        category, _ = FileCategory.objects.get_or_create(
-            name=folder,
-            defaults={
-                'display_name': folder.replace('_', ' ').title(),
-                'folder_path': f'certification_files/{folder}/',
-            }
-        )
-        
-        # Create PDF
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        
-        # === OUTER BORDER ===
-        c.setStrokeColor(colors.HexColor('#1A237E'))
-        c.setLineWidth(2)
-        c.rect(0.4*inch, 0.4*inch, width - 0.8*inch, height - 0.8*inch)
-        
-        # === INNER BORDER ===
-        c.setLineWidth(0.5)
-        c.rect(0.5*inch, 0.5*inch, width - 1*inch, height - 1*inch)
-        
-        # === DILG LOGOS (IMPROVED) ===
-        logo_path = os.path.join(settings.BASE_DIR, 'static', 'Pictures', 'logo1.png')
-        
-        if os.path.exists(logo_path):
-            try:
-                logo_size = 0.7*inch  # Increased size
-                logo_y = height - 1.3*inch
-                
-                # Left logo
-                c.drawImage(logo_path, 0.75*inch, logo_y, 
-                           width=logo_size, height=logo_size, 
-                           preserveAspectRatio=True, mask='auto')
-                
-                # Right logo
-                c.drawImage(logo_path, width - 0.75*inch - logo_size, logo_y, 
-                           width=logo_size, height=logo_size, 
-                           preserveAspectRatio=True, mask='auto')
-                print(f"✓ DILG logos added")
-            except Exception as logo_err:
-                print(f"⚠️ Logo error: {logo_err}")
-        else:
-            print(f"⚠️ Logo not found at: {logo_path}")
-        
-        # === HEADER ===
-        y_pos = height - 1*inch
-        
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width/2, y_pos, "Republic of the Philippines")
-        
-        y_pos -= 0.2*inch
-        c.setFillColor(colors.HexColor('#1A237E'))
-        c.setFont("Helvetica-Bold", 11)
-        c.drawCentredString(width/2, y_pos, "DEPARTMENT OF THE INTERIOR AND")
-        y_pos -= 0.18*inch
-        c.drawCentredString(width/2, y_pos, "LOCAL GOVERNMENT")
-        
-        y_pos -= 0.2*inch
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width/2, y_pos, "REGION IV-A CALABARZON")
-        
-        y_pos -= 0.15*inch
-        c.drawCentredString(width/2, y_pos, "CITY OF LUCENA")
-        
-        # Form reference (right aligned)
-        c.setFont("Helvetica", 7)
-        c.setFillColor(colors.gray)
-        c.drawRightString(width - 0.6*inch, y_pos - 0.3*inch, form_ref)
-        
-        # === HORIZONTAL LINE ===
-        y_pos -= 0.5*inch
-        c.setStrokeColor(colors.black)
-        c.setLineWidth(1)
-        c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
-        
-        # === TITLE SECTION ===
-        y_pos -= 0.5*inch
-        c.setFillColor(colors.HexColor('#1A237E'))
-        c.setFont("Helvetica-Bold", 18)
-        c.drawCentredString(width/2, y_pos, "CERTIFICATION")
-        
-        y_pos -= 0.25*inch
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width/2, y_pos, "on Services Rendered in the Barangay*")
-        
-        y_pos -= 0.2*inch
-        c.setFont("Helvetica-Bold", 10)
-        c.drawCentredString(width/2, y_pos, position_label)
-        
-        # === HORIZONTAL LINE ===
-        y_pos -= 0.3*inch
-        c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
-        
-        # === BODY TEXT ===
-        y_pos -= 0.4*inch
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        
-        text_line = f"This is to certify that "
-        c.drawString(0.75*inch, y_pos, text_line)
-        
-        name_x = 0.75*inch + c.stringWidth(text_line, "Helvetica", 10)
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(name_x, y_pos, eligibility_request.full_name.upper())
-        
-        after_name_x = name_x + c.stringWidth(eligibility_request.full_name.upper(), "Helvetica-Bold", 10)
-        c.setFont("Helvetica", 10)
-        c.drawString(after_name_x, y_pos, " has rendered services in")
-        
-        y_pos -= 0.18*inch
-        barangay_text = f"Barangay {eligibility_request.barangay}, with the following details:"
-        c.drawString(0.75*inch, y_pos, barangay_text)
-        
-        # === TABLE (FIXED FORMATTING) ===
-        y_pos -= 0.5*inch
-        
-        if eligibility_request.position_type == 'appointive':
-            # Appointive table with proper spacing
-            table_data = [
-                ['Position\nHeld', 
-                 'Date of\nAppointment', 
-                 'Inclusive Dates\nFrom', 
-                 'Inclusive Dates\nTo',
-                 'No. of Years\nServed', 
-                 'Appointing Punong\nBarangay Name',
-                 'Date Elected',
-                 'Term of Office\n(years)'],
-                [
-                    'Barangay\nSecretary',
-                    eligibility_request.appointment_from.strftime('%m/%d/%Y') if eligibility_request.appointment_from else 'N/A',
-                    eligibility_request.appointment_from.strftime('%m/%d/%Y') if eligibility_request.appointment_from else 'N/A',
-                    eligibility_request.appointment_to.strftime('%m/%d/%Y') if eligibility_request.appointment_to else 'N/A',
-                    f"{float(eligibility_request.years_in_service)} yrs" if eligibility_request.years_in_service else '0.0 yrs',
-                    eligibility_request.appointing_punong_barangay or 'N/A',
-                    eligibility_request.pb_date_elected.strftime('%m/%d/%Y') if eligibility_request.pb_date_elected else 'N/A',
-                    f"{float(eligibility_request.pb_years_service)} yrs" if eligibility_request.pb_years_service else '0.0 yrs'
-                ]
-            ]
-            
-            # Adjusted column widths for better spacing
-            col_widths = [0.8*inch, 0.75*inch, 0.75*inch, 0.75*inch, 0.7*inch, 1.1*inch, 0.7*inch, 0.7*inch]
-            row_heights = [0.6*inch, 0.5*inch]
-            
-        else:
-            # Elective table - matching official format exactly
-            table_data = [
-                ['Position Held', 'Date of Election\n(mm/dd/yyyy)', 'Term of Office\n(no. of years)', 
-                 'Inclusive Dates\nFrom (mm/dd/yyyy)', 'Inclusive Dates\nTo (mm/dd/yyyy)'],
-                [
-                    eligibility_request.position_held or 'Punong Barangay',
-                    eligibility_request.election_from.strftime('%m/%d/%Y') if eligibility_request.election_from else '',
-                    eligibility_request.term_office or 'November 2025 -\nNovember 2025',
-                    eligibility_request.election_from.strftime('%m/%d/%Y') if eligibility_request.election_from else '',
-                    eligibility_request.election_to.strftime('%m/%d/%Y') if eligibility_request.election_to else ''
-                ]
-            ]
-            
-            col_widths = [1.3*inch, 1.3*inch, 1.3*inch, 1.3*inch, 1.3*inch]
-            row_heights = [0.6*inch, 0.5*inch]
-        
-        # Create table with improved styling
-        table = Table(table_data, colWidths=col_widths, rowHeights=row_heights)
-        
-        table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1A237E')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 7),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-            
-            # Data styling
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 7),
-            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
-            
-            # Borders
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            
-            # Padding
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
-        
-        table.wrapOn(c, width, height)
-        table_height = table._height
-        table.drawOn(c, 0.75*inch, y_pos - table_height)
-        
-        y_pos -= (table_height + 0.4*inch)
-        
-        # === COMPLETED TERM SECTION (ELECTIVE ONLY) ===
-        if eligibility_request.position_type == 'elective':
-            c.setFont("Helvetica-Bold", 9)
-            c.setFillColor(colors.black)
-            c.drawString(0.75*inch, y_pos, "Completed Term of Office?")
-            c.setFont("Helvetica", 9)
-            c.drawString(2.5*inch, y_pos, "(Please check (√) appropriate box)")
-            
-            y_pos -= 0.25*inch
-            
-            completed_term = eligibility_request.completed_term
-            checkbox_size = 0.12*inch
-            
-            # YES checkbox
-            c.rect(0.95*inch, y_pos - checkbox_size/2, checkbox_size, checkbox_size)
-            if completed_term and completed_term.lower() == 'yes':
-                # Draw checkmark
-                c.setLineWidth(2)
-                c.line(0.97*inch, y_pos - checkbox_size/4, 
-                       1.0*inch, y_pos - checkbox_size/1.5)
-                c.line(1.0*inch, y_pos - checkbox_size/1.5,
-                       1.05*inch, y_pos)
-                c.setLineWidth(0.5)
-            
-            c.drawString(1.15*inch, y_pos - 0.05*inch, "YES")
-            
-            # NO checkbox
-            c.rect(1.8*inch, y_pos - checkbox_size/2, checkbox_size, checkbox_size)
-            if completed_term and completed_term.lower() == 'no':
-                # Draw checkmark
-                c.setLineWidth(2)
-                c.line(1.82*inch, y_pos - checkbox_size/4, 
-                       1.85*inch, y_pos - checkbox_size/1.5)
-                c.line(1.85*inch, y_pos - checkbox_size/1.5,
-                       1.90*inch, y_pos)
-                c.setLineWidth(0.5)
-            
-            c.drawString(2.0*inch, y_pos - 0.05*inch, "NO. Specify total number of days not served")
-            
-            y_pos -= 0.25*inch
-            
-            # If NO was selected, show reason box
-            if completed_term and completed_term.lower() == 'no':
-                c.setFont("Helvetica-Bold", 9)
-                c.drawString(0.95*inch, y_pos, "Reason for non-completion:")
-                
-                y_pos -= 0.25*inch
-                
-                # Draw reason box
-                reason_text = eligibility_request.incomplete_reason or 'Not specified'
-                c.setFont("Helvetica", 9)
-                c.setFillColor(colors.HexColor('#f5f5f5'))
-                c.rect(0.95*inch, y_pos - 0.35*inch, 5.5*inch, 0.4*inch, fill=1)
-                
-                c.setFillColor(colors.black)
-                c.drawString(1.05*inch, y_pos - 0.15*inch, reason_text)
-                
-                y_pos -= 0.45*inch
-            
-            # ASSUMED checkbox (always show)
-            c.rect(0.95*inch, y_pos - checkbox_size/2, checkbox_size, checkbox_size)
-            c.drawString(1.15*inch, y_pos - 0.05*inch, "Assumed under rule on succession.")
-            
-            y_pos -= 0.35*inch
-        
-        # === FOOTER TEXT ===
-        c.setFont("Helvetica", 9)
-        c.setFillColor(colors.black)
-        
-        if eligibility_request.position_type == 'elective':
-            # Elective footer text with CSC Resolutions
-            footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {eligibility_request.full_name.upper()}"
-            c.drawString(0.75*inch, y_pos, footer_text)
-            
-            y_pos -= 0.15*inch
-            footer_text2 = "for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance"
-            c.drawString(0.75*inch, y_pos, footer_text2)
-            
-            y_pos -= 0.15*inch
-            footer_text3 = "with CSC Resolution No. 1200865 dated June 14, 2012 and CSC Resolution No."
-            c.drawString(0.75*inch, y_pos, footer_text3)
-            
-            y_pos -= 0.15*inch
-            footer_text4 = "1601257 dated November 21, 2016."
-            c.drawString(0.75*inch, y_pos, footer_text4)
-        else:
-            # Appointive footer text
-            footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {eligibility_request.full_name.upper()}"
-            c.drawString(0.75*inch, y_pos, footer_text)
-            
-            y_pos -= 0.15*inch
-            footer_text2 = "for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance"
-            c.drawString(0.75*inch, y_pos, footer_text2)
-            
-            y_pos -= 0.15*inch
-            footer_text3 = "with CSC Resolution No. 13 series of 2012."
-            c.drawString(0.75*inch, y_pos, footer_text3)
-        
-        # === SIGNATURE SECTION ===
-        y_pos -= 0.5*inch
-        
-        from django.utils import timezone
-        date_text = f"Lucena City, Quezon, {timezone.now().strftime('%B %d, %Y')}."
-        c.drawString(0.75*inch, y_pos, date_text)
-        
-        # === SIGNATURE SECTION (UPDATED DIRECTOR) ===
-        y_pos -= 0.8*inch
-        
-        # Signature line (right side)
-        sig_x = width - 2.8*inch
-        c.setStrokeColor(colors.black)
-        c.setLineWidth(0.5)
-        c.line(sig_x, y_pos, width - 0.75*inch, y_pos)
-        
-        # Director name and title
-        y_pos -= 0.2*inch
-        c.setFont("Helvetica-Bold", 10)
-        c.setFillColor(colors.black)
-        c.drawCentredString(sig_x + 1.025*inch, y_pos, "LEANDRO SIPOY GIGANTOCA, CESE")
-        
-        y_pos -= 0.18*inch
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(sig_x + 1.025*inch, y_pos, "OIC-HUC Director, Lucena City")
-        
-        # Save PDF
-        c.showPage()
-        c.save()
-        
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        
-        print(f"✓ PDF generated successfully ({len(pdf_data)} bytes)")
-        
-        # Create filename
-        safe_name = eligibility_request.full_name.replace(' ', '_').replace('.', '')
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{safe_name}_{eligibility_request.position_type}_Certificate_{timestamp}.pdf"
-        
-        # Save to storage
-        file_path = f"certification_files/{folder}/{filename}"
-        saved_path = default_storage.save(file_path, ContentFile(pdf_data))
-        
-        print(f"✓ PDF saved: {saved_path}")
-        
-        # Create CategorizedFile entry
-        categorized = CategorizedFile.objects.create(
-            file=saved_path,
-            original_filename=filename,
-            file_type='pdf',
-            file_size=len(pdf_data),
-            mime_type='application/pdf',
-            category=category,
-            source='eligibility',
-            detected_content=f'{eligibility_request.get_position_type_display()} Certificate',
-            eligibility_request=eligibility_request,
-            uploaded_by=eligibility_request.approved_by,
-            tags=f"{eligibility_request.full_name}, {eligibility_request.position_type}, Certificate, Approved"
-        )
-        
-        print(f"✓ CategorizedFile created: ID {categorized.id}")
-        category.update_file_count()
-        print(f"✓ Updated folder file count: {category.file_count}")
-        
-        print(f"{'='*70}\n")
-        
-        return saved_path
-        
-    except Exception as e:
-        print(f"\n{'='*70}")
-        print(f"❌ CERTIFICATE GENERATION ERROR")
-        print(f"{'='*70}")
-        print(f"Error: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        print(f"{'='*70}\n")
-        return None
-
-
 # Add these API endpoints for the certificate files page
 
 @require_http_methods(["GET"])
@@ -3083,9 +2727,10 @@ def update_application_status(request):
             except Exception as email_error:
                 print(f"❌ Email error: {str(email_error)}")
         
-        # Generate certificate when approved
+        # Generate certificate when approved (or leave it to the first download)
         certificate_path = None
-        if new_status == 'approved' and old_status != 'approved':
+        lazy_certificate = getattr(settings, 'CERTIFICATE_LAZY_RENDERING', False)
+        if new_status == 'approved' and old_status != 'approved' and not lazy_certificate:
             print(f"\n✅ APPROVAL DETECTED - Generating certificate...")
             certificate_path = generate_certificate_pdf(eligibility_request)
         
@@ -3100,6 +2745,8 @@ def update_application_status(request):
             import os
             response_data['certificate_generated'] = True
             response_data['certificate_filename'] = os.path.basename(certificate_path)
+        if new_status == 'approved':
+            response_data['certificate_url'] = reverse('api_download_certificate', args=[eligibility_request.id])
         
         return JsonResponse(response_data)
         
@@ -3112,457 +2759,27 @@ def update_application_status(request):
 
 def generate_certificate_pdf(eligibility_request):
     """
-    Generate certificate PDF - FIXED for elective incomplete term
+    Generate certificate PDF and register it as a CategorizedFile.
+
+    Only the applicant details are drawn per certificate; the static page
+    comes from the cached template in certificates.py.
     """
     try:
-        from django.core.files.storage import default_storage
-        from django.core.files.base import ContentFile
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.platypus import Table, TableStyle
-        from io import BytesIO
-        import os
-        from django.conf import settings
-        
-        print(f"\n{'='*70}")
-        print(f"📄 GENERATING CERTIFICATE")
-        print(f"Position: {eligibility_request.position_type}")
-        if eligibility_request.position_type == 'elective':
-            print(f"Completed Term: {eligibility_request.completed_term}")
-            print(f"Days Not Served: {eligibility_request.days_not_served}")
-            print(f"Reason: {eligibility_request.incomplete_reason}")
-        print(f"{'='*70}")
-        
-        # Determine folder based on position type AND completion status
-        if eligibility_request.position_type == 'appointive':
-            folder = 'appointive_certificates'
-            form_ref = "CSC-ERPO BOE Form 1(b). April 2012"
-            position_label = "(Appointive Official)"
-        else:
-            folder = 'elective_certificates'
-            form_ref = "CSC-ERPO BOE Form 1(a) (Revised, June 2017)"
-            position_label = "(Elective Official)"
-        
-        from .models import FileCategory, CategorizedFile
-        category, _ = FileCategory.objects.get_or_create(
-            name=folder,
-            defaults={
-                'display_name': folder.replace('_', ' ').title(),
-                'folder_path': f'certification_files/{folder}/',
-            }
-        )
-        
-        # Create PDF
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        
-        # === BORDERS ===
-        c.setStrokeColor(colors.HexColor('#1A237E'))
-        c.setLineWidth(2)
-        c.rect(0.4*inch, 0.4*inch, width - 0.8*inch, height - 0.8*inch)
-        
-        c.setLineWidth(0.5)
-        c.rect(0.5*inch, 0.5*inch, width - 1*inch, height - 1*inch)
-        
-        # === LOGOS ===
-        from reportlab.lib.utils import ImageReader
-        
-        # Try multiple possible logo paths
-        possible_logo_paths = [
-            os.path.join(settings.BASE_DIR, 'static', 'Pictures', 'logo1.png'),
-            os.path.join(settings.BASE_DIR, 'app', 'static', 'Pictures', 'logo1.png'),
-            os.path.join(settings.BASE_DIR, 'static', 'pictures', 'logo1.png'),
-            os.path.join(settings.STATIC_ROOT, 'Pictures', 'logo1.png') if hasattr(settings, 'STATIC_ROOT') and settings.STATIC_ROOT else None,
-        ]
-        
-        logo_path = None
-        for path in possible_logo_paths:
-            if path and os.path.exists(path):
-                logo_path = path
-                print(f"✓ Logo found at: {path}")
-                break
-        
-        if logo_path:
-            try:
-                # Use ImageReader for better compatibility
-                img = ImageReader(logo_path)
-                logo_size = 0.7*inch
-                logo_y = height - 1.3*inch
-                
-                # Draw left logo
-                c.drawImage(img, 0.75*inch, logo_y, 
-                           width=logo_size, height=logo_size, 
-                           preserveAspectRatio=True, mask='auto')
-                
-                # Draw right logo (reload for second instance)
-                img2 = ImageReader(logo_path)
-                c.drawImage(img2, width - 0.75*inch - logo_size, logo_y, 
-                           width=logo_size, height=logo_size, 
-                           preserveAspectRatio=True, mask='auto')
-                
-                print(f"✓ Logos rendered successfully on both sides")
-            except Exception as e:
-                print(f"⚠️ Logo rendering error: {e}")
-                import traceback
-                print(traceback.format_exc())
-        else:
-            print(f"⚠️ Logo file not found. Searched:")
-            for path in possible_logo_paths:
-                if path:
-                    print(f"   - {path}")
-        
-        # === HEADER ===
-        y_pos = height - 1*inch
-        
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width/2, y_pos, "Republic of the Philippines")
-        
-        y_pos -= 0.2*inch
-        c.setFillColor(colors.HexColor('#1A237E'))
-        c.setFont("Helvetica-Bold", 11)
-        c.drawCentredString(width/2, y_pos, "DEPARTMENT OF THE INTERIOR AND")
-        y_pos -= 0.18*inch
-        c.drawCentredString(width/2, y_pos, "LOCAL GOVERNMENT")
-        
-        y_pos -= 0.2*inch
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width/2, y_pos, "REGION IV-A CALABARZON")
-        
-        y_pos -= 0.15*inch
-        c.drawCentredString(width/2, y_pos, "CITY OF LUCENA")
-        
-        c.setFont("Helvetica", 7)
-        c.setFillColor(colors.gray)
-        c.drawRightString(width - 0.6*inch, y_pos - 0.3*inch, form_ref)
-        
-        # === LINE ===
-        y_pos -= 0.5*inch
-        c.setStrokeColor(colors.black)
-        c.setLineWidth(1)
-        c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
-        
-        # === TITLE ===
-        y_pos -= 0.5*inch
-        c.setFillColor(colors.HexColor('#1A237E'))
-        c.setFont("Helvetica-Bold", 18)
-        c.drawCentredString(width/2, y_pos, "CERTIFICATION")
-        
-        y_pos -= 0.25*inch
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width/2, y_pos, "on Services Rendered in the Barangay*")
-        
-        y_pos -= 0.2*inch
-        c.setFont("Helvetica-Bold", 10)
-        c.drawCentredString(width/2, y_pos, position_label)
-        
-        # === LINE ===
-        y_pos -= 0.3*inch
-        c.line(0.75*inch, y_pos, width - 0.75*inch, y_pos)
-        
-        # === BODY ===
-        y_pos -= 0.4*inch
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        
-        # First line with indentation (0.5 inch indent)
-        indent = 0.5*inch
-        text_line = f"This is to certify that "
-        c.drawString(0.75*inch + indent, y_pos, text_line)
-        
-        name_x = 0.75*inch + indent + c.stringWidth(text_line, "Helvetica", 10)
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(name_x, y_pos, eligibility_request.full_name.upper())
-        
-        after_name_x = name_x + c.stringWidth(eligibility_request.full_name.upper(), "Helvetica-Bold", 10)
-        c.setFont("Helvetica", 10)
-        c.drawString(after_name_x, y_pos, " has rendered services in")
-        
-        # Second line - no indent
-        y_pos -= 0.18*inch
-        barangay_text = f"Barangay {eligibility_request.barangay}, with the following details:"
-        c.drawString(0.75*inch, y_pos, barangay_text)
-        
-        # === TABLE ===
-        y_pos -= 0.5*inch
-        
-        if eligibility_request.position_type == 'elective':
-            # ✅ ELECTIVE TABLE
-            table_data = [
-                ['Position Held', 'Date of Election\n(mm/dd/yyyy)', 'Term of Office\n(no. of years)', 
-                 'From\n(mm/dd/yyyy)', 'To\n(mm/dd/yyyy)'],
-                [
-                    eligibility_request.position_held or 'N/A',
-                    eligibility_request.election_from.strftime('%m/%d/%Y') if eligibility_request.election_from else 'N/A',
-                    eligibility_request.term_office or 'N/A',
-                    eligibility_request.election_from.strftime('%m/%d/%Y') if eligibility_request.election_from else 'N/A',
-                    eligibility_request.election_to.strftime('%m/%d/%Y') if eligibility_request.election_to else 'N/A'
-                ]
-            ]
-            
-            col_widths = [1.4*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch]
-            row_heights = [0.5*inch, 0.4*inch]
-            
-        else:
-            # APPOINTIVE TABLE
-            table_data = [
-                ['Position\nHeld', 'Date of\nAppointment', 'Inclusive Dates\nFrom', 'Inclusive Dates\nTo',
-                 'No. of Years\nServed', 'Appointing Punong\nBarangay Name', 'Date Elected', 'Term of Office\n(years)'],
-                [
-                    'Barangay\nSecretary',
-                    eligibility_request.appointment_from.strftime('%m/%d/%Y') if eligibility_request.appointment_from else 'N/A',
-                    eligibility_request.appointment_from.strftime('%m/%d/%Y') if eligibility_request.appointment_from else 'N/A',
-                    eligibility_request.appointment_to.strftime('%m/%d/%Y') if eligibility_request.appointment_to else 'N/A',
-                    f"{float(eligibility_request.years_in_service)} yrs" if eligibility_request.years_in_service else '0.0 yrs',
-                    eligibility_request.appointing_punong_barangay or 'N/A',
-                    eligibility_request.pb_date_elected.strftime('%m/%d/%Y') if eligibility_request.pb_date_elected else 'N/A',
-                    f"{float(eligibility_request.pb_years_service)} yrs" if eligibility_request.pb_years_service else '0.0 yrs'
-                ]
-            ]
-            col_widths = [0.8*inch, 0.75*inch, 0.75*inch, 0.75*inch, 0.7*inch, 1.1*inch, 0.7*inch, 0.7*inch]
-            row_heights = [0.6*inch, 0.5*inch]
-        
-        table = Table(table_data, colWidths=col_widths, rowHeights=row_heights)
-        
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1A237E')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        table.wrapOn(c, width, height)
-        table_height = table._height
-        table.drawOn(c, 0.75*inch, y_pos - table_height)
-        
-        y_pos -= (table_height + 0.3*inch)
-        
-        # === ✅ COMPLETED TERM SECTION (ELECTIVE ONLY) ===
-        if eligibility_request.position_type == 'elective':
-            c.setFont("Helvetica-Bold", 10)
-            c.setFillColor(colors.black)
-            c.drawString(0.75*inch, y_pos, "Completed Term of Office?")
-            
-            c.setFont("Helvetica", 9)
-            c.drawString(2.9*inch, y_pos, "(Please check (√) appropriate box)")
-            
-            y_pos -= 0.3*inch
-            
-            completed_term = eligibility_request.completed_term
-            checkbox_size = 0.15*inch
-            
-            # YES checkbox
-            c.setStrokeColor(colors.black)
-            c.setLineWidth(1)
-            c.rect(1.0*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
-            
-            if completed_term and completed_term.lower() == 'yes':
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(1.03*inch, y_pos - 0.02*inch, "✓")
-            
-            c.setFont("Helvetica", 10)
-            c.drawString(1.25*inch, y_pos, "YES")
-            
-            # NO checkbox
-            c.rect(2.1*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
-            
-            if completed_term and completed_term.lower() == 'no':
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(2.13*inch, y_pos - 0.02*inch, "✓")
-            
-            c.setFont("Helvetica", 10)
-            c.drawString(2.35*inch, y_pos, "NO, Specify total number of days not served")
-            
-            y_pos -= 0.3*inch
-            
-            # REASON BOX - ONLY SHOWS WHEN completed_term == 'no'
-            if completed_term and completed_term.lower() == 'no':
-                c.setFont("Helvetica-Bold", 9)
-                c.drawString(1.0*inch, y_pos, "Reason for non-completion:")
-                
-                y_pos -= 0.25*inch
-                
-                c.setFillColor(colors.HexColor('#f5f5f5'))
-                c.setStrokeColor(colors.HexColor('#cccccc'))
-                c.setLineWidth(0.5)
-                reason_box_height = 0.7*inch
-                c.rect(1.0*inch, y_pos - reason_box_height, 5.5*inch, reason_box_height, fill=1, stroke=1)
-                
-                c.setFillColor(colors.black)
-                c.setFont("Helvetica", 9)
-                
-                reason_text = eligibility_request.incomplete_reason or 'Not specified'
-                max_width = 5.2*inch
-                
-                words = reason_text.split()
-                lines = []
-                current_line = []
-                
-                for word in words:
-                    test_line = ' '.join(current_line + [word])
-                    if c.stringWidth(test_line, "Helvetica", 9) < max_width:
-                        current_line.append(word)
-                    else:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                        current_line = [word]
-                
-                if current_line:
-                    lines.append(' '.join(current_line))
-                
-                text_y = y_pos - 0.2*inch
-                for i, line in enumerate(lines[:4]):
-                    c.drawString(1.1*inch, text_y, line)
-                    text_y -= 0.13*inch
-                
-                y_pos -= (reason_box_height + 0.2*inch)
-            
-            # "Assumed under rule on succession" checkbox
-            y_pos -= 0.25*inch
-            c.setStrokeColor(colors.black)
-            c.rect(1.0*inch, y_pos - 0.05*inch, checkbox_size, checkbox_size)
-            c.setFont("Helvetica", 9)
-            c.drawString(1.25*inch, y_pos, "Assumed under rule on succession.")
-            
-            y_pos -= 0.35*inch
-        
-        # === FOOTER TEXT ===
-        c.setFont("Helvetica", 9)
-        c.setFillColor(colors.black)
-        
-        # Create properly wrapped footer text with indentation
-        left_margin = 0.75*inch
-        indent = 0.5*inch  # Same indent as opening paragraph
-        max_width = width - 1.5*inch - indent  # Account for indent
-        
-        if eligibility_request.position_type == 'elective':
-            footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {eligibility_request.full_name.upper()} for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance with CSC Resolution No. 1200865 dated June 14, 2012 and CSC Resolution No. 1601257 dated November 21, 2016."
-        else:
-            footer_text = f"This Certification is issued in support of the evaluation/processing of the application of {eligibility_request.full_name.upper()} for the grant of Barangay Official Eligibility pursuant to Republic Act No. 7160, in accordance with CSC Resolution No. 13 series of 2012."
-        
-        # Word wrap the footer text
-        words = footer_text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            if c.stringWidth(test_line, "Helvetica", 9) < max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Draw wrapped footer text with indentation on first line only
-        for i, line in enumerate(lines):
-            if i == 0:
-                # First line gets indentation
-                c.drawString(left_margin + indent, y_pos, line)
-            else:
-                # Subsequent lines align with left margin
-                c.drawString(left_margin, y_pos, line)
-            y_pos -= 0.15*inch
-        
-        # === DATE ===
-        y_pos -= 0.2*inch
-        from django.utils import timezone
-        date_text = f"Lucena City, Quezon, {timezone.now().strftime('%B %d, %Y')}."
-        c.drawString(0.75*inch, y_pos, date_text)
-        
-        # === SIGNATURES ===
-        y_pos -= 0.8*inch
-        
-        # Director signature (RIGHT SIDE - properly aligned)
-        sig_line_width = 2.5*inch
-        sig_right_margin = 0.75*inch
-        sig_line_x_start = width - sig_right_margin - sig_line_width
-        sig_line_x_end = width - sig_right_margin
-        
-        # Draw signature line
-        c.setStrokeColor(colors.black)
-        c.setLineWidth(0.5)
-        c.line(sig_line_x_start, y_pos, sig_line_x_end, y_pos)
-        
-        # Director name (centered above line)
-        y_pos -= 0.18*inch
-        sig_center_x = sig_line_x_start + (sig_line_width / 2)
-        
-        c.setFont("Helvetica-Bold", 10)
-        name_width = c.stringWidth("LEANDRO SIPOY GIGANTOCA, CESE", "Helvetica-Bold", 10)
-        c.drawString(sig_center_x - (name_width / 2), y_pos, "LEANDRO SIPOY GIGANTOCA, CESE")
-        
-        # Director title (centered below name)
-        y_pos -= 0.15*inch
-        c.setFont("Helvetica", 9)
-        title_width = c.stringWidth("OIC-HUC Director, Lucena City", "Helvetica", 9)
-        c.drawString(sig_center_x - (title_width / 2), y_pos, "OIC-HUC Director, Lucena City")
-        
-        # Save PDF
-        c.showPage()
-        c.save()
-        
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        
-        print(f"✓ PDF generated ({len(pdf_data)} bytes)")
-        
-        # ✅ FIXED FILENAME GENERATION
-        safe_name = eligibility_request.full_name.replace(' ', '_').replace('.', '')
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        
-        if eligibility_request.position_type == 'elective':
-            completion_status = 'Completed' if eligibility_request.completed_term and eligibility_request.completed_term.lower() == 'yes' else 'Incomplete'
-            filename = f"{safe_name}_Elective_{completion_status}_Certificate_{timestamp}.pdf"
-        else:
-            filename = f"{safe_name}_Appointive_Certificate_{timestamp}.pdf"
-        
-        # Save to storage
-        file_path = f"certification_files/{folder}/{filename}"
-        saved_path = default_storage.save(file_path, ContentFile(pdf_data))
-        
-        print(f"✓ Saved: {saved_path}")
-        
-        # Create CategorizedFile record
-        completion_tag = 'Completed' if eligibility_request.position_type == 'elective' and eligibility_request.completed_term and eligibility_request.completed_term.lower() == 'yes' else 'Incomplete'
-        
-        categorized = CategorizedFile.objects.create(
-            file=saved_path,
-            original_filename=filename,
-            file_type='pdf',
-            file_size=len(pdf_data),
-            mime_type='application/pdf',
-            category=category,
-            source='eligibility',
-            detected_content=f'{eligibility_request.get_position_type_display()} Certificate - {completion_tag}',
-            eligibility_request=eligibility_request,
-            uploaded_by=eligibility_request.approved_by,
-            tags=f"{eligibility_request.full_name}, {eligibility_request.position_type}, {completion_tag}"
-        )
-        
+        from .certificates import render_certificate, save_certificate, certificate_record, get_category
+
+        print(f"📄 Generating {eligibility_request.position_type} certificate for {eligibility_request.full_name}")
+
+        category = get_category(eligibility_request.position_type)
+        pdf_data = render_certificate(eligibility_request)
+        saved_path, filename = save_certificate(eligibility_request, pdf_data)
+
+        print(f"✓ Saved: {saved_path} ({len(pdf_data)} bytes)")
+
+        certificate_record(eligibility_request, saved_path, filename, len(pdf_data), category).save()
         category.update_file_count()
-        print(f"{'='*70}\n")
-        
+
         return saved_path
-        
+
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
         import traceback
@@ -3570,6 +2787,116 @@ def generate_certificate_pdf(eligibility_request):
         return None
 
 
+@login_required
+@require_http_methods(["GET"])
+def api_download_certificate(request, request_id):
+    """
+    Serve the certificate of an approved request, rendering it on first download.
+
+    Renders are cached per request id, template version and printed data, and
+    served with ETag/Last-Modified so unchanged certificates revalidate with 304.
+    """
+    from django.core.files.storage import default_storage
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date
+    from .certificates import cached_certificate_path, certificate_etag, get_cached_certificate
+
+    eligibility_request = get_object_or_404(EligibilityRequest, id=request_id, status='approved')
+
+    # Staff can download any certificate; anyone else only their own
+    is_staff = request.user.userprofile.role == 'dilg staff' or request.user.is_superuser
+    is_owner = bool(request.user.email) and (eligibility_request.email or '').lower() == request.user.email.lower()
+    if not (is_staff or is_owner):
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    etag = certificate_etag(eligibility_request)
+    path = cached_certificate_path(eligibility_request)
+    last_modified = None
+    if default_storage.exists(path):
+        last_modified = int(default_storage.get_modified_time(path).timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        pdf_data = get_cached_certificate(eligibility_request)
+        if last_modified is None:
+            last_modified = int(default_storage.get_modified_time(path).timestamp()) if default_storage.exists(path) else int(timezone.now().timestamp())
+
+        safe_name = eligibility_request.full_name.replace(' ', '_').replace('.', '')
+        response = HttpResponse(pdf_data, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="{safe_name}_Certificate.pdf"'
+        response['Content-Length'] = len(pdf_data)
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# Largest batch the web endpoint renders in the request; bigger runs belong in
+# `manage.py generate_certificates`, which renders across a process pool
+MAX_CERTIFICATE_BATCH = 50
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_generate_certificates(request):
+    """
+    Generate certificates for many approved eligibility requests at once.
+
+    Body: {"ids": [...]} or {"date_from": "YYYY-MM-DD", "date_to": "YYYY-MM-DD"},
+    optionally "missing_only": true and "bundle": "pdf" | "zip".
+    """
+    try:
+        if request.user.userprofile.role != 'dilg staff':
+            return JsonResponse({'success': False, 'error': 'Unauthorized - Admin only'}, status=403)
+
+        from django.core.files.storage import default_storage
+        from .certificates import batch_queryset, generate_certificates
+
+        data = json.loads(request.body or '{}')
+        bundle = data.get('bundle') or None
+        if bundle not in (None, 'pdf', 'zip'):
+            return JsonResponse({'success': False, 'error': 'bundle must be "pdf" or "zip"'}, status=400)
+
+        try:
+            date_from = datetime.strptime(data['date_from'], '%Y-%m-%d').date() if data.get('date_from') else None
+            date_to = datetime.strptime(data['date_to'], '%Y-%m-%d').date() if data.get('date_to') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Dates must be YYYY-MM-DD'}, status=400)
+
+        ids = data.get('ids') or []
+        if not ids and not (date_from or date_to):
+            return JsonResponse({'success': False, 'error': 'Provide ids or a date range'}, status=400)
+
+        eligibility_requests = list(batch_queryset(
+            ids=ids,
+            date_from=date_from,
+            date_to=date_to,
+            missing_only=bool(data.get('missing_only')),
+        )[:MAX_CERTIFICATE_BATCH + 1])
+        if len(eligibility_requests) > MAX_CERTIFICATE_BATCH:
+            return JsonResponse({
+                'success': False,
+                'error': f'Too many requests (max {MAX_CERTIFICATE_BATCH}); use the generate_certificates command'
+            }, status=400)
+
+        result = generate_certificates(eligibility_requests, bundle=bundle)
+
+        return JsonResponse({
+            'success': True,
+            'generated': len(result['generated']),
+            'failed': [{'id': r['id'], 'error': r['error']} for r in result['failed']],
+            'files': [{'id': r['id'], 'filename': r['filename']} for r in result['generated']],
+            'bundle_url': default_storage.url(result['bundle']) if result['bundle'] else None,
+        })
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        print(traceback.format_exc())
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 # Add to views.py
 from PIL import Image, ImageOps
 import io
@@ -3883,131 +3210,24 @@ def requirements_monitoring(request):
         'user_role': user_profile.role,
         'page_title': 'Submit Requirements',
         'is_submitter': True,
-        'assigned_barangay': user_profile.barangay,  # 🆕 Pass assigned barangay
-    }
-    return render(request, 'requirements_monitoring.html', context)
-
-
-import logging
-logger = logging.getLogger(__name__)
-@login_required
-def get_barangay_status(request, barangay_id):
-
-    try:
-        barangay = Barangay.objects.get(id=barangay_id)
-        submissions = RequirementSubmission.objects.filter(barangay=barangay)
-        today = date.today()
-        
-        if not submissions.exists():
-            return JsonResponse({
-                'status': 'no_data',
-                'color': 'gray',
-                'tooltip': f'{barangay.name}: No requirements assigned',
-                'counts': {
-                    'total': 0,
-                    'overdue': 0,
-                    'pending': 0,
-                    'in_progress': 0,
-                    'accomplished': 0,
-                    'approved': 0,
-                    'rejected': 0
-                }
-            })
-        
-        total = submissions.count()
-
-        overdue = submissions.filter(
-            status__in=['pending', 'in_progress', 'accomplished'],
-            due_date__lt=today
-        ).count()
-        
-        pending = submissions.filter(status='pending').count()
-        in_progress = submissions.filter(status='in_progress').count()
-        accomplished = submissions.filter(status='accomplished').count()
-        approved = submissions.filter(status='approved').count()
-        rejected = submissions.filter(status='rejected').count()
-        
-        if overdue > 0:
-            return JsonResponse({
-                'status': 'overdue',
-                'color': 'red',
-                'tooltip': f'{barangay.name}: {overdue} overdue requirement(s) ⚠️',
-                'counts': {
-                    'total': total,
-                    'overdue': overdue,
-                    'pending': pending,
-                    'in_progress': in_progress,
-                    'accomplished': accomplished,
-                    'approved': approved,
-                    'rejected': rejected
-                }
-            })
-        
+        'assigned_barangay': user_profile.barangay,  # 🆕 Pass assigned barangay
+    }
+    return render(request, 'requirements_monitoring.html', context)
 
-        elif approved == total:
-            return JsonResponse({
-                'status': 'completed',
-                'color': 'green',
-                'tooltip': f'{barangay.name}: All {total} requirements approved! ✓',
-                'counts': {
-                    'total': total,
-                    'overdue': 0,
-                    'pending': 0,
-                    'in_progress': 0,
-                    'accomplished': 0,
-                    'approved': approved,
-                    'rejected': rejected
-                }
-            })
 
-        elif in_progress > 0 or accomplished > 0:
-            return JsonResponse({
-                'status': 'in_progress',
-                'color': 'yellow',
-                'tooltip': f'{barangay.name}: {in_progress} in progress, {accomplished} awaiting review',
-                'counts': {
-                    'total': total,
-                    'overdue': 0,
-                    'pending': pending,
-                    'in_progress': in_progress,
-                    'accomplished': accomplished,
-                    'approved': approved,
-                    'rejected': rejected
-                }
-            })
-        
-        elif pending > 0:
-            return JsonResponse({
-                'status': 'pending',
-                'color': 'blue',
-                'tooltip': f'{barangay.name}: {pending} pending requirements',
-                'counts': {
-                    'total': total,
-                    'overdue': 0,
-                    'pending': pending,
-                    'in_progress': 0,
-                    'accomplished': 0,
-                    'approved': approved,
-                    'rejected': rejected
-                }
-            })
+import logging
+logger = logging.getLogger(__name__)
+@login_required
+def get_barangay_status(request, barangay_id):
+    """Map status of one barangay (served from the cached status of all barangays)"""
+    from .barangay_status import get_statuses
+
+    try:
+        status = get_statuses().get(barangay_id)
+        if status is None:
+            raise Barangay.DoesNotExist
+        return JsonResponse(status)
 
-        else:
-            return JsonResponse({
-                'status': 'partial',
-                'color': 'blue',
-                'tooltip': f'{barangay.name}: {approved}/{total} approved',
-                'counts': {
-                    'total': total,
-                    'overdue': 0,
-                    'pending': pending,
-                    'in_progress': in_progress,
-                    'accomplished': accomplished,
-                    'approved': approved,
-                    'rejected': rejected
-                }
-            })
-            
     except Barangay.DoesNotExist:
         return JsonResponse({
             'error': 'Barangay not found',
@@ -4022,6 +3242,153 @@ def get_barangay_status(request, barangay_id):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def api_barangay_statuses(request):
+    """Map status, colour, tooltip and counts of every barangay in one response"""
+    from .barangay_status import get_statuses
+
+    try:
+        return JsonResponse({
+            'success': True,
+            'barangays': list(get_statuses().values()),
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_compliance_matrix(request):
+    """
+    Barangay × requirement compliance grid for a year (?year=) or one month of it (?month=).
+
+    `matrix[i][j]` is the status code of barangay `barangays[i]` for
+    requirement `requirements[j]`; codes index into `codes`.
+    """
+    from .compliance import get_matrix
+
+    try:
+        if request.user.userprofile.role != 'dilg staff' and not request.user.is_superuser:
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+        try:
+            year = int(request.GET.get('year') or timezone.localdate().year)
+            month = int(request.GET['month']) if request.GET.get('month') else None
+            if not 1 <= year <= 9999 or month is not None and not 1 <= month <= 12:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid year or month'}, status=400)
+
+        return JsonResponse({'success': True, **get_matrix(year, month)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+# Columns loaded for an audit log page; old/new values only with ?changes=1
+AUDIT_LOG_FIELDS = [
+    'timestamp', 'action', 'object_id', 'description', 'ip_address',
+    'user__username', 'user__first_name', 'user__last_name',
+    'content_type__app_label', 'content_type__model',
+]
+
+
+def _audit_day(value, name):
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'Invalid {name} date (use YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def audit_log_row(entry, changes=False):
+    user = entry.user
+    row = {
+        'id': entry.id,
+        'timestamp': entry.timestamp.isoformat(),
+        'action': entry.action,
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'name': user.get_full_name() or user.username,
+        } if user else None,
+        'object_type': f'{entry.content_type.app_label}.{entry.content_type.model}' if entry.content_type else None,
+        'object_id': entry.object_id,
+        'description': entry.description,
+        'ip_address': entry.ip_address,
+    }
+    if changes:
+        row['old_values'] = entry.old_values
+        row['new_values'] = entry.new_values
+    return row
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_audit_log(request):
+    """
+    Browse the audit trail newest first, one keyset page at a time.
+
+    Filters: ?user=<user id>, ?action=UPDATE, ?object_type=app.employee
+    (with optional ?object_id=), ?start= / ?end= (YYYY-MM-DD, inclusive).
+    Pass the returned next_cursor back as ?cursor= for the following page;
+    ?limit= sets the page size and ?changes=1 adds old/new values.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from . import audit_partitions
+
+    try:
+        if request.user.userprofile.role != 'dilg staff' and not request.user.is_superuser:
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+        filters = {}
+        try:
+            if request.GET.get('user'):
+                filters['user_id'] = int(request.GET['user'])
+            if request.GET.get('action'):
+                filters['action'] = request.GET['action'].strip().upper()
+            if request.GET.get('object_type'):
+                app_label, _, model = request.GET['object_type'].strip().lower().partition('.')
+                try:
+                    filters['content_type'] = ContentType.objects.get_by_natural_key(app_label, model)
+                except ContentType.DoesNotExist:
+                    raise ValueError(f"Unknown object_type {request.GET['object_type']}")
+            if request.GET.get('object_id'):
+                if 'content_type' not in filters:
+                    raise ValueError('object_id needs object_type')
+                filters['object_id'] = int(request.GET['object_id'])
+            start = _audit_day(request.GET.get('start'), 'start')
+            end = _audit_day(request.GET.get('end'), 'end')
+            if end is not None:
+                end += timedelta(days=1)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+        changes = request.GET.get('changes') in ('1', 'true')
+        fields = AUDIT_LOG_FIELDS + (['old_values', 'new_values'] if changes else [])
+        try:
+            page, next_cursor = audit_partitions.page(
+                start, end, request.GET.get('cursor', ''), page_size(request), fields, **filters
+            )
+        except InvalidCursor as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+        entries = [audit_log_row(entry, changes) for entry in page]
+        return JsonResponse({
+            'success': True,
+            'entries': entries,
+            'count': len(entries),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 @login_required
 @require_http_methods(["GET"])
 def api_barangay_requirements(request):
@@ -4046,27 +3413,43 @@ def api_barangay_requirements(request):
                 'error': 'No barangay assigned to your account'
             }, status=400)
         
+        from .provisioning import PERIODS, current_period
+
         period = request.GET.get('period', 'weekly')
-        week = request.GET.get('week', 1)
         search = request.GET.get('search', '').strip()
-        
+        if period not in PERIODS:
+            return JsonResponse({'success': False, 'error': f'Invalid period. Must be one of: {PERIODS}'}, status=400)
+
+        # Submissions are numbered by period within the year (ISO week, month,
+        # quarter...); show the current one unless ?week=&year= pick another
+        number, year = current_period(period)
+        try:
+            number = int(request.GET.get('week', number))
+            year = int(request.GET.get('year', year))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'week and year must be numbers'}, status=400)
+
         # Get submissions for this barangay and period
         submissions = RequirementSubmission.objects.filter(
             barangay=barangay,
             requirement__period=period,
-            requirement__is_active=True
+            requirement__is_active=True,
+            week_number=number,
+            year=year,
         ).select_related('requirement')
         
-        # Filter by week if period is weekly
-        if period == 'weekly':
-            submissions = submissions.filter(week_number=week)
-        
-        # Search filter
+        # Search filter (ranked full-text search, icontains without the index)
         if search:
-            submissions = submissions.filter(
-                Q(requirement__title__icontains=search) |
-                Q(requirement__description__icontains=search)
+            ranked = ranked_search.ranked_objects(
+                submissions, ranked_search.SUBMISSION_INDEX, search, columns=['title', 'description']
             )
+            if ranked is not None:
+                submissions = ranked
+            else:
+                submissions = submissions.filter(
+                    Q(requirement__title__icontains=search) |
+                    Q(requirement__description__icontains=search)
+                )
         
         # Prepare response data
         submissions_data = []
@@ -4151,14 +3534,16 @@ def api_requirements_list(request):
         # Apply sorting
         requirements = requirements.order_by(sort)
         
+        # Submission statistics are counted in the same query as the list
+        requirements = requirements.select_related('created_by').annotate(
+            total_submissions=Count('submissions'),
+            approved_count=Count('submissions', filter=Q(submissions__status='approved')),
+            pending_count=Count('submissions', filter=Q(submissions__status='pending')),
+        )
+        
         # Format data
         requirements_data = []
         for req in requirements:
-            # Get submission statistics
-            total_submissions = RequirementSubmission.objects.filter(requirement=req).count()
-            approved_count = RequirementSubmission.objects.filter(requirement=req, status='approved').count()
-            pending_count = RequirementSubmission.objects.filter(requirement=req, status='pending').count()
-            
             requirements_data.append({
                 'id': req.id,
                 'title': req.title,
@@ -4170,9 +3555,9 @@ def api_requirements_list(request):
                 'is_active': req.is_active,
                 'created_by': req.created_by.get_full_name() if req.created_by else 'System',
                 'created_at': req.created_at.strftime('%B %d, %Y'),
-                'total_submissions': total_submissions,
-                'approved_count': approved_count,
-                'pending_count': pending_count,
+                'total_submissions': req.total_submissions,
+                'approved_count': req.approved_count,
+                'pending_count': req.pending_count,
             })
         
         return JsonResponse({
@@ -4264,7 +3649,7 @@ def api_update_requirement(request, requirement_id):
         
         # Log the update
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='UPDATE',
                 content_object=req,
@@ -4310,7 +3695,7 @@ def api_archive_requirement(request, requirement_id):
         
         # Log the archive
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='UPDATE',
                 content_object=req,
@@ -4350,7 +3735,7 @@ def api_restore_requirement(request, requirement_id):
         
         # Log the restore
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='UPDATE',
                 content_object=req,
@@ -4550,7 +3935,7 @@ def api_submission_submit(request, submission_id):
         
         # Log the submission
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='UPDATE',
                 content_object=submission,
@@ -4627,7 +4012,7 @@ def api_submission_update(request, submission_id):
         submission.save()
         
         # Log the update
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='UPDATE',
             content_object=submission,
@@ -4723,7 +4108,7 @@ def api_attachment_delete(request, attachment_id):
             return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
         
         # Log before deletion
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='DELETE',
             description=f"Deleted attachment: {os.path.basename(attachment.file.name)}"
@@ -4754,7 +4139,7 @@ def api_submission_delete(request, submission_id):
             return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
         
         # Log before deletion
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='DELETE',
             description=f"Deleted submission: {submission.requirement.title} - {submission.barangay.name}"
@@ -4813,9 +4198,10 @@ def requirements_monitoring(request):
 def get_requirements_list(request):
     """AJAX endpoint to get requirements list for a barangay"""
     try:
+        from .provisioning import PERIODS, period_containing
+
         barangay_id = request.GET.get('barangay_id')
         period = request.GET.get('period', 'weekly')
-        week = request.GET.get('week', 1)
         search = request.GET.get('search', '')
         
         if not barangay_id:
@@ -4834,9 +4220,15 @@ def get_requirements_list(request):
                 'error': '🚫 Access Denied: You can only view your assigned barangay.'
             }, status=403)
         
-        # Get current year and week
-        current_year = timezone.now().year
-        current_week = int(week)
+        if period not in PERIODS:
+            return JsonResponse({
+                'success': False,
+                'error': f'Invalid period. Must be one of: {PERIODS}'
+            }, status=400)
+
+        # The current period, numbered like the submissions made on creation
+        # and by the scheduler
+        _, period_end, current_number, current_year = period_containing(period, timezone.localdate())
         
         # 🆕 Get requirements for this period that apply to this barangay
         # Either: no specific barangays (applies to all) OR includes this barangay
@@ -4857,14 +4249,14 @@ def get_requirements_list(request):
         # 🆕 Get or create submissions for these requirements
         submissions_data = []
         for req in requirements:
-            # Get or create submission for this week/period
+            # Get or create submission for the current period
             submission, created = RequirementSubmission.objects.get_or_create(
                 requirement=req,
                 barangay=barangay,
-                week_number=current_week if period == 'weekly' else None,
+                week_number=current_number,
                 year=current_year,
                 defaults={
-                    'due_date': calculate_due_date(period, current_week, current_year),
+                    'due_date': period_end,
                     'status': 'pending'
                 }
             )
@@ -4888,7 +4280,8 @@ def get_requirements_list(request):
             'submissions': submissions_data,
             'barangay_name': barangay.name,
             'period': period,
-            'week': current_week
+            'week': current_number,
+            'year': current_year,
         })
         
     except Exception as e:
@@ -4994,7 +4387,7 @@ def update_submission(request, submission_id):
         submission.save()
         
         # Log the update
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='UPDATE',
             content_object=submission,
@@ -5062,7 +4455,7 @@ def upload_attachment(request, submission_id):
             })
         
         # Log the upload
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='CREATE',
             content_object=submission,
@@ -5094,7 +4487,7 @@ def delete_attachment(request, attachment_id):
         attachment.delete()
         
         # Log the deletion
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='DELETE',
             content_object=submission,
@@ -5161,7 +4554,7 @@ def delete_submission(request, submission_id):
         requirement_title = submission.requirement.title
         
         # Log before deletion
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='DELETE',
             description=f"Deleted requirement submission: {requirement_title}"
@@ -5737,63 +5130,32 @@ def admin_calendar_view(request):
         print(f"❌ UserProfile does not exist for user: {request.user.username}")
         return JsonResponse({'success': False, 'error': 'User profile not found'}, status=403)
     
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date
+    from .calendar_feed import get_month
+
     try:
         month = int(request.GET.get('month', datetime.now().month))
         year = int(request.GET.get('year', datetime.now().year))
         
         print(f"📅 Loading calendar for: {month}/{year}")
         
-        # Get first and last day of the month
-        first_day = datetime(year, month, 1)
-        if month == 12:
-            last_day = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            last_day = datetime(year, month + 1, 1) - timedelta(days=1)
-        
-        # Fetch all submissions for the month
-        submissions = RequirementSubmission.objects.filter(
-            due_date__gte=first_day.date(),
-            due_date__lte=last_day.date()
-        ).select_related('barangay', 'requirement')
-        
-        requirements_data = []
-        for sub in submissions:
-            requirements_data.append({
-                'id': sub.id,
-                'title': sub.requirement.title,
-                'barangay_name': sub.barangay.name,
-                'due_date': sub.due_date.strftime('%Y-%m-%d'),
-                'status': sub.status,
-                'status_display': sub.get_status_display(),
-                'type': 'requirement'  # ADD THIS to distinguish from announcements
-            })
-        
-        # ADD THIS: Fetch announcements for the month
-        announcements = Announcement.objects.filter(
-            date__gte=first_day.date(),
-            date__lte=last_day.date()
-        ).select_related('posted_by')
+        # Cached per month; dropped by the receivers in models.py on changes
+        calendar_month = get_month(year, month)
         
-        for announcement in announcements:
-            requirements_data.append({
-                'id': f'announcement_{announcement.id}',  # Prefix to avoid ID conflicts
-                'title': f"📢 {announcement.title}",
-                'barangay_name': 'All Barangays',
-                'due_date': announcement.date.strftime('%Y-%m-%d'),
-                'status': 'announcement',
-                'status_display': announcement.get_priority_display(),
-                'type': 'announcement',  # ADD THIS
-                'priority': announcement.priority
+        response = get_conditional_response(request, etag=calendar_month['etag'])
+        if response is None:
+            print(f"✅ Calendar loaded: {len(calendar_month['items'])} items found")
+            response = JsonResponse({
+                'success': True,
+                'requirements': calendar_month['items']
             })
         
-        print(f"✅ Calendar loaded: {len(requirements_data)} items found")
-        print(f"   - Requirements: {submissions.count()}")
-        print(f"   - Announcements: {announcements.count()}")
-        
-        return JsonResponse({
-            'success': True,
-            'requirements': requirements_data
-        })
+        response['ETag'] = calendar_month['etag']
+        if calendar_month['last_modified']:
+            response['Last-Modified'] = http_date(calendar_month['last_modified'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
         
     except Exception as e:
         import traceback
@@ -5801,6 +5163,74 @@ def admin_calendar_view(request):
         print(traceback.format_exc())
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+
+# Months in the .ics feed when no ?year=&month= is given: last month and the next few
+CALENDAR_FEED_MONTHS = 6
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def admin_calendar_feed_url(request):
+    """
+    Subscription URL of the admin calendar feed for the current user.
+
+    GET returns it (creating the user's token on first use); POST replaces
+    the token, so links shared earlier stop working.
+    """
+    user_profile = request.user.userprofile
+    if user_profile.role not in ['admin', 'dilg staff']:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    token = user_profile.get_calendar_token(reset=request.method == 'POST')
+    return JsonResponse({
+        'success': True,
+        'url': request.build_absolute_uri(reverse('admin_calendar_ics', args=[token])),
+    })
+
+
+@require_http_methods(["GET"])
+def admin_calendar_ics(request, token):
+    """
+    iCalendar export of the admin calendar.
+
+    Calendar clients subscribe without a session, so the URL carries the
+    secret token of a user (see admin_calendar_feed_url), who must still be
+    active and hold an admin role.
+
+    ?year=&month= exports one month; otherwise the feed covers the previous
+    month and the following ones. Served with an ETag so subscribed calendar
+    clients get 304 until something in the covered months changes.
+    """
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from .calendar_feed import feed_etag, get_month, months_from, to_ics
+
+    user_profile = get_object_or_404(UserProfile, calendar_token=token, user__is_active=True)
+    if user_profile.role not in ['admin', 'dilg staff']:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    try:
+        if request.GET.get('year') and request.GET.get('month'):
+            start, count = (int(request.GET['year']), int(request.GET['month'])), 1
+        else:
+            today = timezone.localdate()
+            start = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+            count = CALENDAR_FEED_MONTHS
+        if not 1 <= start[1] <= 12:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid year or month'}, status=400)
+
+    months = [get_month(year, month) for year, month in months_from(*start, count)]
+    etag = feed_etag(months)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(to_ics(months), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="dilg-calendar.ics"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 @login_required
 @require_http_methods(["POST"])
 def test_create_notification(request):
@@ -5909,7 +5339,11 @@ def admin_submissions_page(request):
 @require_http_methods(["GET"])
 def api_admin_submissions_list(request):
     """
-    API endpoint for admin to fetch all submissions with filters
+    API endpoint for admin to fetch submissions with filters, one page at a time
+
+    Pass the returned next_cursor back as ?cursor= for the following page
+    (?limit= sets the page size). ?fields=id,title,status returns only
+    those fields; attachments are not loaded unless requested.
     """
     try:
         # Check if user is admin
@@ -5925,13 +5359,26 @@ def api_admin_submissions_list(request):
         status = request.GET.get('status')
         period = request.GET.get('period')
         search = request.GET.get('search', '').strip()
+        cursor = request.GET.get('cursor', '')
+        limit = page_size(request)
+        
+        fields = [f.strip() for f in request.GET.get('fields', '').split(',') if f.strip()]
+        unknown = set(fields) - set(ADMIN_SUBMISSION_FIELDS)
+        if unknown:
+            return JsonResponse({
+                'success': False,
+                'error': f"Unknown fields: {', '.join(sorted(unknown))}"
+            }, status=400)
+        fields = fields or ADMIN_SUBMISSION_FIELDS
         
-        # Base query - get all submissions
+        # Base query
         submissions = RequirementSubmission.objects.select_related(
             'requirement',
             'barangay',
-            'submitted_by'  # ✅ FIXED: was 'created_by'
-        ).all()
+            'submitted_by'
+        )
+        if 'attachments' in fields:
+            submissions = submissions.prefetch_related('attachments')
         
         # Apply filters
         if barangay_id:
@@ -5943,49 +5390,41 @@ def api_admin_submissions_list(request):
         if period:
             submissions = submissions.filter(requirement__period=period)
         
+        ranked = None
+        offset = int(cursor) if cursor.isdigit() else 0
         if search:
-            submissions = submissions.filter(
-                Q(requirement__title__icontains=search) |
-                Q(barangay__name__icontains=search) |
-                Q(update_text__icontains=search)
+            # Full-text search (ranked, one row past the page); falls back to icontains without the index
+            ranked = ranked_search.ranked_pks(
+                submissions, ranked_search.SUBMISSION_INDEX, search, limit=limit + 1, offset=offset
             )
+            if ranked is None:
+                submissions = submissions.filter(
+                    Q(requirement__title__icontains=search) |
+                    Q(barangay__name__icontains=search) |
+                    Q(update_text__icontains=search)
+                )
         
-        # Order by most recent first
-        submissions = submissions.order_by('-submitted_at', '-created_at')
+        if ranked is not None:
+            # Relevance order: page through the ranked ids by position
+            page_ids = ranked[:limit]
+            by_id = submissions.in_bulk(page_ids)
+            page = [by_id[pk] for pk in page_ids if pk in by_id]
+            next_cursor = str(offset + limit) if len(ranked) > limit else None
+        else:
+            # Most recent first, by keyset so deep pages cost the same as the first
+            try:
+                page, next_cursor = keyset_page(submissions, ADMIN_SUBMISSION_ORDER, cursor, limit)
+            except InvalidCursor as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
         
-        # Format submissions for JSON
-        submissions_data = []
-        for sub in submissions:
-            # Get attachments
-            attachments = []
-            for attachment in sub.attachments.all():
-                attachments.append({
-                    'id': attachment.id,
-                    'file_name': attachment.file.name.split('/')[-1],
-                    'file_url': attachment.file.url if attachment.file else '#',
-                    'file_size': round(attachment.file.size / 1024) if attachment.file else 0,
-                    'uploaded_at': attachment.uploaded_at.strftime('%B %d, %Y')
-                })
-            
-            submissions_data.append({
-            'id': sub.id,
-            'title': sub.requirement.title,
-            'barangay_name': sub.barangay.name,
-            'status': sub.status,
-            'status_display': sub.get_status_display(),
-            'due_date': sub.due_date.strftime('%B %d, %Y') if sub.due_date else 'N/A',
-            'submitted_at': sub.submitted_at.strftime('%B %d, %Y') if sub.submitted_at else 'Not submitted',
-            'submitted_by': sub.submitted_by.get_full_name() if sub.submitted_by else 'Unknown',
-            'period': sub.requirement.get_period_display(),
-            'update_text': sub.update_text or '',
-            'attachments': attachments,
-            'is_overdue': sub.is_overdue if hasattr(sub, 'is_overdue') else False  # ✅ FIXED: removed ()
-        })
+        submissions_data = [submission_row(sub, fields) for sub in page]
         
         return JsonResponse({
             'success': True,
             'submissions': submissions_data,
-            'count': len(submissions_data)
+            'count': len(submissions_data),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
         })
         
     except Exception as e:
@@ -5996,6 +5435,104 @@ def api_admin_submissions_list(request):
         }, status=500)
 
 
+ADMIN_SUBMISSION_ORDER = ['-submitted_at', '-created_at', '-id']
+
+ADMIN_SUBMISSION_FIELDS = [
+    'id', 'title', 'barangay_name', 'status', 'status_display', 'due_date', 'submitted_at',
+    'submitted_by', 'period', 'update_text', 'attachments', 'is_overdue',
+]
+
+
+def submission_row(sub, fields=ADMIN_SUBMISSION_FIELDS):
+    """JSON for one submission in the admin list, limited to `fields`"""
+    values = {
+        'id': lambda: sub.id,
+        'title': lambda: sub.requirement.title,
+        'barangay_name': lambda: sub.barangay.name,
+        'status': lambda: sub.status,
+        'status_display': lambda: sub.get_status_display(),
+        'due_date': lambda: sub.due_date.strftime('%B %d, %Y') if sub.due_date else 'N/A',
+        'submitted_at': lambda: sub.submitted_at.strftime('%B %d, %Y') if sub.submitted_at else 'Not submitted',
+        'submitted_by': lambda: sub.submitted_by.get_full_name() if sub.submitted_by else 'Unknown',
+        'period': lambda: sub.requirement.get_period_display(),
+        'update_text': lambda: sub.update_text or '',
+        # Sizes come from the stored column, not a filesystem stat per file
+        'attachments': lambda: [
+            {
+                'id': attachment.id,
+                'file_name': attachment.file.name.split('/')[-1],
+                'file_url': attachment.file.url if attachment.file else '#',
+                'file_size': round((attachment.file_size or 0) / 1024),
+                'uploaded_at': attachment.uploaded_at.strftime('%B %d, %Y')
+            }
+            for attachment in sub.attachments.all()
+        ],
+        'is_overdue': lambda: sub.is_overdue,
+    }
+    return {field: values[field]() for field in fields}
+
+
+# Most submissions one bulk review request may touch
+MAX_BULK_REVIEW = 500
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_admin_bulk_review_submissions(request):
+    """
+    Approve or reject many submissions in one request.
+
+    Body: {"submission_ids": [...], "action": "approved" | "rejected", "review_notes": "..."}.
+    Returns a result per id; ids that do not exist or already have the
+    requested status are reported as failures without aborting the rest.
+    """
+    try:
+        user_profile = request.user.userprofile
+        if user_profile.role != 'dilg staff' and not request.user.is_superuser:
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+        data = json.loads(request.body or '{}')
+        action = data.get('action')
+        review_notes = data.get('review_notes', '') or ''
+        submission_ids = data.get('submission_ids') or []
+
+        if action not in REVIEW_ACTIONS:
+            return JsonResponse({'success': False, 'error': 'Invalid action'}, status=400)
+        if not isinstance(submission_ids, list) or not submission_ids:
+            return JsonResponse({'success': False, 'error': 'Provide submission_ids'}, status=400)
+        if len(submission_ids) > MAX_BULK_REVIEW:
+            return JsonResponse({
+                'success': False,
+                'error': f'Too many submissions (max {MAX_BULK_REVIEW})'
+            }, status=400)
+        try:
+            submission_ids = [int(pk) for pk in submission_ids]
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'submission_ids must be integers'}, status=400)
+
+        results, notifications_sent = review_submissions(
+            submission_ids, action, review_notes, user=request.user
+        )
+        reviewed = sum(1 for result in results.values() if result['success'])
+
+        print(f"⚖️ Bulk review by {request.user.username}: {reviewed}/{len(results)} {action}, "
+              f"{notifications_sent} notifications")
+
+        return JsonResponse({
+            'success': True,
+            'action': action,
+            'reviewed': reviewed,
+            'failed': len(results) - reviewed,
+            'notifications_sent': notifications_sent,
+            'results': [{'id': pk, **result} for pk, result in results.items()],
+        })
+
+    except Exception as e:
+        print(f"❌ Bulk review error: {str(e)}")
+        print(traceback.format_exc())
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 @login_required
 @require_http_methods(["POST"])
 def api_admin_review_submission(request, submission_id):
@@ -6058,18 +5595,7 @@ def api_admin_review_submission(request, submission_id):
         # ========== NOTIFY BARANGAY USER ==========
         print(f"\n🔔 Creating barangay notification...")
         
-        if action == 'approved':
-            title = f"✅ Approved: {submission.requirement.title}"
-            message = f"Your submission for '{submission.requirement.title}' has been approved!"
-            if review_notes:
-                message += f" Admin notes: {review_notes}"
-            notif_type = 'completed'
-        else:  # rejected
-            title = f"❌ Needs Revision: {submission.requirement.title}"
-            message = f"Your submission for '{submission.requirement.title}' needs revision."
-            if review_notes:
-                message += f" Admin feedback: {review_notes}"
-            notif_type = 'info'
+        title, message, notif_type = review_message(submission, action, review_notes)
         
         notifications_sent = notify_barangay_user(
             submission=submission,
@@ -6193,88 +5719,33 @@ def api_create_requirement(request):
                 'error': f'Invalid period. Must be one of: {valid_periods}'
             }, status=400)
         
-        # Create requirement
-        requirement = Requirement.objects.create(
-            title=title,
-            description=description,
-            period=period,
-            priority=priority,
-            due_date=due_date,  # ✅ ADD THIS LINE (save to Requirement model)
-            created_by=request.user,
-            is_active=True
-        )
-        
-        # Assign to specific barangays if provided, otherwise applies to all
-        if barangay_ids:
-            target_barangays = Barangay.objects.filter(id__in=barangay_ids)
-            requirement.applicable_barangays.set(target_barangays)
-        else:
-            target_barangays = Barangay.objects.all()
-        
-        # 🔥 AUTO-CREATE SUBMISSIONS FOR ALL BARANGAYS
-        current_year = timezone.now().year
-        submissions_created = 0
-        
-        for barangay in target_barangays:
-            if period == 'weekly':
-                # Create submissions for the next 4 weeks
-                for week_num in range(1, 5):
-                    RequirementSubmission.objects.create(
-                        requirement=requirement,
-                        barangay=barangay,
-                        week_number=week_num,
-                        year=current_year,
-                        due_date=due_date,  # ✅ CHANGED: Use the due_date from frontend
-                        status='pending'
-                    )
-                    submissions_created += 1
+        # Create requirement, then its submissions and notifications in bulk
+        from .provisioning import provision_requirement
+
+        with transaction.atomic():
+            requirement = Requirement.objects.create(
+                title=title,
+                description=description,
+                period=period,
+                priority=priority,
+                due_date=due_date,
+                created_by=request.user,
+                is_active=True
+            )
+
+            # Assign to specific barangays if provided, otherwise applies to all
+            if barangay_ids:
+                target_barangays = list(Barangay.objects.filter(id__in=barangay_ids))
+                requirement.applicable_barangays.set(target_barangays)
             else:
-                # For monthly, quarterly, semestral, annually - create one submission
-                RequirementSubmission.objects.create(
-                    requirement=requirement,
-                    barangay=barangay,
-                    week_number=None,
-                    year=current_year,
-                    due_date=due_date,  # ✅ CHANGED: Use the due_date from frontend
-                    status='pending'
-                )
-                submissions_created += 1
-        
-        print(f"✅ Created {submissions_created} submissions with due_date: {due_date}")
+                target_barangays = list(Barangay.objects.all())
 
-        # Rest of the notification code stays the same...
-        notifications_sent = 0
-        priority_emoji = {'normal': '📋', 'important': '⚠️', 'urgent': '🚨'}
-        priority_label = priority.upper()
-        
-        barangay_users = User.objects.filter(
-            userprofile__role='barangay official',
-            userprofile__barangay__in=target_barangays
-        )
-        
-        for user in barangay_users:
-            try:
-                notification = Notification.objects.create(
-                    user=user,
-                    notification_type='new_requirement',
-                    title=f"{priority_emoji.get(priority, '📋')} New {priority_label} Requirement",
-                    message=f"A new {period} requirement has been added: {title}. Due date: {due_date.strftime('%B %d, %Y')}",
-                    is_read=False
-                )
-                notifications_sent += 1
-            except Exception as notif_error:
-                print(f"❌ Failed to create notification: {notif_error}")
-        
-        try:
-            AuditLog.objects.create(
-                user=request.user,
-                action='CREATE',
-                content_object=requirement,
-                description=f"DILG Admin created new {priority} requirement: {title} with {submissions_created} submissions"
+            submissions_created, notifications_sent = provision_requirement(
+                requirement, target_barangays, due_date, user=request.user
             )
-        except:
-            pass
-        
+
+        print(f"✅ Created {submissions_created} submissions with due_date: {due_date}")
+
         return JsonResponse({
             'success': True,
             'message': f'Requirement created successfully! {submissions_created} submissions created and {notifications_sent} barangay officials notified.',
@@ -6338,7 +5809,7 @@ def api_edit_requirement(request, requirement_id):
         
         # Log the update
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='UPDATE',
                 content_object=requirement,
@@ -6377,7 +5848,7 @@ def api_delete_requirement(request, requirement_id):
         
         # Log before deletion
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='DELETE',
                 description=f"DILG Admin deleted requirement: {title}"
@@ -6412,11 +5883,13 @@ def api_all_requirements(request):
                 'error': 'Unauthorized'
             }, status=403)
         
-        requirements = Requirement.objects.all().order_by('-created_at')
+        requirements = Requirement.objects.select_related('created_by').prefetch_related(
+            Prefetch('applicable_barangays', queryset=Barangay.objects.only('id', 'name'))
+        ).order_by('-created_at')
         
         requirements_data = []
         for req in requirements:
-            applicable_barangays = list(req.applicable_barangays.values_list('name', flat=True))
+            applicable_barangays = [barangay.name for barangay in req.applicable_barangays.all()]
             
             requirements_data.append({
                 'id': req.id,
@@ -7448,13 +6921,6 @@ def api_category_files(request, category_name):
         if barangay_id:
             files = files.filter(barangay_id=barangay_id)
         
-        if search_query:
-            files = files.filter(
-                Q(original_filename__icontains=search_query) |
-                Q(detected_content__icontains=search_query) |
-                Q(tags__icontains=search_query)
-            )
-        
         if file_type:
             files = files.filter(file_type=file_type)
         
@@ -7464,6 +6930,19 @@ def api_category_files(request, category_name):
         if date_to:
             files = files.filter(uploaded_at__date__lte=date_to)
         
+        # Full-text search (ranked, in the same query); falls back to icontains without the index
+        if search_query:
+            ranked = ranked_search.ranked(files, ranked_search.FILE_INDEX, search_query)
+            if ranked is not None:
+                files = ranked
+            else:
+                files = files.filter(
+                    Q(original_filename__icontains=search_query) |
+                    Q(detected_content__icontains=search_query) |
+                    Q(tags__icontains=search_query) |
+                    Q(extracted_text__icontains=search_query)
+                )
+        
         # Paginate
         paginator = Paginator(files, 20)
         page_number = request.GET.get('page', 1)
@@ -7540,6 +7019,9 @@ def api_upload_file(request):
         else:
             file_type = 'other'
         
+        # Document text (PDF text / OCR) is extracted and indexed later by
+        # `manage.py rebuild_search_index --extract-only`, not in the request
+        
         # Create categorized file
         categorized_file = CategorizedFile.objects.create(
             file=uploaded_file,
@@ -7560,7 +7042,7 @@ def api_upload_file(request):
         
         # Log the upload
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='CREATE',
                 content_object=categorized_file,
@@ -8102,7 +7584,7 @@ def api_delete_monitoring_file(request, file_id):
         
         # Log the deletion
         try:
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='DELETE',
                 description=f"Deleted file: {filename} from {category}"
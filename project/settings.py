@@ -36,7 +36,14 @@ INSTALLED_APPS = [
 
 
 CRONJOBS = [
-    ('0 8 * * *', 'django.core.management.call_command', ['send_notifications']),]
+    ('0 8 * * *', 'django.core.management.call_command', ['send_notifications']),
+    # Creates next month's audit partition ahead of the audit writer thread
+    ('30 0 * * *', 'django.core.management.call_command', ['partition_audit_log']),
+    # Extracts PDF text / OCRs the files uploaded since the last run and indexes them
+    ('*/15 * * * *', 'django.core.management.call_command', ['rebuild_search_index', '--extract-only']),
+]
+# A long OCR run must not be started again by the next tick
+CRONTAB_LOCK_JOBS = True
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -44,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.UserProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'app.middleware.RequestLoggerMiddleware',
@@ -82,6 +90,20 @@ DATABASES = {
     }
 }
 
+# Cache shared by every process using the database: web workers, cron jobs
+# and management commands. The compliance matrix, calendar months, org tree
+# and barangay map are invalidated by bumping version keys in it, which a
+# per-process cache (LocMemCache, Django's default) would keep from the
+# other processes. The table is created by migration 0041; Redis or
+# Memcached work as well.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -139,4 +161,15 @@ DEFAULT_FROM_EMAIL = 'DILG Certification <choimeramae@gmail.com>'
 import os
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Render certificate PDFs on first download (cached per template version)
+# instead of writing them at approval time
+CERTIFICATE_LAZY_RENDERING = False
+
+# Buffer audit entries and write them in batches from a background thread
+# (see app/audit.py). Off by default, so tests and management commands write
+# them at once; the web server entry points (wsgi.py, asgi.py) turn it on.
+AUDIT_BUFFERED = os.environ.get('AUDIT_BUFFERED') == '1'
+AUDIT_FLUSH_INTERVAL = 2.0  # seconds
+AUDIT_BUFFER_SIZE = 200
+AUDIT_SPOOL_PATH = os.path.join(BASE_DIR, 'audit_spool.jsonl')
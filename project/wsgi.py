@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+# Web requests hand audit entries to the buffered writer (settings.AUDIT_BUFFERED)
+os.environ.setdefault('AUDIT_BUFFERED', '1')
 
 application = get_wsgi_application()